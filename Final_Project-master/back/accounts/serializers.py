@@ -4,7 +4,7 @@ from rest_framework import serializers
 
 from .models import User
 
-from django.db.models import Max, Value
+from django.db.models import Value
 from django.db.models.functions import Coalesce
 
 from products.models import DepositProducts
@@ -60,9 +60,9 @@ class UserMeSerializer(serializers.ModelSerializer):
 
 
 class JoinedDepositProductSerializer(serializers.ModelSerializer):
-    # annotate로 내려주는 가공 필드
-    max_intr_rate = serializers.FloatField()
-    max_intr_rate2 = serializers.FloatField()
+    # annotate로 내려주는 가공 필드 (요약 컬럼이 비어 있으면 0.0)
+    max_intr_rate = serializers.FloatField(source="max_rate")
+    max_intr_rate2 = serializers.FloatField(source="max_rate2")
 
     class Meta:
         model = DepositProducts
@@ -100,10 +100,12 @@ class UserProfileSerializer(serializers.ModelSerializer):
         qs = (
             DepositProducts.objects
             .filter(fin_prdt_cd__in=codes)
+            .only("fin_prdt_cd", "kor_co_nm", "fin_prdt_nm")
             .annotate(
                 # ✅ 금리 옵션이 없거나(null) max가 None이면 0.0으로 강제
-                max_intr_rate=Coalesce(Max("options__intr_rate"), Value(0.0)),
-                max_intr_rate2=Coalesce(Max("options__intr_rate2"), Value(0.0)),
+                # (옵션 집계 대신 상품에 저장된 최고 금리 요약 컬럼 사용)
+                max_rate=Coalesce("max_intr_rate", Value(0.0)),
+                max_rate2=Coalesce("max_intr_rate2", Value(0.0)),
             )
             .order_by("kor_co_nm", "fin_prdt_nm")
         )
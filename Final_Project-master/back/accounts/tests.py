@@ -1,3 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from products import scheduler
+from products.models import JobRun, UserRecommendation
+from products.tests import StubApiMixin
+
+
+# -----------------------------
+# [F08/F09] 프로필 수정 + 회원 맞춤 추천 (계산은 요청 밖 refresh_user_recommendations 에서)
+# -----------------------------
+class MeRecommendationTests(StubApiMixin, TestCase):
+    me_url = '/accounts/me/'
+    recommend_url = '/api/v1/products/recommend/me/'
+
+    def setUp(self):
+        super().setUp()
+        self.collect()
+        self.run_command('recommendation')
+        self.user = get_user_model().objects.create_user(
+            username='saver', password='pw-12345', age=29, money=5_000_000, salary=40_000_000,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_requires_login(self):
+        self.assertEqual(APIClient().get(self.recommend_url).status_code, 401)
+        self.assertEqual(APIClient().get(self.me_url).status_code, 401)
+
+    def test_without_rows_falls_back_to_rate_ranking(self):
+        data = self.client.get(self.recommend_url, {'k': 2}).json()
+
+        self.assertTrue(data['fallback'])
+        # 최고 우대금리 순 (적금 3.6%, 예금 3.5% ...)
+        self.assertEqual([row['max_rate'] for row in data['recommendations']], [3.6, 3.5])
+
+    def test_refreshed_rows_are_served_as_is(self):
+        self.run_command('refresh_user_recommendations')
+        data = self.client.get(self.recommend_url).json()
+
+        self.assertNotIn('fallback', data)
+        self.assertNotIn('stale', data)
+        self.assertEqual([row['rank'] for row in data['recommendations']],
+                         sorted(row['rank'] for row in data['recommendations']))
+        self.assertEqual(len(data['recommendations']), UserRecommendation.objects.filter(user=self.user).count())
+
+    def test_patch_does_not_embed_and_marks_rows_stale(self):
+        self.run_command('refresh_user_recommendations')
+        before = self.client.get(self.recommend_url).json()['recommendations']
+
+        with mock.patch('products.embeddings.request_embeddings') as request_embeddings:
+            response = self.client.patch(self.me_url, {'age': 61}, format='json')
+            data = self.client.get(self.recommend_url).json()
+        request_embeddings.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['age'], 61)
+        self.assertTrue(data['stale'])
+        self.assertEqual(data['recommendations'], before)
 
-# Create your tests here.
+        # 예약 작업이 바뀐 회원만 다시 계산
+        runs = scheduler.run_job('refresh_user_recommendations', trigger=JobRun.TRIGGER_SCHEDULE)
+        self.assertEqual(runs[0].stats['refreshed'], 1)
+        self.assertNotIn('stale', self.client.get(self.recommend_url).json())
+        runs = scheduler.run_job('refresh_user_recommendations', trigger=JobRun.TRIGGER_SCHEDULE)
+        self.assertEqual((runs[0].stats['refreshed'], runs[0].stats['changed']), (0, False))
@@ -41,6 +41,8 @@ class MeView(APIView):
         )
         update_serializer.is_valid(raise_exception=True)
         update_serializer.save()
+        # [F09] 맞춤 추천은 여기서 다시 계산하지 않음 (임베딩 API 를 기다리지 않도록)
+        # 저장된 추천의 profile_hash 가 달라져서 stale 이 되고, run_scheduler 의 refresh_user_recommendations 가 갱신
 
         # 수정 후 최신 프로필 반환
         serializer = UserProfileSerializer(request.user)
@@ -0,0 +1,186 @@
+# back/products/ann.py
+
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+
+# -----------------------------
+# [F09] 근사 최근접 이웃(ANN) 인덱스 - IVF (k-means 역색인), 순수 NumPy
+# -----------------------------
+# 상품이 수만 개로 늘어나면 모든 상품과 내적하는 비용이 커지므로
+# 1) 질문과 가까운 클러스터 nprobe 개만 고르고
+# 2) 그 클러스터에 속한 상품(후보)만 정확한 코사인 유사도로 다시 점수를 매긴다.
+
+ASSIGN_BLOCK_ROWS = 8192
+
+
+def assign_clusters(matrix, centroids):
+    # 메모리를 아끼기 위해 블록 단위로 (행 수 x 클러스터 수) 점수 계산
+    labels = np.empty(len(matrix), dtype=np.int64)
+    for start in range(0, len(matrix), ASSIGN_BLOCK_ROWS):
+        block = matrix[start:start + ASSIGN_BLOCK_ROWS]
+        labels[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return labels
+
+
+def spherical_kmeans(matrix, n_clusters, n_iter=20, seed=0, max_train_rows=None):
+    """
+    코사인 유사도 기준 k-means. 정규화된 행렬을 받아 정규화된 중심점(n_clusters, dim)을 반환.
+    max_train_rows 가 있으면 그 개수만 샘플링해서 학습 (클러스터당 수백 개면 충분)
+    """
+    rng = np.random.default_rng(seed)
+    train = matrix
+    if max_train_rows and len(matrix) > max_train_rows:
+        train = matrix[rng.choice(len(matrix), max_train_rows, replace=False)]
+
+    n_clusters = max(1, min(n_clusters, len(train)))
+    centroids = train[rng.choice(len(train), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        labels = assign_clusters(train, centroids)
+        order = np.argsort(labels, kind='stable')
+        counts = np.bincount(labels, minlength=n_clusters)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        non_empty = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[non_empty] = np.add.reduceat(train[order], starts[non_empty], axis=0)
+
+        # 빈 클러스터는 임의의 점으로 다시 시작
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            sums[empty] = train[rng.choice(len(train), len(empty), replace=False)]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        new_centroids = (sums / norms).astype(np.float32)
+        if np.allclose(new_centroids, centroids, atol=1e-5):
+            centroids = new_centroids
+            break
+        centroids = new_centroids
+
+    return centroids
+
+
+class IVFIndex:
+    """
+    - centroids   : (클러스터 수, dim) 정규화된 중심점
+    - vectors     : (상품 수, dim) 클러스터 순서로 정렬된 정규화 임베딩
+    - product_ids : vectors 각 행의 DepositProducts.id
+    - offsets     : 클러스터 c 의 상품은 vectors[offsets[c]:offsets[c+1]]
+    """
+
+    def __init__(self, centroids, vectors, product_ids, offsets, meta=None):
+        self.centroids = centroids
+        self.vectors = vectors
+        self.product_ids = product_ids
+        self.offsets = offsets
+        self.meta = meta or {}
+
+    @classmethod
+    def build(cls, matrix, product_ids, n_clusters=None, n_iter=20, seed=0):
+        if n_clusters is None:
+            n_clusters = int(np.sqrt(len(matrix))) or 1
+        centroids = spherical_kmeans(matrix, n_clusters, n_iter=n_iter, seed=seed, max_train_rows=256 * n_clusters)
+        labels = assign_clusters(matrix, centroids)
+        order = np.argsort(labels, kind='stable')
+        offsets = np.concatenate(([0], np.cumsum(np.bincount(labels, minlength=len(centroids))))).astype(np.int64)
+        meta = {'count': int(len(matrix)), 'dim': int(matrix.shape[1]), 'clusters': int(len(centroids))}
+        return cls(centroids, np.ascontiguousarray(matrix[order]), product_ids[order], offsets, meta)
+
+    def candidates(self, query, nprobe, min_rows=0, mask=None):
+        """
+        질문과 가까운 클러스터 nprobe 개에 속한 행 번호.
+        mask(행별 bool) 로 걸러낸 뒤 후보가 min_rows 개보다 적으면 다음으로 가까운 클러스터를 더 본다.
+        """
+        nprobe = max(1, min(nprobe, len(self.centroids)))
+        order = np.argsort(-(self.centroids @ query), kind='stable')
+        ranges, found = [], 0
+        for i, c in enumerate(order):
+            if i >= nprobe and found >= min_rows:
+                break
+            rows = np.arange(self.offsets[c], self.offsets[c + 1])
+            if mask is not None:
+                rows = rows[mask[rows]]
+            ranges.append(rows)
+            found += len(rows)
+        return np.concatenate(ranges) if ranges else np.empty(0, dtype=np.int64)
+
+    def search(self, query, k, nprobe, mask=None):
+        """
+        정규화된 query -> (product_ids, scores) 상위 k개, 후보만 정확한 내적으로 재채점
+        mask 가 있으면 True 인 행(예: 판매 중인 상품)만 후보로 사용
+        """
+        rows = self.candidates(query, nprobe, min_rows=k, mask=mask)
+        if len(rows) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        scores = self.vectors[rows] @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return self.product_ids[rows[top]], scores[top]
+
+    def save(self, path):
+        # 웹 프로세스가 쓰다 만 파일을 읽지 않도록 같은 디렉터리의 임시 파일에 쓴 뒤 한 번에 교체
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(
+                    f,
+                    centroids=self.centroids,
+                    vectors=self.vectors,
+                    product_ids=self.product_ids,
+                    offsets=self.offsets,
+                    meta=np.array(json.dumps(self.meta)),
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                data['centroids'],
+                data['vectors'],
+                data['product_ids'],
+                data['offsets'],
+                json.loads(str(data['meta'])),
+            )
+
+
+def recall_report(index, queries, k=10, nprobes=(1, 2, 4, 8, 16, 32)):
+    """nprobe 별 recall@k (전체 정확 검색 대비) 와 질문당 평균 지연(ms) 을 측정"""
+    order_ids = index.product_ids
+    exact_ids = []
+    started = time.perf_counter()
+    for query in queries:
+        scores = index.vectors @ query
+        kk = min(k, len(scores))
+        exact_ids.append(set(order_ids[np.argpartition(-scores, kk - 1)[:kk]].tolist()))
+    exact_ms = (time.perf_counter() - started) * 1000 / max(1, len(queries))
+
+    report = {'k': k, 'queries': len(queries), 'exact_ms': round(exact_ms, 4), 'nprobe': []}
+    for nprobe in nprobes:
+        if nprobe > len(index.centroids):
+            break
+        hits, total = 0, 0
+        started = time.perf_counter()
+        results = [index.search(query, k, nprobe)[0] for query in queries]
+        elapsed_ms = (time.perf_counter() - started) * 1000 / max(1, len(queries))
+        for found, expected in zip(results, exact_ids):
+            hits += len(expected.intersection(found.tolist()))
+            total += len(expected)
+        report['nprobe'].append({
+            'nprobe': nprobe,
+            'recall': round(hits / max(1, total), 4),
+            'ms': round(elapsed_ms, 4),
+        })
+    return report
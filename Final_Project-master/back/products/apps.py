@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def _restore_search_triggers(sender, using, **kwargs):
+    # [F03] SQLite 는 상품 테이블을 다시 만드는 마이그레이션에서 검색 트리거가 사라지므로 migrate 직후 복구
+    from django.db import connections
+
+    from .search import ensure_search_triggers
+
+    ensure_search_triggers(connections[using])
 
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        post_migrate.connect(_restore_search_triggers, sender=self)
@@ -0,0 +1,51 @@
+# back/products/changes.py
+
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import CatalogChange, ConsumerCheckpoint
+
+
+# -----------------------------
+# [F03] 카탈로그 변경 이력 소비 (체크포인트 이후 변경만)
+# -----------------------------
+# 소비자(예: recommendation 임베딩 커맨드)는
+#   1) pending_changes(name) 로 마지막 체크포인트 이후의 변경을 읽고
+#   2) 처리가 끝나면 advance_checkpoint(name, upto) 로 체크포인트를 옮긴다.
+# 처리 중 실패하면 체크포인트를 옮기지 않아서 다음 실행 때 같은 변경을 다시 받는다.
+
+
+def get_checkpoint(name):
+    """체크포인트가 없으면 None (한 번도 처리하지 않은 소비자 -> 전체 처리 필요)"""
+    return ConsumerCheckpoint.objects.filter(name=name).values_list('last_change_id', flat=True).first()
+
+
+def pending_changes(name):
+    """
+    (체크포인트 이후 변경 queryset, 이번에 처리할 마지막 change id)
+    마지막 id 를 먼저 정해 두어서 처리하는 동안 새로 쌓인 변경은 다음 실행으로 넘긴다.
+    """
+    since = get_checkpoint(name) or 0
+    upto = CatalogChange.objects.aggregate(last=Max('id'))['last'] or 0
+    changes = CatalogChange.objects.filter(id__gt=since, id__lte=upto).order_by('id')
+    return changes, upto
+
+
+def is_behind(name):
+    """처리하지 않은 변경이 남아 있는지 (체크포인트가 없으면 전체 처리가 필요하므로 True)"""
+    since = get_checkpoint(name)
+    return since is None or CatalogChange.objects.filter(id__gt=since).exists()
+
+
+def changed_product_ids(changes, actions=(CatalogChange.ACTION_ADDED, CatalogChange.ACTION_CHANGED), entity=None):
+    """변경 이력 -> 해당 동작이 있었던 상품 id 집합"""
+    changes = changes.filter(action__in=actions)
+    if entity is not None:
+        changes = changes.filter(entity=entity)
+    return set(changes.values_list('product_id', flat=True).distinct())
+
+
+def advance_checkpoint(name, upto):
+    ConsumerCheckpoint.objects.update_or_create(
+        name=name, defaults={'last_change_id': upto, 'updated_at': timezone.now()},
+    )
@@ -0,0 +1,87 @@
+# back/products/chunking.py
+
+import re
+
+
+# -----------------------------
+# [F09] 우대조건/유의사항 청킹 (사후처리.md 참고)
+# -----------------------------
+# 문서 전체를 임베딩하면 조건이 여러 개인 상품은 의미가 뭉개지고,
+# "해당사항 없음" 같은 문구가 벡터를 오염시킨다.
+# -> 번호/기호/줄 단위로 조건을 나누고, 의미 없는 조각은 버린다.
+
+# 새 조건이 시작되는 줄 (1. / 2) / 2-1. / ① / 가. / - / * / ※ / ▶ / · )
+ITEM_START = re.compile(r'^\s*(?:\d{1,2}(?:-\d{1,2})?\s*[.)](?!\d)|[①-⑳]|[가-하]\s*[.)]|[-*※▶·•])')
+
+# 한 줄 안에 공백 여러 칸을 두고 다음 번호가 이어지는 경우 (예: "...0.2%)      2.SC제일...")
+INLINE_ITEM = re.compile(r'\s{2,}(?=(?:\d{1,2}\s*[.)](?!\d)|[①-⑳]|[가-하]\s*[.)]))')
+
+# 앞쪽 번호/기호 제거용
+ITEM_MARKER = re.compile(r'^\s*(?:\d{1,2}(?:-\d{1,2})?\s*[.)](?!\d)|[①-⑳]|[가-하]\s*[.)]|[-*※▶·•])\s*')
+
+# "해당사항 없음", "우대조건 없음", "해당무", "기타유의사항없음." 등
+BOILERPLATE = re.compile(r'^(?:우대조건|우대금리|우대이율|기타유의사항|유의사항)?(?:해당사항|해당)?(?:없음|무)$')
+
+# 번호 없이 짧고 숫자도 없는 조각은 다음 조건들의 제목으로 본다 (예: "*우대이율")
+ENUMERATED = re.compile(r'^\s*(?:\d{1,2}(?:-\d{1,2})?\s*[.)](?!\d)|[①-⑳]|[가-하]\s*[.)])')
+HEADING_MAX_LEN = 12
+
+
+def _compact(text):
+    return re.sub(r'[\s.,:;()\[\]]', '', text)
+
+
+def is_boilerplate(text):
+    compact = _compact(text)
+    return len(compact) < 2 or bool(BOILERPLATE.match(compact))
+
+
+def split_chunks(text):
+    """
+    우대조건/유의사항 텍스트 -> 조건 단위 문자열 리스트
+    번호/기호로 시작하지 않는 줄은 앞 조건의 이어지는 설명으로 붙인다.
+    """
+    items = []
+    for line in (text or '').splitlines():
+        for part in INLINE_ITEM.split(line):
+            part = part.strip()
+            if not part:
+                continue
+            if items and not ITEM_START.match(part):
+                items[-1] = f"{items[-1]} {part}"
+            else:
+                items.append(part)
+
+    chunks = []
+    heading = ''
+    for item in items:
+        body = ' '.join(ITEM_MARKER.sub('', item).split())
+        if is_boilerplate(body):
+            continue
+        if not ENUMERATED.match(item) and len(body) <= HEADING_MAX_LEN and not re.search(r'\d', body):
+            heading = body
+            continue
+        chunks.append(f"{heading} - {body}" if heading else body)
+
+    # 제목만 있고 내용이 없던 경우는 제목 자체를 하나의 조각으로
+    if not chunks and heading:
+        chunks.append(heading)
+    return chunks
+
+
+# 청킹 대상 컬럼
+CHUNK_SOURCES = ('spcl_cnd', 'etc_note')
+
+
+def product_chunks(product):
+    """
+    상품 1개 -> [(source, seq, text), ...]
+    쓸만한 조각이 하나도 없으면 상품명으로 대체 (그래야 청크 인덱스에서 빠지지 않음)
+    """
+    chunks = []
+    for source in CHUNK_SOURCES:
+        for seq, text in enumerate(split_chunks(getattr(product, source))):
+            chunks.append((source, seq, text))
+    if not chunks:
+        chunks.append(('name', 0, f"{product.kor_co_nm} {product.fin_prdt_nm}"))
+    return chunks
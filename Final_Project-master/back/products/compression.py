@@ -0,0 +1,95 @@
+# back/products/compression.py
+
+import numpy as np
+
+
+# -----------------------------
+# [F09] 임베딩 압축 (차원 축소 + int8 양자화)
+# -----------------------------
+# text-embedding-3-large 는 3072차원 (상품당 12KB).
+# 1차 순위는 작게 줄인 벡터로 계산하고, 상위 후보만 원본 벡터로 다시 계산한다.
+#
+# - truncate : 앞쪽 dim 개 차원만 사용 (Matryoshka 방식으로 학습된 모델은 앞쪽에 정보가 몰려 있음)
+# - pca      : 카탈로그로 학습한 PCA 로 dim 차원에 투영
+# - int8     : 행마다 최대 절댓값으로 나눠 -127~127 정수로 저장 (행 스케일 float32 1개 추가)
+
+COMPRESSION_METHODS = (None, 'truncate', 'pca')
+QUANTIZE_MODES = (None, 'int8')
+SCORE_BLOCK_ROWS = 16384
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+class EmbeddingCompressor:
+
+    def __init__(self, method=None, dim=256, quantize=None):
+        if method not in COMPRESSION_METHODS:
+            raise ValueError(f"지원하지 않는 압축 방식입니다: {method!r}")
+        if quantize not in QUANTIZE_MODES:
+            raise ValueError(f"지원하지 않는 양자화 방식입니다: {quantize!r}")
+        self.method = method
+        self.dim = dim
+        self.quantize = quantize
+        self.mean_ = None
+        self.components_ = None
+
+    def fit(self, matrix, max_rows=4096, seed=0):
+        if self.method == 'pca':
+            # 상품이 많으면 일부만 샘플링해서 학습 (SVD 비용 제한)
+            if len(matrix) > max_rows:
+                matrix = matrix[np.random.default_rng(seed).choice(len(matrix), max_rows, replace=False)]
+            self.mean_ = matrix.mean(axis=0).astype(np.float32)
+            # 상품 수가 차원보다 적으면 만들 수 있는 성분 수도 그만큼으로 제한
+            _, _, vt = np.linalg.svd(matrix - self.mean_, full_matrices=False)
+            self.components_ = np.ascontiguousarray(vt[:self.dim].astype(np.float32))
+        return self
+
+    def reduce(self, vectors):
+        """(n, dim_원본) 또는 (dim_원본,) -> 축소 후 다시 정규화한 float32"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.method == 'truncate':
+            vectors = vectors[..., :self.dim]
+        elif self.method == 'pca':
+            vectors = (vectors - self.mean_) @ self.components_.T
+        return _normalize_rows(vectors)
+
+    def encode(self, matrix):
+        """정규화된 원본 행렬 -> CompressedMatrix"""
+        reduced = self.reduce(matrix)
+        if self.quantize != 'int8':
+            return CompressedMatrix(np.ascontiguousarray(reduced), None)
+
+        scales = np.abs(reduced).max(axis=1)
+        scales[scales == 0] = 1.0
+        codes = np.rint(reduced / scales[:, None] * 127).astype(np.int8)
+        return CompressedMatrix(codes, (scales / 127).astype(np.float32))
+
+
+class CompressedMatrix:
+    """
+    - codes  : (n, dim) float32 또는 int8
+    - scales : int8 일 때 행별 복원 배율 (n,), 아니면 None
+    """
+
+    def __init__(self, codes, scales):
+        self.codes = codes
+        self.scales = scales
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def scores(self, query):
+        # query: 축소 후 정규화된 질문 벡터
+        if self.scales is None:
+            return self.codes @ query
+        # int8 -> float32 변환 임시 배열이 커지지 않도록 블록 단위로 계산
+        out = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), SCORE_BLOCK_ROWS):
+            block = self.codes[start:start + SCORE_BLOCK_ROWS]
+            out[start:start + len(block)] = block.astype(np.float32) @ query
+        return out * self.scales
@@ -0,0 +1,364 @@
+# back/products/embeddings.py
+
+import hashlib
+import os
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+
+import numpy as np
+import requests
+from cachetools import LRUCache
+from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import DepositProducts, QueryEmbedding
+from .vectors import encode_vector, decode_vector
+
+
+class EmbeddingError(Exception):
+    """임베딩 생성 실패 (API 에러 등)"""
+
+
+# -----------------------------
+# [F09] 임베딩 제공자 (settings.EMBEDDING_PROVIDER 로 선택)
+# -----------------------------
+class EmbeddingProvider:
+    """
+    texts -> (len(texts), dim) float32 numpy 배열
+    model_name 은 캐시 키 / 재임베딩 판단에 쓰이므로 결과가 달라지는 설정이면 이름도 달라야 한다.
+    """
+    model_name = ''
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+
+class RemoteEmbeddingProvider(EmbeddingProvider):
+    """OpenAI 호환 /v1/embeddings API (GMS)"""
+
+    # 429(요청 과다) / 5xx 는 잠깐 기다렸다가 다시 시도
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(self, url, api_key, model, timeout=30, max_retries=3, backoff=1.0):
+        self.url = url
+        self.api_key = api_key
+        self.model_name = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def embed(self, texts):
+        # 여러 문장을 한 번의 API 요청으로 임베딩 (입력 순서대로 반환)
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {"model": self.model_name, "input": list(texts)}
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = requests.post(self.url, headers=headers, json=payload, timeout=self.timeout)
+            except requests.RequestException as e:
+                if attempt == self.max_retries:
+                    raise EmbeddingError(str(e)) from e
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status_code == 200:
+                data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+                return np.asarray([item['embedding'] for item in data], dtype=np.float32)
+
+            if response.status_code in self.RETRY_STATUS_CODES and attempt < self.max_retries:
+                try:
+                    delay = float(response.headers.get('Retry-After'))
+                except (TypeError, ValueError):
+                    delay = self.backoff * 2 ** attempt
+                time.sleep(delay)
+                continue
+
+            raise EmbeddingError(f"{response.status_code} - {response.text}")
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """
+    네트워크 없이 프로세스 안에서 도는 임베딩 (문자 n-gram 해싱 + TF-IDF, scikit-learn).
+    의미 이해는 LLM 임베딩보다 약하지만 API 키 없이 개발/부하 테스트가 가능하고 질문 1개 인코딩이 1ms 이하.
+
+    IDF 는 처음 사용할 때 상품 텍스트로 학습해서 idf_path 에 저장하고 이후에는 그 파일을 쓴다.
+    (파일을 지우면 다시 학습 -> 상품 임베딩도 recommendation --force 로 다시 만들어야 함)
+    """
+
+    def __init__(self, n_features=4096, ngram_range=(2, 3), idf_path=None):
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        self.n_features = n_features
+        self.idf_path = idf_path
+        self.model_name = f"local-char{ngram_range[0]}{ngram_range[1]}-{n_features}"
+        self.vectorizer = HashingVectorizer(
+            analyzer='char_wb',
+            ngram_range=tuple(ngram_range),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+        )
+        self._idf = None
+        self._lock = threading.Lock()
+
+    def _counts(self, texts):
+        counts = self.vectorizer.transform([normalize_text(t) for t in texts]).tocsr()
+        counts.data = 1 + np.log(counts.data)  # sublinear tf
+        return counts
+
+    def _fit_idf(self):
+        corpus = []
+        for row in DepositProducts.objects.values_list('kor_co_nm', 'fin_prdt_nm', 'spcl_cnd', 'etc_note'):
+            corpus.extend(text for text in row if text)
+        counts = self._counts(corpus)
+        df = np.bincount(counts.indices, minlength=self.n_features)
+        return (np.log((1 + len(corpus)) / (1 + df)) + 1).astype(np.float32)
+
+    @property
+    def idf(self):
+        if self._idf is None:
+            with self._lock:
+                if self._idf is None:
+                    if self.idf_path and os.path.exists(self.idf_path):
+                        idf = np.load(self.idf_path)
+                    else:
+                        idf = self._fit_idf()
+                        if self.idf_path:
+                            os.makedirs(os.path.dirname(os.path.abspath(self.idf_path)), exist_ok=True)
+                            np.save(self.idf_path, idf)
+                    self._idf = idf
+        return self._idf
+
+    def embed(self, texts):
+        from sklearn.preprocessing import normalize
+
+        vectors = normalize(self._counts(texts).multiply(self.idf).tocsr())
+        return vectors.toarray().astype(np.float32)
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                config = settings.EMBEDDING_PROVIDERS[settings.EMBEDDING_PROVIDER]
+                _provider = import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+    return _provider
+
+
+def request_embeddings(texts):
+    return get_provider().embed(texts)
+
+
+def request_embedding(text):
+    return request_embeddings([text])[0]
+
+
+def embed_batches(items, texts, batch_size=64, workers=4):
+    """
+    items 와 같은 순서의 texts 를 batch_size 개씩 묶어 workers 개 스레드로 동시에 임베딩.
+    끝나는 배치부터 (배치 items, 임베딩 리스트 또는 None, 에러 또는 None) 를 yield 한다.
+    """
+    batch_size, workers = max(1, batch_size), max(1, workers)
+    batches = [
+        (items[i:i + batch_size], texts[i:i + batch_size])
+        for i in range(0, len(items), batch_size)
+    ]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(request_embeddings, batch_texts): batch_items for batch_items, batch_texts in batches}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except EmbeddingError as e:
+                yield futures[future], None, e
+
+
+def content_hash(text):
+    # 상품 임베딩 재생성 여부 판단용 (모델이 바뀌어도 다시 임베딩)
+    return hashlib.sha256(f"{get_provider().model_name}\n{text}".encode('utf-8')).hexdigest()
+
+
+# -----------------------------
+# [F09] 질문 임베딩 캐시 (1차: 프로세스 LRU, 2차: DB)
+# -----------------------------
+def normalize_text(text):
+    # 전각/반각, 공백 차이만 있는 같은 질문은 같은 키로 본다
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.split()).lower()
+
+
+def text_hash(text):
+    return hashlib.sha256(normalize_text(text).encode('utf-8')).hexdigest()
+
+
+class QueryEmbeddingCache:
+    """
+    (모델명, 정규화된 질문 해시) -> 임베딩
+
+    - LRU: 프로세스 메모리에 최근 질문 LRU_SIZE 개 (DB 행과 같은 만료 시각을 같이 저장)
+           LRU 에서 찾은 질문도 DB 의 last_used_at 을 갱신해야 자주 쓰는 질문이 정리 대상이 되지 않으므로
+           마지막 갱신 후 TOUCH_SECONDS 가 지났을 때만 UPDATE
+    - DB : QueryEmbedding 테이블, TTL 이 지나면 만료 / MAX_ROWS 를 넘으면 오래 안 쓴 것부터 삭제
+           (정리는 저장할 때마다가 아니라 EVICT_EVERY 번 저장할 때마다 한 번)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._lru = None
+        self._inserts = 0
+
+    @property
+    def config(self):
+        return settings.QUERY_EMBEDDING_CACHE
+
+    @property
+    def lru(self):
+        if self._lru is None:
+            self._lru = LRUCache(maxsize=self.config['LRU_SIZE'])
+        return self._lru
+
+    def _expires_before(self):
+        return timezone.now() - timedelta(seconds=self.config['TTL'])
+
+    def _remember(self, model_name, key, vector, created_at, touched_at):
+        # (벡터, DB 행 만료 시각, DB last_used_at 을 마지막으로 갱신한 시각)
+        expires_at = created_at.timestamp() + self.config['TTL']
+        with self._lock:
+            self.lru[(model_name, key)] = (vector, expires_at, touched_at.timestamp())
+
+    def get(self, model_name, key):
+        now = time.time()
+        touch = False
+        with self._lock:
+            entry = self.lru.get((model_name, key))
+            if entry is not None and entry[1] <= now:
+                # DB 행이 만료됐으면 메모리에서도 버림
+                del self.lru[(model_name, key)]
+                entry = None
+            elif entry is not None and now - entry[2] >= self.config['TOUCH_SECONDS']:
+                # 같은 질문이 동시에 들어와도 UPDATE 는 한 번만
+                self.lru[(model_name, key)] = (entry[0], entry[1], now)
+                touch = True
+        if entry is not None:
+            if touch:
+                QueryEmbedding.objects.filter(model_name=model_name, text_hash=key).update(last_used_at=timezone.now())
+            return entry[0]
+
+        row = (
+            QueryEmbedding.objects
+            .filter(model_name=model_name, text_hash=key, created_at__gte=self._expires_before())
+            .only('id', 'embedding', 'embedding_dtype', 'embedding_dim', 'created_at')
+            .first()
+        )
+        if row is None:
+            return None
+
+        used_at = timezone.now()
+        QueryEmbedding.objects.filter(pk=row.pk).update(last_used_at=used_at)
+        vector = decode_vector(row.embedding, row.embedding_dtype, row.embedding_dim)
+        self._remember(model_name, key, vector, row.created_at, used_at)
+        return vector
+
+    def set(self, model_name, key, vector):
+        return self.set_many(model_name, [(key, vector)])[0]
+
+    def set_many(self, model_name, items):
+        """[(key, vector), ...] 를 한 번에 저장 (배치 추천용)"""
+        now = timezone.now()
+        vectors = []
+        for key, vector in items:
+            blob, dim = encode_vector(vector, 'float32')
+            QueryEmbedding.objects.update_or_create(
+                model_name=model_name,
+                text_hash=key,
+                defaults={
+                    'embedding': blob,
+                    'embedding_dtype': 'float32',
+                    'embedding_dim': dim,
+                    'created_at': now,
+                    'last_used_at': now,
+                },
+            )
+            vectors.append(decode_vector(blob, 'float32', dim))
+        for (key, _), vector in zip(items, vectors):
+            self._remember(model_name, key, vector, now, now)
+        self._maybe_evict(len(items))
+        return vectors
+
+    def _maybe_evict(self, inserted):
+        # 만료 DELETE + 전체 COUNT 는 저장 EVICT_EVERY 번에 한 번만
+        with self._lock:
+            self._inserts += inserted
+            due = self._inserts >= self.config['EVICT_EVERY']
+            if due:
+                self._inserts = 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        QueryEmbedding.objects.filter(created_at__lt=self._expires_before()).delete()
+        overflow = QueryEmbedding.objects.count() - self.config['MAX_ROWS']
+        if overflow > 0:
+            stale_ids = list(
+                QueryEmbedding.objects.order_by('last_used_at').values_list('id', flat=True)[:overflow]
+            )
+            QueryEmbedding.objects.filter(id__in=stale_ids).delete()
+
+    def clear(self):
+        with self._lock:
+            self.lru.clear()
+        QueryEmbedding.objects.all().delete()
+
+
+query_embedding_cache = QueryEmbeddingCache()
+
+
+def embed_query(text):
+    """
+    사용자 질문 임베딩 (캐시 우선). recommend 뷰와 test_recommend 커맨드가 같이 사용.
+    반환값은 읽기 전용 float32 numpy 배열.
+    """
+    model_name = get_provider().model_name
+    key = text_hash(text)
+
+    vector = query_embedding_cache.get(model_name, key)
+    if vector is None:
+        vector = query_embedding_cache.set(model_name, key, request_embedding(text))
+    return vector
+
+
+def embed_queries(texts):
+    """
+    여러 질문을 한 번에 임베딩 (캐시 우선). 캐시에 없는 질문만 모아 API 를 1번 호출한다.
+    같은 질문이 여러 번 들어오면 한 번만 보낸다. 반환값은 texts 순서의 벡터 리스트.
+    """
+    model_name = get_provider().model_name
+    keys = [text_hash(text) for text in texts]
+
+    found = {}
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key in found or key in missing:
+            continue
+        vector = query_embedding_cache.get(model_name, key)
+        if vector is None:
+            missing[key] = text
+        else:
+            found[key] = vector
+
+    if missing:
+        embeddings = request_embeddings(list(missing.values()))
+        vectors = query_embedding_cache.set_many(model_name, list(zip(missing, embeddings)))
+        found.update(zip(missing, vectors))
+    return [found[key] for key in keys]
@@ -0,0 +1,115 @@
+# back/products/finlife.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# -----------------------------
+# [F03] 금감원 금융상품 API 전체 수집 (상품 종류 x 금융권역 x 페이지, 병렬)
+# -----------------------------
+# 1) (정기예금/적금) x (은행, 저축은행, ...) 조합마다 1페이지를 동시에 요청
+# 2) 1페이지가 도착하는 대로 max_page_no 를 보고 나머지 페이지를 바로 이어서 요청
+# -> 전체 시간 ≒ 1페이지 + 가장 느린 페이지 (페이지 수만큼 더해지지 않음)
+#
+# 세션 하나(커넥션 풀)를 스레드들이 같이 쓰고, 요청마다 timeout,
+# 5xx / 429 / 연결 오류는 urllib3 Retry 로 지수 백오프 재시도.
+
+SUCCESS_CODE = '000'
+
+
+class FinlifeError(Exception):
+    """API 응답 오류 (잘못된 키, 요청 한도 초과 등) 또는 재시도 후에도 실패한 요청"""
+
+
+def build_session(pool_size):
+    finlife = settings.FINLIFE
+    retry = Retry(
+        total=finlife['RETRIES'],
+        backoff_factor=finlife['BACKOFF'],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def fetch_page(session, product_type, group, page, api_key):
+    """한 페이지 요청 -> result dict (baseList / optionList / max_page_no ...)"""
+    finlife = settings.FINLIFE
+    url = f"{finlife['BASE_URL'].rstrip('/')}/{finlife['ENDPOINTS'][product_type]}"
+    params = {'auth': api_key, 'topFinGrpNo': group, 'pageNo': page}
+    try:
+        response = session.get(url, params=params, timeout=finlife['TIMEOUT'])
+        response.raise_for_status()
+        result = response.json()['result']
+    except (requests.RequestException, ValueError, KeyError) as e:
+        raise FinlifeError(f'{product_type} {group} {page}페이지 요청 실패: {e}') from e
+
+    if result.get('err_cd', SUCCESS_CODE) != SUCCESS_CODE:
+        raise FinlifeError(f"{product_type} {group} {page}페이지: {result.get('err_cd')} {result.get('err_msg', '')}")
+    return result
+
+
+class CatalogFetch:
+    """fetch_catalog() 결과: 상품 종류 태그가 붙은 baseList / optionList + 요청 통계"""
+
+    def __init__(self):
+        self.base_list = []
+        self.option_list = []
+        self.pages = 0
+        self._lock = threading.Lock()
+
+    def add(self, product_type, result):
+        with self._lock:
+            self.pages += 1
+            for base in result.get('baseList') or []:
+                self.base_list.append({**base, 'product_type': product_type})
+            self.option_list.extend(result.get('optionList') or [])
+
+
+def fetch_catalog(api_key, product_types=None, groups=None, max_workers=None):
+    """
+    모든 (상품 종류, 권역, 페이지) 를 max_workers 개 스레드로 동시에 요청.
+    하나라도 실패하면 FinlifeError (일부만 수집한 상태로 DB 에 반영하지 않도록)
+    """
+    finlife = settings.FINLIFE
+    product_types = product_types or list(finlife['ENDPOINTS'])
+    groups = groups or finlife['GROUPS']
+    max_workers = max_workers or finlife['MAX_WORKERS']
+
+    fetched = CatalogFetch()
+    with build_session(max_workers) as session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit(product_type, group, page):
+            future = executor.submit(fetch_page, session, product_type, group, page, api_key)
+            pending[future] = (product_type, group, page)
+
+        pending = {}
+        for product_type in product_types:
+            for group in groups:
+                submit(product_type, group, 1)
+
+        try:
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    product_type, group, page = pending.pop(future)
+                    result = future.result()
+                    fetched.add(product_type, result)
+                    # 1페이지를 받으면 나머지 페이지를 바로 요청
+                    if page == 1:
+                        for next_page in range(2, int(result.get('max_page_no') or 1) + 1):
+                            submit(product_type, group, next_page)
+        except FinlifeError:
+            for future in pending:
+                future.cancel()
+            raise
+    return fetched
@@ -0,0 +1,254 @@
+# back/products/ingest.py
+
+import hashlib
+import json
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DepositProducts, DepositOptions, CatalogVersion, CatalogChange
+from .rates import refresh_rate_summaries
+
+
+# -----------------------------
+# [F03] 금감원 API 응답 -> DB 일괄 반영 (get_deposit_products)
+# -----------------------------
+# 상품/옵션마다 exists() + save() 를 하지 않고
+# 1) 기존 행을 한 번에 읽어 메모리 맵(fin_prdt_cd -> 상품, (상품, 기간, 금리유형, 적립유형) -> 옵션)을 만들고
+# 2) 행마다 내용 해시(content_hash)를 비교해서 추가 / 변경 / 삭제를 구분
+# 3) 추가·변경된 행만 bulk_create(update_conflicts=True) 로 upsert,
+#    응답에서 사라진 옵션은 삭제, 사라진 상품은 판매 중지(is_active=False)로 표시
+# 4) 모든 변경을 CatalogChange 에 기록 (후속 작업은 체크포인트 이후 변경만 처리)
+# 까지 하나의 트랜잭션으로 처리한다. (중간에 실패하면 아무것도 반영되지 않음)
+
+PRODUCT_FIELDS = ('product_type', 'kor_co_nm', 'fin_prdt_nm', 'etc_note', 'join_deny', 'join_way', 'spcl_cnd')
+OPTION_KEY_FIELDS = ('product', 'save_trm', 'intr_rate_type_nm', 'rsrv_type_nm')
+OPTION_FIELDS = ('fin_prdt_cd', 'intr_rate', 'intr_rate2')
+BATCH_SIZE = 500
+
+# (대상, 동작) -> SyncResult 의 개수 필드
+_COUNTERS = {
+    (CatalogChange.ENTITY_PRODUCT, CatalogChange.ACTION_ADDED): 'created_products',
+    (CatalogChange.ENTITY_PRODUCT, CatalogChange.ACTION_CHANGED): 'updated_products',
+    (CatalogChange.ENTITY_PRODUCT, CatalogChange.ACTION_REMOVED): 'removed_products',
+    (CatalogChange.ENTITY_OPTION, CatalogChange.ACTION_ADDED): 'created_options',
+    (CatalogChange.ENTITY_OPTION, CatalogChange.ACTION_CHANGED): 'updated_options',
+    (CatalogChange.ENTITY_OPTION, CatalogChange.ACTION_REMOVED): 'deleted_options',
+}
+
+
+@dataclass
+class SyncResult:
+    created_products: int = 0
+    updated_products: int = 0
+    removed_products: int = 0
+    created_options: int = 0
+    updated_options: int = 0
+    deleted_options: int = 0
+    rate_changed_products: int = 0
+    version: int = None
+    # CatalogChange 로 남길 변경 [(fin_prdt_cd, 대상, 동작, detail), ...] - upsert 후 상품 id 로 바꿔서 저장
+    changes: list = field(default_factory=list, repr=False)
+
+    @property
+    def changed(self):
+        return bool(self.changes)
+
+    def record(self, code, entity, action, detail=None):
+        self.changes.append((code, entity, action, detail or {}))
+        counter = _COUNTERS[(entity, action)]
+        setattr(self, counter, getattr(self, counter) + 1)
+
+
+def row_hash(values):
+    # 컬럼 값 dict -> sha256 (키 순서와 상관없이 같은 값이면 같은 해시)
+    return hashlib.sha256(json.dumps(values, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _product_values(base):
+    return {
+        'product_type': base.get('product_type', DepositProducts.PRODUCT_TYPE_DEPOSIT),
+        'kor_co_nm': base['kor_co_nm'],
+        'fin_prdt_nm': base['fin_prdt_nm'],
+        'etc_note': base.get('etc_note') or '',
+        'join_deny': int(base['join_deny']),
+        'join_way': base.get('join_way') or '',
+        'spcl_cnd': base.get('spcl_cnd') or '',
+    }
+
+
+def _option_values(option):
+    # intr_rate가 None인 경우 처리 (API 데이터에 null이 있을 수 있음)
+    return {
+        'fin_prdt_cd': option['fin_prdt_cd'],
+        'intr_rate': option['intr_rate'] if option['intr_rate'] is not None else -1,
+        'intr_rate2': option['intr_rate2'] if option['intr_rate2'] is not None else -1,
+    }
+
+
+def _stored_hash(row, fields):
+    # 해시 컬럼이 생기기 전에 저장된 행은 현재 값으로 계산
+    return row.content_hash or row_hash({f: getattr(row, f) for f in fields})
+
+
+def _changed_fields(row, values):
+    return [f for f, v in values.items() if getattr(row, f) != v]
+
+
+def _sync_products(base_list, remove_missing_types, result, now):
+    existing = {
+        product.fin_prdt_cd: product
+        for product in DepositProducts.objects.only('id', 'fin_prdt_cd', 'content_hash', 'is_active', *PRODUCT_FIELDS)
+    }
+    upserts = {}
+    backfill = []
+    for base in base_list:
+        code = base['fin_prdt_cd']
+        values = _product_values(base)
+        digest = row_hash(values)
+        current = existing.get(code)
+        if current is not None and current.is_active and _stored_hash(current, PRODUCT_FIELDS) == digest:
+            if current.content_hash != digest:
+                current.content_hash = digest
+                backfill.append(current)
+            continue
+        # 같은 코드가 응답에 두 번 있으면 뒤의 값 (upsert 한 번에 같은 키가 두 번 들어가지 않게)
+        if code not in upserts:
+            if current is None or not current.is_active:
+                # 판매 중지였다가 다시 나타난 상품도 추가로 기록
+                result.record(code, CatalogChange.ENTITY_PRODUCT, CatalogChange.ACTION_ADDED)
+            else:
+                result.record(code, CatalogChange.ENTITY_PRODUCT, CatalogChange.ACTION_CHANGED,
+                              {'fields': _changed_fields(current, values)})
+        upserts[code] = DepositProducts(
+            fin_prdt_cd=code, content_hash=digest, is_active=True, deleted_at=None, updated_at=now, **values,
+        )
+
+    if upserts:
+        DepositProducts.objects.bulk_create(
+            upserts.values(),
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=['fin_prdt_cd'],
+            update_fields=[*PRODUCT_FIELDS, 'content_hash', 'is_active', 'deleted_at', 'updated_at'],
+        )
+    if backfill:
+        DepositProducts.objects.bulk_update(backfill, ['content_hash'], batch_size=BATCH_SIZE)
+
+    # 응답에서 사라진 상품 -> 판매 중지 (이번에 수집한 상품 종류만, 가입 내역이 있을 수 있어 삭제하지 않음)
+    if remove_missing_types:
+        codes = {base['fin_prdt_cd'] for base in base_list}
+        removed = [
+            product for code, product in existing.items()
+            if code not in codes and product.is_active and product.product_type in remove_missing_types
+        ]
+        for product in removed:
+            result.record(product.fin_prdt_cd, CatalogChange.ENTITY_PRODUCT, CatalogChange.ACTION_REMOVED)
+        if removed:
+            DepositProducts.objects.filter(id__in=[p.id for p in removed]).update(
+                is_active=False, deleted_at=now, updated_at=now,
+            )
+
+    # upsert 후 id 를 다시 한 번에 읽음 (DB 마다 bulk_create 가 pk 를 채워주는지 다르므로)
+    return dict(DepositProducts.objects.values_list('fin_prdt_cd', 'id')), set(upserts)
+
+
+def _option_detail(key, **extra):
+    _, save_trm, intr_rate_type_nm, rsrv_type_nm = key
+    return {'save_trm': save_trm, 'intr_rate_type_nm': intr_rate_type_nm, 'rsrv_type_nm': rsrv_type_nm, **extra}
+
+
+def _sync_options(option_list, product_ids, synced_products, result):
+    code_of = {pk: code for code, pk in product_ids.items()}
+    existing = {
+        (option.product_id, option.save_trm, option.intr_rate_type_nm, option.rsrv_type_nm): option
+        for option in DepositOptions.objects.filter(product_id__in=synced_products)
+    }
+    upserts = {}
+    backfill = []
+    seen = set()
+    for option in option_list:
+        product_id = product_ids.get(option['fin_prdt_cd'])
+        if product_id is None:
+            # 상품 정보가 없으면 옵션도 저장 불가
+            continue
+        # 적립유형은 적금 옵션에만 있음 (예금은 빈 값)
+        key = (product_id, int(option['save_trm']), option['intr_rate_type_nm'], option.get('rsrv_type_nm') or '')
+        seen.add(key)
+        values = _option_values(option)
+        digest = row_hash(values)
+        current = existing.get(key)
+        if current is not None and _stored_hash(current, OPTION_FIELDS) == digest:
+            if current.content_hash != digest:
+                current.content_hash = digest
+                backfill.append(current)
+            continue
+        if key not in upserts:
+            if current is None:
+                result.record(code_of[product_id], CatalogChange.ENTITY_OPTION, CatalogChange.ACTION_ADDED,
+                              _option_detail(key))
+            else:
+                result.record(code_of[product_id], CatalogChange.ENTITY_OPTION, CatalogChange.ACTION_CHANGED,
+                              _option_detail(key, fields=_changed_fields(current, values)))
+        upserts[key] = DepositOptions(
+            product_id=key[0], save_trm=key[1], intr_rate_type_nm=key[2], rsrv_type_nm=key[3],
+            content_hash=digest, **values,
+        )
+
+    if upserts:
+        DepositOptions.objects.bulk_create(
+            upserts.values(),
+            batch_size=BATCH_SIZE,
+            update_conflicts=True,
+            unique_fields=list(OPTION_KEY_FIELDS),
+            update_fields=[*OPTION_FIELDS, 'content_hash'],
+        )
+    if backfill:
+        DepositOptions.objects.bulk_update(backfill, ['content_hash'], batch_size=BATCH_SIZE)
+
+    # 이번 응답에 상품은 있는데 옵션이 빠졌으면 더 이상 판매하지 않는 옵션 -> 삭제
+    stale = [key for key in existing if key not in seen]
+    for key in stale:
+        result.record(code_of[key[0]], CatalogChange.ENTITY_OPTION, CatalogChange.ACTION_REMOVED, _option_detail(key))
+    if stale:
+        DepositOptions.objects.filter(id__in=[existing[key].id for key in stale]).delete()
+
+    # 금리 요약을 다시 계산해야 하는 상품
+    return {key[0] for key in upserts} | {key[0] for key in stale}
+
+
+def sync_deposit_catalog(base_list, option_list, remove_missing_types=None):
+    """
+    baseList / optionList 를 DB 에 반영 (한 트랜잭션)
+    - remove_missing_types: 이 상품 종류 중 응답에 없는 상품은 판매 중지 처리
+      (일부 권역만 수집할 때는 None 으로 두어야 나머지 상품이 중지되지 않음)
+    - 바뀐 것이 있을 때만 금리 요약 갱신 + 카탈로그 버전 +1 + 변경 이력 기록
+    """
+    result = SyncResult()
+    now = timezone.now()
+    with transaction.atomic():
+        product_ids, upserted_codes = _sync_products(base_list, remove_missing_types, result, now)
+        synced_products = {product_ids[base['fin_prdt_cd']] for base in base_list}
+        touched = _sync_options(option_list, product_ids, synced_products, result)
+        touched |= {product_ids[code] for code in upserted_codes}
+
+        if not result.changed:
+            return result
+
+        # 목록 정렬 / 프로필 / 추천에서 쓰는 최고 금리 요약 (바뀐 상품만)
+        result.rate_changed_products = refresh_rate_summaries(product_ids=touched)
+        # 카탈로그 버전 +1 (목록/상세 응답 캐시, ETag 무효화)
+        result.version = CatalogVersion.bump().version
+
+        CatalogChange.objects.bulk_create(
+            [
+                CatalogChange(
+                    product_id=product_ids[code], entity=entity, action=action, detail=detail,
+                    version=result.version, created_at=now,
+                )
+                for code, entity, action, detail in result.changes
+            ],
+            batch_size=BATCH_SIZE,
+        )
+    return result
@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.stub_api import MODES, StubConfig, make_server
+
+
+class Command(BaseCommand):
+    help = '금감원 API / 임베딩 API 를 녹화하거나 녹화된 응답을 돌려주는 로컬 서버를 띄웁니다. (지연/오류 주입 가능)'
+
+    def add_arguments(self, parser):
+        stub = settings.API_STUB
+        parser.add_argument('--host', default=stub['HOST'])
+        parser.add_argument('--port', type=int, default=stub['PORT'])
+        parser.add_argument('--mode', choices=MODES, default='replay',
+                            help='replay: 녹화만 재생 / record: 실제 API 로 보내고 저장 / auto: 없을 때만 녹화')
+        parser.add_argument('--cassettes', default=str(stub['CASSETTE_DIR']), help='녹화 파일 디렉터리')
+        parser.add_argument('--latency', type=float, default=0.0, help='응답마다 넣을 지연 (초)')
+        parser.add_argument('--jitter', type=float, default=0.0, help='지연에 더할 ± 무작위 폭 (초)')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='503 으로 응답할 확률 (0~1)')
+        parser.add_argument('--seed', type=int, default=None, help='지연/오류 난수 시드 (고정하면 재현 가능)')
+        parser.add_argument('--synthesize', action='store_true',
+                            help='녹화에 없는 문장은 문장 해시로 만든 가짜 임베딩으로 응답')
+        parser.add_argument('--embedding-dim', type=int, default=stub['EMBEDDING_DIM'])
+        parser.add_argument('--verbose', action='store_true', help='요청 로그 출력')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['error_rate'] <= 1:
+            raise CommandError('--error-rate 는 0 이상 1 이하여야 합니다.')
+
+        upstream = settings.API_STUB['UPSTREAM']
+        config = StubConfig(
+            cassette_dir=options['cassettes'],
+            mode=options['mode'],
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            seed=options['seed'],
+            synthesize=options['synthesize'],
+            embedding_dim=options['embedding_dim'],
+            finlife_upstream=upstream['FINLIFE'],
+            embeddings_upstream=upstream['EMBEDDINGS'],
+        )
+        server = make_server(config, host=options['host'], port=options['port'], verbose=options['verbose'])
+        base = f"http://{options['host']}:{server.server_port}"
+        self.stdout.write(f"API 대역 서버 ({options['mode']}) 시작: {base}  녹화 위치: {options['cassettes']}")
+        self.stdout.write(f"  FINLIFE_BASE_URL={base}/finlifeapi")
+        self.stdout.write(f"  EMBEDDING_API_URL={base}/v1/embeddings")
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"종료: {config.stats}")
@@ -0,0 +1,319 @@
+import json
+import os
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from products.ann import IVFIndex
+from products.compression import COMPRESSION_METHODS, QUANTIZE_MODES
+from products.models import DepositProducts, DepositOptions
+from products.recommender import RecommendationIndex, CompressedRecommendationIndex, AnnRecommendationIndex
+
+
+CONFIGS = ('exact_loop', 'vectorized', 'quantized', 'ann')
+INSERT_BLOCK_ROWS = 2000
+# 합성 카탈로그 안에서는 카탈로그 버전이 바뀌지 않으므로 인덱스가 DB 버전을 다시 확인할 필요 없음
+NO_RECHECK = float('inf')
+
+
+def _templates():
+    """
+    합성 상품의 모양 원본: 실제 상품 + 옵션 (DB 가 비어 있으면 예금 1개짜리 기본 모양)
+    [(상품 필드 dict, [옵션 필드 dict, ...]), ...]
+    """
+    product_fields = ['product_type', 'kor_co_nm', 'fin_prdt_nm', 'etc_note', 'join_deny', 'join_way',
+                      'spcl_cnd', 'max_intr_rate', 'max_intr_rate2']
+    option_fields = ['intr_rate_type_nm', 'rsrv_type_nm', 'intr_rate', 'intr_rate2', 'save_trm']
+    templates = [
+        (
+            {name: getattr(product, name) for name in product_fields},
+            [{name: getattr(option, name) for name in option_fields} for option in product.options.all()],
+        )
+        for product in DepositProducts.objects.prefetch_related('options').order_by('id')
+    ]
+    if templates:
+        return templates
+    return [(
+        {'product_type': DepositProducts.PRODUCT_TYPE_DEPOSIT, 'kor_co_nm': '합성은행', 'fin_prdt_nm': '합성 정기예금',
+         'etc_note': '', 'join_deny': 1, 'join_way': '인터넷', 'spcl_cnd': '', 'max_intr_rate': 3.0, 'max_intr_rate2': 3.5},
+        [{'intr_rate_type_nm': '단리', 'rsrv_type_nm': '', 'intr_rate': 3.0, 'intr_rate2': 3.5, 'save_trm': 12}],
+    )]
+
+
+def _create_catalog(templates, seeds, size, noise, rng):
+    """
+    실제 상품 임베딩(seeds)을 중심으로 노이즈를 섞은 임베딩을 가진 상품 size 개 + 옵션을 DB 에 만든다.
+    상품/옵션 값은 templates 를 돌려 쓰고, 임베딩은 실제 저장 형식(PRODUCT_EMBEDDING_DTYPE)으로 저장된다.
+    (호출하는 쪽 트랜잭션을 롤백해서 지움)
+    """
+    dim = seeds.shape[1]
+    for start in range(0, size, INSERT_BLOCK_ROWS):
+        n = min(INSERT_BLOCK_ROWS, size - start)
+        block = seeds[rng.integers(0, len(seeds), n)]
+        block = block + rng.normal(scale=noise / np.sqrt(dim), size=(n, dim)).astype(np.float32)
+
+        products, option_rows = [], []
+        for i in range(n):
+            number = start + i
+            fields, options = templates[number % len(templates)]
+            product = DepositProducts(
+                **{**fields, 'fin_prdt_nm': f"{fields['fin_prdt_nm']} #{number}"},
+                fin_prdt_cd=f'benchmark-{number}',
+            )
+            product.embedding_vector = block[i]
+            products.append(product)
+            option_rows.append(options)
+        DepositProducts.objects.bulk_create(products)
+        DepositOptions.objects.bulk_create([
+            DepositOptions(product=product, fin_prdt_cd=product.fin_prdt_cd, **option)
+            for product, options in zip(products, option_rows)
+            for option in options
+        ])
+
+
+def _fixed_queries(seeds, n_queries, noise, seed):
+    # 실행마다 같은 질문 집합 (seed 고정) -> 결과 JSON 끼리 비교 가능
+    rng = np.random.default_rng(seed + 1)
+    queries = seeds[rng.integers(0, len(seeds), n_queries)]
+    queries = queries + rng.normal(scale=noise / np.sqrt(seeds.shape[1]), size=queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def _ids(results):
+    return [pk for pk, _ in results]
+
+
+class Command(BaseCommand):
+    help = ('실제 상품/옵션 모양으로 만든 합성 카탈로그(100 ~ 100k 상품)를 버리는 임시 DB(migrate 로 생성)에 넣고, '
+            '운영 추천 인덱스 클래스별 지연(p50/p95), 메모리, recall@k 를 측정해 JSON 으로 저장합니다.')
+
+    def add_arguments(self, parser):
+        compression = settings.RECOMMEND['COMPRESSION']
+        parser.add_argument('--sizes', default='100,1000,10000,100000', help='상품 수 목록 (쉼표 구분)')
+        parser.add_argument('--configs', default=','.join(CONFIGS), help=f"측정할 방식 ({', '.join(CONFIGS)})")
+        parser.add_argument('--queries', type=int, default=100, help='질문 수')
+        parser.add_argument('--k', type=int, default=10, help='recall@k 의 k')
+        parser.add_argument('--dim', type=int, default=None, help='임베딩 차원 (기본: DB 임베딩 차원, 작게 주면 앞쪽만 사용)')
+        parser.add_argument('--loop-max-size', type=int, default=1000,
+                            help='exact_loop(상품마다 옵션 집계 쿼리를 보내는 기존 방식)를 측정할 최대 상품 수 (느림)')
+        parser.add_argument('--compression', choices=[m for m in COMPRESSION_METHODS if m],
+                            default=compression['METHOD'] or 'truncate',
+                            help='quantized 방식의 차원 축소 (기본: settings, 꺼져 있으면 truncate)')
+        parser.add_argument('--quantize', choices=[m for m in QUANTIZE_MODES if m],
+                            default=compression['QUANTIZE'] or 'int8',
+                            help='quantized 방식의 양자화 (기본: settings, 꺼져 있으면 int8)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--database', default=None,
+                            help='임시 DB 대신 이 DB 안에서 측정 (트랜잭션 롤백, 측정 동안 쓰기 잠금을 잡음). '
+                                 '추천 인덱스가 default 연결을 읽으므로 default 만 가능')
+        parser.add_argument('--output', default=os.path.join(settings.DATA_DIR, 'benchmark_recommend.json'),
+                            help='결과 JSON 경로 (기본: settings.DATA_DIR)')
+        parser.add_argument('--baseline', default=None, help='이전 결과 JSON (지정하면 p95 / recall 변화를 출력)')
+
+    def handle(self, *args, **options):
+        configs = [c.strip() for c in options['configs'].split(',') if c.strip()]
+        unknown = set(configs) - set(CONFIGS)
+        if unknown:
+            self.stdout.write(self.style.ERROR(f"알 수 없는 방식: {', '.join(sorted(unknown))}"))
+            return
+        sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+        seed = options['seed']
+
+        # 1. 실제 상품 임베딩을 합성 카탈로그의 중심점으로 사용 (없으면 무작위 중심점)
+        seeds = RecommendationIndex(check_seconds=NO_RECHECK).ensure_loaded().matrix
+        if len(seeds) == 0:
+            self.stdout.write(self.style.WARNING("DB 임베딩이 없어 무작위 중심점(64개, 1536차원)을 사용합니다."))
+            seeds = np.random.default_rng(seed).normal(size=(64, options['dim'] or 1536)).astype(np.float32)
+        if options['dim']:
+            seeds = seeds[:, :options['dim']]
+            # 앞쪽 차원이 전부 0 인 임베딩(희소 벡터 등)은 방향이 없으므로 제외
+            seeds = seeds[np.linalg.norm(seeds, axis=1) > 0]
+            if len(seeds) == 0:
+                self.stdout.write(self.style.ERROR("--dim 으로 자르면 남는 임베딩이 없습니다. 더 큰 값을 주세요."))
+                return
+        seeds = seeds / np.linalg.norm(seeds, axis=1, keepdims=True)
+        queries = _fixed_queries(seeds, options['queries'], noise=0.6, seed=seed)
+        templates = _templates()
+
+        # 2. 측정할 DB: 기본은 운영 DB 를 건드리지 않도록 테스트 러너처럼 default 연결을 임시 DB 로 바꿔 끼운다
+        #    (SQLite 는 메모리 DB). 운영 DB 에서 100k 행을 넣고 롤백하면 그동안 SQLite 쓰기 잠금이 잡혀 있음
+        database = options['database']
+        if database is not None and database != DEFAULT_DB_ALIAS:
+            raise CommandError(f"추천 인덱스는 {DEFAULT_DB_ALIAS} 연결을 읽으므로 --database 는 {DEFAULT_DB_ALIAS} 만 가능합니다.")
+        connection = connections[DEFAULT_DB_ALIAS]
+        engine = connection.settings_dict['ENGINE']
+        if database is None:
+            original_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            target = connection.settings_dict['NAME']
+        else:
+            original_name = None
+            target = database
+            self.stdout.write(self.style.WARNING(f"{database} DB 안에서 측정합니다 (측정 동안 쓰기 잠금)."))
+        try:
+            report = self._benchmark(configs, sizes, seeds, queries, templates, options)
+        finally:
+            if original_name is not None:
+                connection.creation.destroy_test_db(original_name, verbosity=0)
+        report['meta']['database'] = {'engine': engine, 'name': str(target), 'throwaway': database is None}
+
+        os.makedirs(os.path.dirname(os.path.abspath(options['output'])), exist_ok=True)
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"결과 저장: {options['output']}"))
+
+        if options['baseline']:
+            self._compare(options['baseline'], report)
+
+    def _benchmark(self, configs, sizes, seeds, queries, templates, options):
+        k, seed = options['k'], options['seed']
+
+        # quantized 는 settings 가 꺼져 있어도 측정하므로 실제로 쓴 설정을 출력/기록
+        compression = {
+            'method': options['compression'],
+            'dim': min(settings.RECOMMEND['COMPRESSION']['DIM'], seeds.shape[1]),
+            'quantize': options['quantize'],
+            'rescore': settings.RECOMMEND['COMPRESSION']['RESCORE'],
+        }
+        if 'quantized' in configs:
+            self.stdout.write(
+                f"quantized 설정: {compression['method']} {compression['dim']}차원 + {compression['quantize']} "
+                f"(settings: METHOD={settings.RECOMMEND['COMPRESSION']['METHOD']}, "
+                f"QUANTIZE={settings.RECOMMEND['COMPRESSION']['QUANTIZE']})"
+            )
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'seed_products': int(len(seeds)),
+                'template_products': len(templates),
+                'dim': int(seeds.shape[1]),
+                'dtype': settings.PRODUCT_EMBEDDING_DTYPE,
+                'queries': int(len(queries)),
+                'k': k,
+                'seed': seed,
+                'compression': compression,
+                'ann_nprobe': settings.RECOMMEND['ANN']['NPROBE'],
+            },
+            'results': [],
+        }
+
+        self.stdout.write(f"{'size':>8} {'config':<12} {'build_ms':>10} {'p50_ms':>9} {'p95_ms':>9} "
+                          f"{'recall':>7} {'index_mb':>9} {'peak_mb':>8} {'rss_mb':>8}")
+        for size in sizes:
+            # 3. 크기마다 합성 카탈로그를 트랜잭션 안에서 만들고 측정 후 롤백 (기존 상품은 그 안에서만 판매 중지로 숨김)
+            with transaction.atomic(), tempfile.TemporaryDirectory() as tmp_dir:
+                DepositProducts.objects.filter(is_active=True).update(is_active=False)
+                _create_catalog(templates, seeds, size, noise=0.6, rng=np.random.default_rng(seed))
+
+                # 정답(recall 기준): 운영 정확 검색 인덱스
+                exact = RecommendationIndex(check_seconds=NO_RECHECK)
+                truth = [set(_ids(exact.search(q, k))) for q in queries]
+
+                for config in configs:
+                    if config == 'exact_loop' and size > options['loop_max_size']:
+                        continue
+                    row = self._run(config, queries, truth, k, compression, exact, tmp_dir)
+                    row['size'] = size
+                    report['results'].append(row)
+                    self.stdout.write(
+                        f"{size:>8} {config:<12} {row['build_ms']:>10.1f} {row['p50_ms']:>9.3f} {row['p95_ms']:>9.3f} "
+                        f"{row['recall']:>7.4f} {row['index_mb']:>9.2f} {row['peak_mb']:>8.1f} {row['rss_mb']:>8.1f}"
+                    )
+                transaction.set_rollback(True)
+        return report
+
+    def _build(self, config, compression, exact, tmp_dir):
+        """방식별 (검색 함수, 인덱스 메모리 bytes) - 검색 함수는 상품 id 리스트를 반환"""
+        if config == 'exact_loop':
+            # 기존 방식: 상품마다 저장된 임베딩으로 코사인 유사도를 하나씩 계산 + 옵션 최고 금리 집계 후 정렬
+            def search(query, k):
+                results = []
+                for p in DepositProducts.objects.filter(is_active=True).prefetch_related('options'):
+                    vector = p.embedding_vector
+                    score = float(np.dot(query, vector) / (np.linalg.norm(query) * np.linalg.norm(vector)))
+                    max_rate = p.options.aggregate(Max('intr_rate2'))['intr_rate2__max']
+                    results.append((p.id, score, max_rate or 0))
+                results.sort(key=lambda x: x[1], reverse=True)
+                return [pk for pk, _, _ in results[:k]]
+            return search, 0
+
+        if config == 'vectorized':
+            index = RecommendationIndex(check_seconds=NO_RECHECK)
+            snapshot = index.ensure_loaded()
+            return (lambda query, k: _ids(index.search(query, k))), snapshot.matrix.nbytes
+
+        if config == 'quantized':
+            index = CompressedRecommendationIndex(
+                method=compression['method'], dim=compression['dim'], quantize=compression['quantize'],
+                rescore=compression['rescore'], check_seconds=NO_RECHECK,
+            )
+            snapshot = index.ensure_loaded()
+            return (lambda query, k: _ids(index.search(query, k))), snapshot.compressed.nbytes
+
+        # ann: build_ann_index 와 같은 설정 (클러스터 sqrt(n), nprobe 는 settings), 파일 저장 -> 로드까지 포함
+        snapshot = exact.ensure_loaded()
+        path = os.path.join(tmp_dir, 'ann_index.npz')
+        IVFIndex.build(snapshot.matrix, snapshot.product_ids).save(path)
+        index = AnnRecommendationIndex(path, settings.RECOMMEND['ANN']['NPROBE'])
+        _, _, ivf, _ = index.ensure_loaded()
+        return (lambda query, k: _ids(index.search(query, k))), ivf.vectors.nbytes + ivf.centroids.nbytes
+
+    def _run(self, config, queries, truth, k, compression, exact, tmp_dir):
+        # 인덱스 생성(DB 로드 포함) + 첫 질문까지의 최대 메모리 할당량 (tracemalloc 은 numpy 할당도 추적)
+        tracemalloc.start()
+        started = time.perf_counter()
+        search, index_bytes = self._build(config, compression, exact, tmp_dir)
+        build_ms = (time.perf_counter() - started) * 1000
+        search(queries[0], k)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies, hits = [], 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            found = search(query, k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            hits += len(expected.intersection(found))
+
+        # ru_maxrss: 리눅스는 KB, macOS 는 bytes (프로세스 전체 최댓값이라 단조 증가)
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss_mb = maxrss / (1024 * 1024) if platform.system() == 'Darwin' else maxrss / 1024
+
+        return {
+            'config': config,
+            'build_ms': round(build_ms, 3),
+            'p50_ms': round(float(np.percentile(latencies, 50)), 4),
+            'p95_ms': round(float(np.percentile(latencies, 95)), 4),
+            'mean_ms': round(float(np.mean(latencies)), 4),
+            'recall': round(hits / max(1, sum(len(t) for t in truth)), 4),
+            'index_mb': round(index_bytes / (1024 * 1024), 3),
+            'peak_mb': round(peak / (1024 * 1024), 3),
+            'rss_mb': round(rss_mb, 1),
+        }
+
+    def _compare(self, path, report):
+        with open(path, encoding='utf-8') as f:
+            baseline = json.load(f)
+        previous = {(r['size'], r['config']): r for r in baseline.get('results', [])}
+
+        self.stdout.write(f"\n기준 결과 대비 ({path})")
+        self.stdout.write(f"{'size':>8} {'config':<12} {'p95 변화':>10} {'recall 변화':>12}")
+        for row in report['results']:
+            before = previous.get((row['size'], row['config']))
+            if before is None:
+                continue
+            p95_change = (row['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0.0
+            self.stdout.write(
+                f"{row['size']:>8} {row['config']:<12} {p95_change:>+9.1f}% {row['recall'] - before['recall']:>+12.4f}"
+            )
@@ -0,0 +1,70 @@
+import json
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from products.ann import IVFIndex, recall_report
+from products.recommender import RecommendationIndex
+
+
+class Command(BaseCommand):
+    help = '추천용 ANN(IVF) 인덱스를 만들어 파일로 저장하고 recall/지연 리포트를 출력합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clusters', type=int, default=None, help='클러스터 수 (기본: sqrt(상품 수))')
+        parser.add_argument('--iterations', type=int, default=20, help='k-means 반복 횟수')
+        parser.add_argument('--eval-queries', type=int, default=200, help='recall 측정용 질문 수')
+        parser.add_argument('--k', type=int, default=10, help='recall@k 의 k')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--skip-report', action='store_true', help='recall/지연 리포트 생략 (예약 실행용)')
+        parser.add_argument('--if-enabled', action='store_true',
+                            help='settings.RECOMMEND["ANN"]["ENABLED"] 가 꺼져 있으면 아무것도 하지 않음')
+
+    def handle(self, *args, **options):
+        ann_settings = settings.RECOMMEND['ANN']
+        # 예약 실행(run_scheduler)이 JobRun 에 남길 처리 건수
+        self.stats = {'count': 0, 'clusters': 0, 'changed': False}
+        if options['if_enabled'] and not ann_settings['ENABLED']:
+            self.stdout.write("ANN 이 꺼져 있어 인덱스를 만들지 않습니다.")
+            return
+
+        # 1. DB 임베딩 -> 정규화 행렬 (정확 검색 인덱스와 같은 로더 사용, 판매 중지 상품 제외)
+        exact = RecommendationIndex()
+        snapshot = exact.ensure_loaded()
+        matrix, product_ids = snapshot.matrix, snapshot.product_ids
+        if len(product_ids) == 0:
+            self.stdout.write(self.style.ERROR("임베딩된 상품이 없습니다. recommendation 커맨드를 먼저 실행하세요."))
+            return
+
+        # 2. k-means 로 클러스터링 후 저장
+        index = IVFIndex.build(matrix, product_ids, n_clusters=options['clusters'],
+                               n_iter=options['iterations'], seed=options['seed'])
+        index.save(ann_settings['PATH'])
+        self.stdout.write(self.style.SUCCESS(
+            f"ANN 인덱스 저장 완료: 상품 {index.meta['count']}개, 클러스터 {index.meta['clusters']}개 -> {ann_settings['PATH']}"
+        ))
+        self.stats = {'count': index.meta['count'], 'clusters': index.meta['clusters'], 'changed': True}
+        if options['skip_report']:
+            return
+
+        # 3. recall / 지연 리포트 (상품 벡터에 노이즈를 섞은 가짜 질문으로 측정)
+        rng = np.random.default_rng(options['seed'])
+        n_queries = min(options['eval_queries'], len(matrix))
+        queries = matrix[rng.choice(len(matrix), n_queries, replace=False)]
+        queries = queries + rng.normal(scale=0.5 / np.sqrt(matrix.shape[1]), size=queries.shape).astype(np.float32)
+        queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+        report = recall_report(index, queries, k=options['k'])
+        report['clusters'] = index.meta['clusters']
+        report['count'] = index.meta['count']
+
+        self.stdout.write(f"정확 검색: {report['exact_ms']:.3f} ms/질문")
+        self.stdout.write(f"{'nprobe':>6} {'recall@' + str(report['k']):>10} {'ms/질문':>10}")
+        for row in report['nprobe']:
+            marker = ' <- 현재 설정' if row['nprobe'] == ann_settings['NPROBE'] else ''
+            self.stdout.write(f"{row['nprobe']:>6} {row['recall']:>10.4f} {row['ms']:>10.3f}{marker}")
+
+        report_path = f"{ann_settings['PATH']}.report.json"
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"리포트 저장: {report_path}"))
@@ -1,74 +1,65 @@
-import requests
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.conf import settings
-from products.models import DepositProducts, DepositOptions
+from products.finlife import FinlifeError, fetch_catalog
+from products.ingest import sync_deposit_catalog
 
 class Command(BaseCommand):
-    help = '금융감독원 API로부터 정기예금 데이터를 수집하여 DB에 저장합니다.'
+    help = '금융감독원 API로부터 정기예금/적금 데이터를 수집하여 DB에 저장합니다.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--types', nargs='+', choices=list(settings.FINLIFE['ENDPOINTS']),
+                            help='수집할 상품 종류 (기본: 전체)')
+        parser.add_argument('--groups', nargs='+', help='수집할 권역 코드 (기본: settings.FINLIFE["GROUPS"])')
+        parser.add_argument('--workers', type=int, help='동시 요청 수 (기본: settings.FINLIFE["MAX_WORKERS"])')
 
     def handle(self, *args, **options):
-        # 1. API URL 및 키 설정
+        # 1. API 키 설정
         api_key = settings.FINLIFE_API_KEY # settings.py에 .env 연동 필요
-        url = f'http://finlife.fss.or.kr/finlifeapi/depositProductsSearch.json?auth={api_key}&topFinGrpNo=020000&pageNo=1'
-
-        # 2. 데이터 요청
-        response = requests.get(url).json()
-        
-        # 👇 [추가] API가 도대체 뭐라고 대답했는지 눈으로 확인해봅시다!
-        print("---------------- API 응답 데이터 ----------------")
-        print(response)
-        print("------------------------------------------------")
-
-        
-        # 3. 응답 데이터 파싱
-        base_list = response['result']['baseList']   # 상품 기본 정보
-        option_list = response['result']['optionList'] # 상품 옵션 정보
 
-        # 4. 상품 기본 정보 저장 (중복 방지: save_product 함수로 분리 추천)
-        for base in base_list:
-            # 이미 존재하는 상품인지 확인 (fin_prdt_cd 기준)
-            if DepositProducts.objects.filter(fin_prdt_cd=base['fin_prdt_cd']).exists():
-                continue # 이미 있으면 건너뜀 (나중에는 업데이트 로직으로 변경 가능)
-
-            product = DepositProducts(
-                fin_prdt_cd=base['fin_prdt_cd'],
-                kor_co_nm=base['kor_co_nm'],
-                fin_prdt_nm=base['fin_prdt_nm'],
-                etc_note=base['etc_note'],
-                join_deny=int(base['join_deny']),
-                join_way=base['join_way'],
-                spcl_cnd=base['spcl_cnd']
+        # 2. (상품 종류 x 권역 x 페이지) 전체를 동시에 요청
+        started = time.perf_counter()
+        try:
+            fetched = fetch_catalog(
+                api_key, product_types=options['types'], groups=options['groups'], max_workers=options['workers'],
             )
-            product.save()
-
-        # 5. 옵션 정보 저장
-        for option in option_list:
-            # 해당 옵션의 부모 상품을 DB에서 찾음
-            try:
-                product = DepositProducts.objects.get(fin_prdt_cd=option['fin_prdt_cd'])
-            except DepositProducts.DoesNotExist:
-                # 상품 정보가 없으면 옵션도 저장 불가
-                continue
-            
-            # 옵션 중복 저장 방지 (상품 + 기간 + 금리유형이 같으면 중복으로 간주)
-            if DepositOptions.objects.filter(
-                product=product, 
-                save_trm=int(option['save_trm']), 
-                intr_rate_type_nm=option['intr_rate_type_nm']
-            ).exists():
-                continue
+        except FinlifeError as e:
+            raise CommandError(f'금감원 API 수집 실패 (DB 는 변경하지 않음): {e}')
+        self.stdout.write(
+            f"API 응답: {fetched.pages}페이지, 상품 {len(fetched.base_list)}개, 옵션 {len(fetched.option_list)}개 "
+            f"({time.perf_counter() - started:.2f}s)"
+        )
 
-            # intr_rate가 None인 경우 처리 (API 데이터에 null이 있을 수 있음)
-            rate = option['intr_rate'] if option['intr_rate'] is not None else -1
-            rate2 = option['intr_rate2'] if option['intr_rate2'] is not None else -1
+        # 3. 상품 / 옵션 upsert + 금리 요약 + 카탈로그 버전 (한 트랜잭션, 검색 색인은 트리거로 동기화)
+        #    이미 있는 상품/옵션도 값이 바뀌었으면 갱신, 응답에서 빠진 옵션은 삭제
+        #    권역 전체를 받았을 때만 응답에 없는 상품을 판매 중지 처리 (일부 권역만 받으면 나머지가 중지되므로)
+        product_types = options['types'] or list(settings.FINLIFE['ENDPOINTS'])
+        remove_missing_types = None if options['groups'] else product_types
+        result = sync_deposit_catalog(fetched.base_list, fetched.option_list, remove_missing_types=remove_missing_types)
 
-            DepositOptions.objects.create(
-                product=product,
-                fin_prdt_cd=option['fin_prdt_cd'],
-                intr_rate_type_nm=option['intr_rate_type_nm'],
-                intr_rate=rate,
-                intr_rate2=rate2,
-                save_trm=int(option['save_trm'])
-            )
+        self.stdout.write(
+            f"상품: 신규 {result.created_products}개 / 변경 {result.updated_products}개 / 판매 중지 {result.removed_products}개, "
+            f"옵션: 신규 {result.created_options}개 / 변경 {result.updated_options}개 / 삭제 {result.deleted_options}개"
+        )
+        # 예약 실행(run_scheduler)이 JobRun 에 남길 처리 건수 (changed 가 False 면 이어지는 작업 생략)
+        self.stats = {
+            'pages': fetched.pages,
+            'products': len(fetched.base_list),
+            'options': len(fetched.option_list),
+            'created_products': result.created_products,
+            'updated_products': result.updated_products,
+            'removed_products': result.removed_products,
+            'created_options': result.created_options,
+            'updated_options': result.updated_options,
+            'deleted_options': result.deleted_options,
+            'changed': result.changed,
+            'version': result.version,
+        }
+        if result.changed:
+            self.stdout.write(f"금리 요약 갱신: 최고 금리가 바뀐 상품 {result.rate_changed_products}개")
+            self.stdout.write(f"카탈로그 버전: v{result.version}")
+        else:
+            self.stdout.write("변경된 상품이 없어 카탈로그 버전을 유지합니다.")
 
-        self.stdout.write(self.style.SUCCESS('정기예금 데이터 수집 완료!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('정기예금/적금 데이터 수집 완료!'))
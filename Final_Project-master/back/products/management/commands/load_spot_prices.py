@@ -11,6 +11,8 @@ class Command(BaseCommand):
         base_dir = settings.BASE_DIR
         gold_file = os.path.join(base_dir, 'Gold_prices.xlsx')
         silver_file = os.path.join(base_dir, 'Silver_prices.xlsx')
+        # 예약 실행(run_scheduler)이 JobRun 에 남길 처리 건수
+        self.stats = {'created': 0, 'errors': 0, 'changed': False}
 
         def load_excel(file_path, item_name):
             try:
@@ -60,9 +62,11 @@ class Command(BaseCommand):
                         )
                         count += 1
                 
+                self.stats['created'] += count
                 self.stdout.write(self.style.SUCCESS(f'✅ {item_name} {count}건 저장 완료!'))
             
             except Exception as e:
+                self.stats['errors'] += 1
                 self.stdout.write(self.style.ERROR(f'🔥 {item_name} 에러: {str(e)}'))
 
         # 파일 실행
@@ -74,4 +78,6 @@ class Command(BaseCommand):
         if os.path.exists(silver_file):
             load_excel(silver_file, 'Silver')
         else:
-            self.stdout.write(self.style.WARNING(f'파일 없음: {silver_file}'))
\ No newline at end of file
+            self.stdout.write(self.style.WARNING(f'파일 없음: {silver_file}'))
+
+        self.stats['changed'] = self.stats['created'] > 0
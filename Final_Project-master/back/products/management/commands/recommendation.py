@@ -1,44 +1,93 @@
-import requests
-import json
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from products.models import DepositProducts
-from django.conf import settings
+from django.utils import timezone
+from products.models import DepositProducts, CatalogVersion, CatalogChange
+from products.embeddings import embed_batches, content_hash
+from products.changes import get_checkpoint, pending_changes, changed_product_ids, advance_checkpoint
+
+# 변경 이력 체크포인트 이름
+CONSUMER = 'recommendation'
+
 
 class Command(BaseCommand):
+    help = '상품 우대조건(spcl_cnd)을 임베딩해서 DB에 저장합니다. (내용이 바뀐 상품만)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64, help='API 요청 1번에 보낼 상품 수')
+        parser.add_argument('--workers', type=int, default=4, help='동시에 보낼 API 요청 수')
+        parser.add_argument('--force', action='store_true', help='바뀌지 않은 상품도 전부 다시 임베딩')
+        parser.add_argument('--full', action='store_true', help='변경 이력과 상관없이 전체 상품을 확인')
+
     def handle(self, *args, **options):
-        # 1. 환경 설정 (Bash의 -H 부분)
-        url = "https://gms.ssafy.io/gmsapi/api.openai.com/v1/embeddings"
-        gms_key = ""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {gms_key}"
-        }
-
-        # 2. DB에서 데이터 가져오기
-        products = DepositProducts.objects.all()
-        
-        self.stdout.write(f"총 {len(products)}개의 상품 임베딩을 시작합니다...")
+        batch_size = options['batch_size']
+        workers = options['workers']
+
+        # 1. DB에서 데이터 가져오기 (임베딩 본문은 읽지 않음, 판매 중지 상품 제외)
+        #    처음 실행이거나 --full/--force 면 전체, 아니면 마지막 체크포인트 이후 추가/변경된 상품만
+        products = DepositProducts.objects.filter(is_active=True).only(
+            'id', 'fin_prdt_nm', 'spcl_cnd', 'embedding_dim', 'embedding_source_hash'
+        ).order_by('id')
+        changes, upto = pending_changes(CONSUMER)
+        if not (options['full'] or options['force'] or get_checkpoint(CONSUMER) is None):
+            products = products.filter(
+                id__in=changed_product_ids(changes, entity=CatalogChange.ENTITY_PRODUCT)
+            )
 
+        # 2. 우대조건이 바뀐 상품만 골라내기
+        # 교육 자료 4권: 텍스트(Input)를 피쳐로 활용 (비어 있으면 API 가 거절하므로 상품명으로 대체)
+        pending = []
         for product in products:
-            # 3. API 전송 데이터 준비 (Bash의 -d 부분)
-            # 교육 자료 4권: 텍스트(Input)를 피쳐로 활용
-            payload = {
-                "model": "text-embedding-3-large",
-                "input": product.spcl_cnd
-            }
-
-            # 4. API 호출 (실제 curl 실행과 동일)
-            response = requests.post(url, headers=headers, json=payload)
-
-            if response.status_code == 200:
-                # 결과에서 숫자 리스트(Embedding)만 쏙 추출
-                embedding = response.json()['data'][0]['embedding']
-                
-                # 5. DB에 영구 저장
+            text = product.spcl_cnd or product.fin_prdt_nm
+            source_hash = content_hash(text)
+            if options['force'] or product.embedding_dim == 0 or product.embedding_source_hash != source_hash:
+                pending.append((product, text, source_hash))
+
+        total = len(products)
+        self.stdout.write(f"총 {total}개 중 {len(pending)}개의 상품 임베딩을 시작합니다...")
+        # 예약 실행(run_scheduler)이 JobRun 에 남길 처리 건수
+        self.stats = {'candidates': total, 'embedded': 0, 'failed': 0, 'changed': False}
+        if not pending:
+            advance_checkpoint(CONSUMER, upto)
+            self.stdout.write(self.style.SUCCESS("바뀐 상품이 없습니다."))
+            return
+
+        # 3. 여러 상품을 묶어서 API 호출 (스레드 풀로 동시에)
+        updated = []
+        failed = 0
+        now = timezone.now()
+        texts = [text for _, text, _ in pending]
+
+        for batch, embeddings, error in embed_batches(pending, texts, batch_size, workers):
+            if error is not None:
+                ids = ', '.join(str(product.id) for product, _, _ in batch)
+                self.stdout.write(self.style.ERROR(f"에러 발생 (상품 {ids}): {error}"))
+                failed += len(batch)
+                continue
+
+            for (product, _, source_hash), embedding in zip(batch, embeddings):
                 product.embedding_vector = embedding
-                product.save()
-                self.stdout.write(self.style.SUCCESS(f"상품 [{product.id}] 임베딩 저장 완료!"))
-            else:
-                self.stdout.write(self.style.ERROR(f"에러 발생: {response.status_code} - {response.text}"))
+                product.embedding_source_hash = source_hash
+                product.updated_at = now
+                updated.append(product)
+            self.stdout.write(f"{len(updated)}/{len(pending)} 임베딩 완료")
+
+        # 4. DB에 한 번에 저장
+        DepositProducts.objects.bulk_update(
+            updated,
+            ['embedding', 'embedding_dtype', 'embedding_dim', 'embedding_source_hash', 'updated_at'],
+            batch_size=500,
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"{len(updated)}개 상품 임베딩 저장 완료! 고생하셨어요!"))
+        self.stats.update(embedded=len(updated), failed=failed, changed=bool(updated))
+
+        # 실패한 상품이 있으면 체크포인트를 그대로 두어 다음 실행 때 다시 시도
+        if not failed:
+            advance_checkpoint(CONSUMER, upto)
 
-        self.stdout.write(self.style.SUCCESS("모든 작업이 끝났습니다! 고생하셨어요!"))
\ No newline at end of file
+        # 5. 카탈로그가 바뀌었으니 (상세 응답의 updated_at 포함) 응답 캐시 버전과 회원 맞춤 추천도 갱신
+        if updated:
+            CatalogVersion.bump()
+            # 이어서 실행하는 커맨드의 출력도 이 커맨드의 stdout/stderr 로 보냄
+            # (예약 실행/테스트가 출력을 버리거나 모을 때 프로세스 stdout 으로 새지 않도록)
+            call_command('refresh_user_recommendations', stdout=self.stdout, stderr=self.stderr)
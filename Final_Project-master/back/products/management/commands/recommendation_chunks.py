@@ -0,0 +1,93 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from products.models import DepositProducts, DepositProductChunk, CatalogVersion
+from products.chunking import product_chunks
+from products.embeddings import embed_batches, content_hash
+
+
+class Command(BaseCommand):
+    help = '우대조건/유의사항을 조건 단위로 나눠 조각별로 임베딩합니다. (바뀐 조각만)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=64, help='API 요청 1번에 보낼 조각 수')
+        parser.add_argument('--workers', type=int, default=4, help='동시에 보낼 API 요청 수')
+        parser.add_argument('--force', action='store_true', help='바뀌지 않은 조각도 전부 다시 임베딩')
+        parser.add_argument('--if-enabled', action='store_true',
+                            help='settings.RECOMMEND["GRANULARITY"] 가 "chunk" 가 아니면 아무것도 하지 않음')
+
+    def handle(self, *args, **options):
+        # 예약 실행(run_scheduler)이 JobRun 에 남길 처리 건수
+        self.stats = {'created': 0, 'updated': 0, 'deleted': 0, 'changed': False}
+        if options['if_enabled'] and settings.RECOMMEND['GRANULARITY'] != 'chunk':
+            self.stdout.write("조각 단위 추천을 쓰지 않아 조각을 임베딩하지 않습니다.")
+            return
+        now = timezone.now()
+
+        # 1. 기존 조각 불러오기 (임베딩 본문은 읽지 않음)
+        existing = {
+            (chunk.product_id, chunk.source, chunk.seq): chunk
+            for chunk in DepositProductChunk.objects.only(
+                'id', 'product_id', 'source', 'seq', 'text', 'embedding_dim', 'embedding_source_hash'
+            )
+        }
+
+        # 2. 상품별로 조각을 다시 나눠서 새로 생겼거나 내용이 바뀐 조각만 골라내기
+        #    (판매 중지 상품은 임베딩하지 않고, 남아 있던 조각은 삭제 대상)
+        products = DepositProducts.objects.filter(is_active=True).only(
+            'id', 'kor_co_nm', 'fin_prdt_nm', 'spcl_cnd', 'etc_note'
+        )
+        pending = []
+        keep = set()
+        for product in products:
+            for source, seq, text in product_chunks(product):
+                key = (product.id, source, seq)
+                keep.add(key)
+                source_hash = content_hash(text)
+                chunk = existing.get(key)
+                if chunk is None:
+                    chunk = DepositProductChunk(product_id=product.id, source=source, seq=seq)
+                elif not options['force'] and chunk.embedding_dim and chunk.embedding_source_hash == source_hash:
+                    continue
+                chunk.text = text
+                pending.append((chunk, source_hash))
+
+        stale_ids = [chunk.id for key, chunk in existing.items() if key not in keep]
+        self.stdout.write(f"임베딩할 조각 {len(pending)}개, 삭제할 조각 {len(stale_ids)}개")
+
+        # 3. 여러 조각을 묶어서 API 호출 (스레드 풀로 동시에)
+        created, updated = [], []
+        texts = [chunk.text for chunk, _ in pending]
+        for batch, embeddings, error in embed_batches(pending, texts, options['batch_size'], options['workers']):
+            if error is not None:
+                self.stdout.write(self.style.ERROR(f"에러 발생 ({len(batch)}개 조각): {error}"))
+                continue
+
+            for (chunk, source_hash), embedding in zip(batch, embeddings):
+                chunk.embedding_vector = embedding
+                chunk.embedding_source_hash = source_hash
+                chunk.updated_at = now
+                (updated if chunk.pk else created).append(chunk)
+            self.stdout.write(f"{len(created) + len(updated)}/{len(pending)} 임베딩 완료")
+
+        # 4. DB에 한 번에 반영
+        with transaction.atomic():
+            DepositProductChunk.objects.filter(id__in=stale_ids).delete()
+            DepositProductChunk.objects.bulk_create(created, batch_size=500)
+            DepositProductChunk.objects.bulk_update(
+                updated,
+                ['text', 'embedding', 'embedding_dtype', 'embedding_dim', 'embedding_source_hash', 'updated_at'],
+                batch_size=500,
+            )
+            # 조각 단위 추천 인덱스가 다시 로드하도록 카탈로그 버전 +1
+            if created or updated or stale_ids:
+                CatalogVersion.bump()
+
+        self.stats = {
+            'created': len(created), 'updated': len(updated), 'deleted': len(stale_ids),
+            'changed': bool(created or updated or stale_ids),
+        }
+        self.stdout.write(self.style.SUCCESS(
+            f"조각 임베딩 완료! (신규 {len(created)}, 변경 {len(updated)}, 삭제 {len(stale_ids)})"
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from products.models import CatalogVersion
+from products.rates import refresh_rate_summaries
+
+
+class Command(BaseCommand):
+    help = '옵션 금리로 상품별 / 상품+기간별 최고 금리 요약을 다시 계산합니다. (loaddata 등으로 옵션을 직접 넣은 뒤 실행)'
+
+    def handle(self, *args, **options):
+        changed = refresh_rate_summaries()
+        if changed:
+            CatalogVersion.bump()
+        self.stdout.write(self.style.SUCCESS(f"금리 요약 갱신 완료! (최고 금리가 바뀐 상품 {changed}개)"))
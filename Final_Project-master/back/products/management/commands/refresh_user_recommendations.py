@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from products.embeddings import EmbeddingError
+from products.personalize import refresh_user_recommendations
+
+
+class Command(BaseCommand):
+    help = '회원 맞춤 추천(UserRecommendation)을 다시 계산합니다. (프로필이나 카탈로그가 바뀐 회원만)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.RECOMMEND['PERSONAL']['REFRESH_BATCH_SIZE'],
+                            help='한 번에 계산할 회원 수 (임베딩 API 1번 호출)')
+        parser.add_argument('--force', action='store_true', help='바뀌지 않은 회원도 전부 다시 계산')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        batch_size = max(1, options['batch_size'])
+        user_ids = list(User.objects.filter(is_active=True).order_by('id').values_list('id', flat=True))
+
+        refreshed, failed = 0, 0
+        for start in range(0, len(user_ids), batch_size):
+            users = User.objects.filter(id__in=user_ids[start:start + batch_size]).order_by('id')
+            try:
+                refreshed += refresh_user_recommendations(users, force=options['force'])
+            except EmbeddingError as e:
+                failed += len(users)
+                self.stdout.write(self.style.ERROR(f"에러 발생 (회원 {start + 1}~{start + batch_size}번째): {e}"))
+
+        # 예약 실행(run_scheduler)이 JobRun 에 남길 처리 건수
+        self.stats = {'users': len(user_ids), 'refreshed': refreshed, 'failed': failed, 'changed': refreshed > 0}
+
+        self.stdout.write(self.style.SUCCESS(f"회원 {len(user_ids)}명 중 {refreshed}명의 맞춤 추천을 갱신했습니다."))
@@ -0,0 +1,48 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from products.models import JobRun
+from products.scheduler import make_owner, run_job, run_pending
+
+
+class Command(BaseCommand):
+    help = '카탈로그 수집 -> 추천 갱신, 금/은 시세 적재를 주기적으로 실행합니다. (웹 서버와 별도 프로세스)'
+
+    def add_arguments(self, parser):
+        jobs = list(settings.SCHEDULER['JOBS'])
+        parser.add_argument('--jobs', nargs='+', choices=jobs, help='주기 실행할 작업 (기본: 전체)')
+        parser.add_argument('--run', choices=jobs, help='주기와 상관없이 이 작업을 지금 한 번 실행하고 종료')
+        parser.add_argument('--once', action='store_true', help='지금 실행할 차례인 작업만 한 번 실행하고 종료')
+        parser.add_argument('--poll', type=int, default=settings.SCHEDULER['POLL_SECONDS'],
+                            help='실행할 작업이 있는지 확인하는 간격 (초)')
+
+    def handle(self, *args, **options):
+        if options['poll'] <= 0:
+            raise CommandError('--poll 은 1 이상이어야 합니다.')
+
+        owner = make_owner()
+        log = self.stdout.write
+
+        # 1. 수동 실행 (연쇄 작업까지)
+        if options['run']:
+            runs = run_job(options['run'], trigger=JobRun.TRIGGER_MANUAL, owner=owner, log=log)
+            if not runs:
+                raise CommandError(f"{options['run']}: 다른 인스턴스가 실행 중입니다.")
+            if any(run.status == JobRun.STATUS_FAILED for run in runs):
+                raise CommandError(f"{options['run']}: 실패한 작업이 있습니다. (JobRun 기록 확인)")
+            return
+
+        # 2. 주기 실행
+        if options['once']:
+            run_pending(options['jobs'], owner=owner, log=log)
+            return
+
+        self.stdout.write(f"스케줄러 시작 ({owner}), {options['poll']}초마다 확인")
+        try:
+            while True:
+                run_pending(options['jobs'], owner=owner, log=log)
+                time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write("스케줄러 종료")
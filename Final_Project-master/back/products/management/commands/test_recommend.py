@@ -1,14 +1,7 @@
-import requests
-import numpy as np
 from django.core.management.base import BaseCommand
 from products.models import DepositProducts
-from django.conf import settings
-
-# [교육자료 4권] 코사인 유사도: 두 벡터의 '방향'이 얼마나 일치하는지 계산
-def cosine_similarity_manual(v1, v2):
-    v1 = np.array(v1)
-    v2 = np.array(v2)
-    return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+from products.embeddings import embed_query, EmbeddingError
+from products.recommender import get_recommendation_index
 
 class Command(BaseCommand):
     def handle(self, *args, **options):
@@ -17,33 +10,26 @@ class Command(BaseCommand):
         self.stdout.write(f"사용자 입력: '{user_input}'\n")
 
         # 2. GMS API 호출 (사용자 입력을 숫자로 변환하는 과정 - 필수!)
-        url = "https://gms.ssafy.io/gmsapi/api.openai.com/v1/embeddings"
-        gms_key = ""
-        headers = {"Content-Type": "application/json", "Authorization": f"Bearer {gms_key}"}
-        payload = {"model": "text-embedding-3-large", "input": user_input}
-
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code == 200:
+        #    같은 질문은 recommend API 와 같은 캐시를 사용하므로 API 를 다시 부르지 않음
+        try:
             # 드디어 'user_vector'가 탄생했습니다!
-            user_vector = response.json()['data'][0]['embedding']
-        else:
-            self.stdout.write(self.style.ERROR(f"API 에러: {response.text}"))
+            user_vector = embed_query(user_input)
+        except EmbeddingError as e:
+            self.stdout.write(self.style.ERROR(f"API 에러: {e}"))
             return
 
-        # 3. DB에서 상품 정보 가져오기
-        products = DepositProducts.objects.exclude(embedding_vector__isnull=True)
-        results = []
-
-        for product in products:
-            # 이미 저장된 상품 벡터와 지금 만든 사용자 벡터 비교
-            sim_score = cosine_similarity_manual(user_vector, product.embedding_vector)
-            results.append((product.fin_prdt_nm, sim_score, product.kor_co_nm))
-
-        # 4. 유사도 높은 순으로 정렬
-        results.sort(key=lambda x: x[1], reverse=True)
+        # 3. [교육자료 4권] 코사인 유사도: 두 벡터의 '방향'이 얼마나 일치하는지 계산
+        #    recommend API 와 같은 인덱스 사용 (판매 중지 상품 제외, 차원이 다른 임베딩은 비교하지 않음)
+        top = get_recommendation_index().search(user_vector, k=3)
+        if not top:
+            self.stdout.write(self.style.WARNING(
+                "비교할 상품 임베딩이 없습니다. (임베딩 제공자를 바꿨다면 recommendation --force 로 다시 만드세요)"
+            ))
+            return
+        products = DepositProducts.objects.only('fin_prdt_nm', 'kor_co_nm').in_bulk([pk for pk, _ in top])
 
-        # 5. 결과 출력
+        # 4. 결과 출력 (유사도 높은 순)
         self.stdout.write(self.style.SUCCESS("--- 추천 결과 TOP 3 ---"))
-        for i, (name, score, bank) in enumerate(results[:3]):
-            self.stdout.write(f"{i+1}위: [{bank}] {name} (유사도: {score:.4f})")
\ No newline at end of file
+        for i, (pk, score) in enumerate(top):
+            product = products[pk]
+            self.stdout.write(f"{i+1}위: [{product.kor_co_nm}] {product.fin_prdt_nm} (유사도: {score:.4f})")
\ No newline at end of file
@@ -0,0 +1,59 @@
+# [F09] embedding_vector(JSON) -> embedding(raw float32 bytes) 변환
+
+import numpy as np
+from django.db import migrations, models
+
+
+def json_to_binary(apps, schema_editor):
+    DepositProducts = apps.get_model('products', 'DepositProducts')
+    changed = []
+    for product in DepositProducts.objects.exclude(embedding_vector__isnull=True).only('id', 'embedding_vector'):
+        if not product.embedding_vector:
+            continue
+        array = np.asarray(product.embedding_vector, dtype='<f4')
+        product.embedding = array.tobytes()
+        product.embedding_dtype = 'float32'
+        product.embedding_dim = int(array.shape[0])
+        changed.append(product)
+    DepositProducts.objects.bulk_update(changed, ['embedding', 'embedding_dtype', 'embedding_dim'], batch_size=100)
+
+
+def binary_to_json(apps, schema_editor):
+    DepositProducts = apps.get_model('products', 'DepositProducts')
+    dtypes = {'float32': '<f4', 'float16': '<f2'}
+    changed = []
+    for product in DepositProducts.objects.exclude(embedding__isnull=True).only('id', 'embedding', 'embedding_dtype'):
+        array = np.frombuffer(product.embedding, dtype=dtypes.get(product.embedding_dtype, '<f4'))
+        product.embedding_vector = array.astype(float).tolist()
+        changed.append(product)
+    DepositProducts.objects.bulk_update(changed, ['embedding_vector'], batch_size=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_depositproducts_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='depositproducts',
+            name='embedding',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='embedding_dtype',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='embedding_dim',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(json_to_binary, binary_to_json),
+        migrations.RemoveField(
+            model_name='depositproducts',
+            name='embedding_vector',
+        ),
+    ]
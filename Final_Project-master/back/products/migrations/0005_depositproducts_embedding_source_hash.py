@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_queryembedding'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='depositproducts',
+            name='embedding_source_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:42
+
+import django.db.models.deletion
+import django.utils.timezone
+import products.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_depositproducts_embedding_source_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepositProductChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=20)),
+                ('seq', models.IntegerField()),
+                ('text', models.TextField()),
+                ('embedding', models.BinaryField(blank=True, null=True)),
+                ('embedding_dtype', models.CharField(blank=True, default='', max_length=10)),
+                ('embedding_dim', models.IntegerField(default=0)),
+                ('embedding_source_hash', models.CharField(blank=True, default='', max_length=64)),
+                ('updated_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='products.depositproducts')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'source', 'seq'), name='unique_product_chunk')],
+            },
+            bases=(products.models.EmbeddingVectorMixin, models.Model),
+        ),
+    ]
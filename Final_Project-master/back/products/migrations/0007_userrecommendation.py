@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:52
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_depositproductchunk'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.IntegerField()),
+                ('score', models.FloatField()),
+                ('similarity', models.FloatField()),
+                ('max_rate', models.FloatField(default=0)),
+                ('profile_hash', models.CharField(max_length=64)),
+                ('catalog_count', models.IntegerField(default=0)),
+                ('catalog_updated_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.depositproducts')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deposit_recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'rank'), name='unique_user_recommendation_rank')],
+            },
+        ),
+    ]
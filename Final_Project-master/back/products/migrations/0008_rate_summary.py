@@ -0,0 +1,75 @@
+# [F03] 상품별 / 상품+기간별 최고 금리 요약 컬럼, 테이블 + 기존 옵션으로 채우기
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_rate_summaries(apps, schema_editor):
+    DepositProducts = apps.get_model('products', 'DepositProducts')
+    DepositOptions = apps.get_model('products', 'DepositOptions')
+    DepositRateSummary = apps.get_model('products', 'DepositRateSummary')
+
+    per_term = list(
+        DepositOptions.objects
+        .values('product_id', 'save_trm')
+        .annotate(max_intr_rate=Max('intr_rate'), max_intr_rate2=Max('intr_rate2'))
+        .order_by('product_id', 'save_trm')
+    )
+    DepositRateSummary.objects.bulk_create([DepositRateSummary(**row) for row in per_term], batch_size=500)
+
+    per_product = {
+        row['product_id']: row
+        for row in DepositOptions.objects
+        .values('product_id')
+        .annotate(max_intr_rate=Max('intr_rate'), max_intr_rate2=Max('intr_rate2'))
+        .order_by()
+    }
+    changed = []
+    for product in DepositProducts.objects.only('id'):
+        row = per_product.get(product.id)
+        if row is None:
+            continue
+        product.max_intr_rate, product.max_intr_rate2 = row['max_intr_rate'], row['max_intr_rate2']
+        changed.append(product)
+    DepositProducts.objects.bulk_update(changed, ['max_intr_rate', 'max_intr_rate2'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_userrecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='depositproducts',
+            name='max_intr_rate',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='max_intr_rate2',
+            field=models.FloatField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='depositproducts',
+            name='kor_co_nm',
+            field=models.TextField(db_index=True),
+        ),
+        migrations.CreateModel(
+            name='DepositRateSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('save_trm', models.IntegerField()),
+                ('max_intr_rate', models.FloatField(blank=True, null=True)),
+                ('max_intr_rate2', models.FloatField(blank=True, null=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_summaries', to='products.depositproducts')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['save_trm', 'product'], name='rate_summary_trm_product')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'save_trm'), name='unique_rate_summary')],
+            },
+        ),
+        migrations.RunPython(fill_rate_summaries, migrations.RunPython.noop),
+    ]
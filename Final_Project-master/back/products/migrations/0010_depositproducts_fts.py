@@ -0,0 +1,69 @@
+# [F03] 상품 전문 검색용 SQLite FTS5 테이블 (trigram 토크나이저, 한국어 부분 일치, SQLite 3.34+)
+# 마이그레이션은 만들어진 시점 그대로 재현돼야 하므로 products.search 를 import 하지 않고 SQL 을 여기에 고정
+
+from django.db import migrations
+
+CREATE_FTS = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_depositproducts_fts USING fts5(
+        kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way,
+        content='products_depositproducts', content_rowid='id', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_ai AFTER INSERT ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES (new.id, new.kor_co_nm, new.fin_prdt_nm, new.spcl_cnd, new.etc_note, new.join_way);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_ad AFTER DELETE ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(products_depositproducts_fts, rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES ('delete', old.id, old.kor_co_nm, old.fin_prdt_nm, old.spcl_cnd, old.etc_note, old.join_way);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_au
+    AFTER UPDATE OF kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(products_depositproducts_fts, rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES ('delete', old.id, old.kor_co_nm, old.fin_prdt_nm, old.spcl_cnd, old.etc_note, old.join_way);
+        INSERT INTO products_depositproducts_fts(rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES (new.id, new.kor_co_nm, new.fin_prdt_nm, new.spcl_cnd, new.etc_note, new.join_way);
+    END
+    """,
+    # 이미 있는 상품 색인
+    "INSERT INTO products_depositproducts_fts(products_depositproducts_fts) VALUES ('rebuild')",
+]
+
+DROP_FTS = [
+    "DROP TRIGGER IF EXISTS products_depositproducts_fts_ai",
+    "DROP TRIGGER IF EXISTS products_depositproducts_fts_ad",
+    "DROP TRIGGER IF EXISTS products_depositproducts_fts_au",
+    "DROP TABLE IF EXISTS products_depositproducts_fts",
+]
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 는 SQLite 전용 (다른 DB 에서는 검색이 icontains 로 동작)
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in CREATE_FTS:
+        schema_editor.execute(sql)
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in DROP_FTS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
@@ -0,0 +1,40 @@
+# [F03] 옵션 upsert 키: (상품, 기간, 금리유형) 유니크 제약
+# 제약을 걸기 전에 같은 키의 중복 옵션은 먼저 저장된 것(id 가 가장 작은 것)만 남긴다
+# (예전 수집 로직도 이미 있는 옵션은 건너뛰었으므로 먼저 저장된 행이 기준)
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_options(apps, schema_editor):
+    DepositOptions = apps.get_model('products', 'DepositOptions')
+
+    duplicates = (
+        DepositOptions.objects
+        .values('product_id', 'save_trm', 'intr_rate_type_nm')
+        .annotate(keep_id=Min('id'), count=Count('id'))
+        .filter(count__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        (
+            DepositOptions.objects
+            .filter(product_id=row['product_id'], save_trm=row['save_trm'], intr_rate_type_nm=row['intr_rate_type_nm'])
+            .exclude(id=row['keep_id'])
+            .delete()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_depositproducts_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_options, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='depositoptions',
+            constraint=models.UniqueConstraint(fields=('product', 'save_trm', 'intr_rate_type_nm'), name='unique_deposit_option'),
+        ),
+    ]
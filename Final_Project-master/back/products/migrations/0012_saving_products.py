@@ -0,0 +1,68 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:10
+# [F03] 적금 상품 수집: 상품 종류(product_type) + 옵션 적립유형(rsrv_type_nm), 옵션 upsert 키에 적립유형 추가
+
+from django.db import migrations, models
+
+# SQLite 는 컬럼 추가 시 상품 테이블을 다시 만들면서 검색 트리거가 사라지므로 다시 생성
+# (행 id 와 검색 컬럼 값은 그대로 복사되므로 FTS 색인은 유지됨, 재색인 불필요)
+# 마이그레이션은 만들어진 시점 그대로 재현돼야 하므로 products.search 를 import 하지 않고 SQL 을 여기에 고정
+RECREATE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_ai AFTER INSERT ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES (new.id, new.kor_co_nm, new.fin_prdt_nm, new.spcl_cnd, new.etc_note, new.join_way);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_ad AFTER DELETE ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(products_depositproducts_fts, rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES ('delete', old.id, old.kor_co_nm, old.fin_prdt_nm, old.spcl_cnd, old.etc_note, old.join_way);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_au
+    AFTER UPDATE OF kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(products_depositproducts_fts, rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES ('delete', old.id, old.kor_co_nm, old.fin_prdt_nm, old.spcl_cnd, old.etc_note, old.join_way);
+        INSERT INTO products_depositproducts_fts(rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES (new.id, new.kor_co_nm, new.fin_prdt_nm, new.spcl_cnd, new.etc_note, new.join_way);
+    END
+    """,
+]
+
+
+def recreate_fts_triggers(apps, schema_editor):
+    # 검색 테이블(0010)은 SQLite 에만 있음
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in RECREATE_FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_depositoptions_unique'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='depositoptions',
+            name='unique_deposit_option',
+        ),
+        migrations.AddField(
+            model_name='depositoptions',
+            name='rsrv_type_nm',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='product_type',
+            field=models.CharField(choices=[('deposit', '정기예금'), ('saving', '적금')], db_index=True, default='deposit', max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='depositoptions',
+            constraint=models.UniqueConstraint(fields=('product', 'save_trm', 'intr_rate_type_nm', 'rsrv_type_nm'), name='unique_deposit_option'),
+        ),
+        migrations.RunPython(recreate_fts_triggers, migrations.RunPython.noop),
+    ]
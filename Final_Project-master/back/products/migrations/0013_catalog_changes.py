@@ -0,0 +1,93 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:13
+# [F03] 수집 내용 해시, 상품 소프트 삭제, 카탈로그 변경 이력 + 소비자 체크포인트
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+# SQLite 는 컬럼 추가 시 상품 테이블을 다시 만들면서 검색 트리거가 사라지므로 다시 생성
+# (행 id 와 검색 컬럼 값은 그대로 복사되므로 FTS 색인은 유지됨, 재색인 불필요)
+# 마이그레이션은 만들어진 시점 그대로 재현돼야 하므로 products.search 를 import 하지 않고 SQL 을 여기에 고정
+RECREATE_FTS_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_ai AFTER INSERT ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES (new.id, new.kor_co_nm, new.fin_prdt_nm, new.spcl_cnd, new.etc_note, new.join_way);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_ad AFTER DELETE ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(products_depositproducts_fts, rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES ('delete', old.id, old.kor_co_nm, old.fin_prdt_nm, old.spcl_cnd, old.etc_note, old.join_way);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_depositproducts_fts_au
+    AFTER UPDATE OF kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way ON products_depositproducts BEGIN
+        INSERT INTO products_depositproducts_fts(products_depositproducts_fts, rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES ('delete', old.id, old.kor_co_nm, old.fin_prdt_nm, old.spcl_cnd, old.etc_note, old.join_way);
+        INSERT INTO products_depositproducts_fts(rowid, kor_co_nm, fin_prdt_nm, spcl_cnd, etc_note, join_way)
+        VALUES (new.id, new.kor_co_nm, new.fin_prdt_nm, new.spcl_cnd, new.etc_note, new.join_way);
+    END
+    """,
+]
+
+
+def recreate_fts_triggers(apps, schema_editor):
+    # 검색 테이블(0010)은 SQLite 에만 있음
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for sql in RECREATE_FTS_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_saving_products'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumerCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_change_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='depositoptions',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='depositproducts',
+            name='is_active',
+            field=models.BooleanField(db_index=True, default=True),
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('product', '상품'), ('option', '옵션')], max_length=10)),
+                ('action', models.CharField(choices=[('added', '추가'), ('changed', '변경'), ('removed', '삭제')], max_length=10)),
+                ('detail', models.JSONField(blank=True, default=dict)),
+                ('version', models.IntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='changes', to='products.depositproducts')),
+            ],
+        ),
+        migrations.RunPython(recreate_fts_triggers, migrations.RunPython.noop),
+    ]
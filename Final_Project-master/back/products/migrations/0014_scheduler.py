@@ -0,0 +1,45 @@
+# Generated by Django 5.2.9 on 2026-10-18 12:17
+# [F03] 예약 작업 단일 실행 잠금(JobLock) + 실행 기록(JobRun)
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_catalog_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('owner', models.CharField(max_length=100)),
+                ('acquired_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('expires_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='JobRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('job', models.CharField(max_length=50)),
+                ('trigger', models.CharField(choices=[('schedule', '주기 실행'), ('chain', '선행 작업 후 실행'), ('manual', '수동 실행')], default='schedule', max_length=10)),
+                ('status', models.CharField(choices=[('running', '실행 중'), ('succeeded', '성공'), ('failed', '실패')], default='running', max_length=10)),
+                ('owner', models.CharField(blank=True, default='', max_length=100)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, null=True)),
+                ('stats', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True, default='')),
+                ('parent', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='children', to='products.jobrun')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['job', '-started_at'], name='job_run_job_started')],
+            },
+        ),
+    ]
@@ -1,10 +1,45 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
+
+from .vectors import encode_vector, decode_vector
+
+
+class EmbeddingVectorMixin:
+    # [F09] embedding(bytes) <-> numpy 배열 접근자 (embedding / embedding_dtype / embedding_dim 필드 필요)
+    @property
+    def embedding_vector(self):
+        # 복사 없는 numpy view (읽기 전용)
+        if self.embedding is None:
+            return None
+        return decode_vector(self.embedding, self.embedding_dtype or 'float32', self.embedding_dim)
+
+    @embedding_vector.setter
+    def embedding_vector(self, vector):
+        if vector is None:
+            self.embedding, self.embedding_dtype, self.embedding_dim = None, '', 0
+            return
+        dtype_name = settings.PRODUCT_EMBEDDING_DTYPE
+        self.embedding, self.embedding_dim = encode_vector(vector, dtype_name)
+        self.embedding_dtype = dtype_name
+
+
+class DepositProducts(EmbeddingVectorMixin, models.Model):
+    # [F03] 상품 종류 (정기예금 / 적금) - 금감원 API 의 depositProductsSearch / savingProductsSearch
+    PRODUCT_TYPE_DEPOSIT = 'deposit'
+    PRODUCT_TYPE_SAVING = 'saving'
+    PRODUCT_TYPE_CHOICES = [
+        (PRODUCT_TYPE_DEPOSIT, '정기예금'),
+        (PRODUCT_TYPE_SAVING, '적금'),
+    ]
 
-class DepositProducts(models.Model):
     # 금융 상품 코드 (중복 방지를 위한 핵심 키)
     fin_prdt_cd = models.TextField(unique=True) 
-    # 금융 회사명 (예: 우리은행)
-    kor_co_nm = models.TextField()
+    product_type = models.CharField(
+        max_length=10, choices=PRODUCT_TYPE_CHOICES, default=PRODUCT_TYPE_DEPOSIT, db_index=True,
+    )
+    # 금융 회사명 (예: 우리은행) - 은행 필터/정렬용 인덱스
+    kor_co_nm = models.TextField(db_index=True)
     # 상품명 (예: WON플러스 예금)
     fin_prdt_nm = models.TextField()
     # 기타 유의사항
@@ -16,8 +51,34 @@ class DepositProducts(models.Model):
     # 우대 조건
     spcl_cnd = models.TextField()
 
+    # [F03] 옵션들 중 최고 기본금리 / 최고 우대금리 (정렬용 요약, get_deposit_products 가 갱신)
+    max_intr_rate = models.FloatField(null=True, blank=True, db_index=True)
+    max_intr_rate2 = models.FloatField(null=True, blank=True, db_index=True)
+
     # [F09] 추가: AI가 만든 숫자를 저장할 공간!
-    embedding_vector = models.JSONField(null=True, blank=True)
+    # JSON 텍스트 대신 little-endian raw bytes 로 저장 (dtype/차원 같이 기록)
+    embedding = models.BinaryField(null=True, blank=True)
+    embedding_dtype = models.CharField(max_length=10, blank=True, default='')
+    embedding_dim = models.IntegerField(default=0)
+    # 임베딩을 만들 때 사용한 spcl_cnd 의 해시 (바뀌지 않았으면 재임베딩 생략)
+    embedding_source_hash = models.CharField(max_length=64, blank=True, default='')
+
+    # [F03] 수집한 내용(상품 정보 컬럼)의 해시 - 값이 같으면 변경 없음으로 보고 건너뜀
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    # [F03] 금감원 API 응답에서 사라진 상품은 지우지 않고 판매 중지로 표시 (가입 내역/추천 이력 보존)
+    is_active = models.BooleanField(default=True, db_index=True)
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    # [F09] 마지막 수정 시각 (추천 인덱스가 카탈로그 변경을 감지하는 기준)
+    # fixture(loaddata)에는 없는 값이라 auto_now 대신 default + save()에서 갱신
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    def save(self, *args, **kwargs):
+        self.updated_at = timezone.now()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.fin_prdt_nm
@@ -30,15 +91,72 @@ class DepositOptions(models.Model):
     fin_prdt_cd = models.TextField()
     # 저축 금리 유형 (S: 단리, M: 복리)
     intr_rate_type_nm = models.CharField(max_length=100)
+    # [F03] 적립 유형 (적금만: 자유적립식 / 정액적립식, 예금은 빈 값)
+    rsrv_type_nm = models.CharField(max_length=100, blank=True, default='')
     # 저축 금리 (기본 금리)
     intr_rate = models.FloatField(null=True) 
     # 최고 우대 금리
     intr_rate2 = models.FloatField(null=True)
     # 저축 기간 (6, 12, 24, 36개월)
     save_trm = models.IntegerField()
+    # [F03] 수집한 내용(금리 등)의 해시
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            # [F03] 상품 + 기간 + 금리유형 + 적립유형이 같으면 같은 옵션 (수집 시 upsert 키)
+            models.UniqueConstraint(
+                fields=['product', 'save_trm', 'intr_rate_type_nm', 'rsrv_type_nm'], name='unique_deposit_option',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.product.fin_prdt_nm} - {self.save_trm}개월"
+
+
+class DepositRateSummary(models.Model):
+    # [F03] 상품 + 기간별 최고 금리 요약 (기간 필터 + 금리 정렬을 옵션 집계 없이 처리)
+    product = models.ForeignKey(DepositProducts, on_delete=models.CASCADE, related_name='rate_summaries')
+    save_trm = models.IntegerField()
+    max_intr_rate = models.FloatField(null=True, blank=True)
+    max_intr_rate2 = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'save_trm'], name='unique_rate_summary'),
+        ]
+        indexes = [
+            models.Index(fields=['save_trm', 'product'], name='rate_summary_trm_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.save_trm}개월"
+
+
+class DepositProductChunk(EmbeddingVectorMixin, models.Model):
+    # [F09] 우대조건/유의사항을 조건 단위로 나눈 조각 + 조각별 임베딩
+    product = models.ForeignKey(DepositProducts, on_delete=models.CASCADE, related_name='chunks')
+    # 원본 컬럼 (spcl_cnd / etc_note, 쓸만한 조각이 없으면 name)
+    source = models.CharField(max_length=20)
+    # 원본 안에서의 순서
+    seq = models.IntegerField()
+    text = models.TextField()
+
+    embedding = models.BinaryField(null=True, blank=True)
+    embedding_dtype = models.CharField(max_length=10, blank=True, default='')
+    embedding_dim = models.IntegerField(default=0)
+    embedding_source_hash = models.CharField(max_length=64, blank=True, default='')
+
+    # 청크 인덱스가 변경을 감지하는 기준
+    updated_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'source', 'seq'], name='unique_product_chunk'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} - {self.source}[{self.seq}]"
     
 
 class SpotPrice(models.Model):
@@ -51,4 +169,167 @@ class SpotPrice(models.Model):
 
     def __str__(self):
         return f"{self.item_name} - {self.base_date}"
-    
\ No newline at end of file
+    
+
+class QueryEmbedding(models.Model):
+    # [F09] 사용자 질문 임베딩 캐시 (같은 질문은 임베딩 API 를 다시 부르지 않음)
+    # 임베딩 모델명
+    model_name = models.CharField(max_length=100)
+    # 정규화된 질문 텍스트의 sha256
+    text_hash = models.CharField(max_length=64)
+    embedding = models.BinaryField()
+    embedding_dtype = models.CharField(max_length=10, default='float32')
+    embedding_dim = models.IntegerField()
+
+    created_at = models.DateTimeField(default=timezone.now)
+    # LRU 삭제 기준
+    last_used_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['model_name', 'text_hash'], name='unique_query_embedding'),
+        ]
+
+    def __str__(self):
+        return f"{self.model_name} - {self.text_hash[:12]}"
+
+
+class UserRecommendation(models.Model):
+    # [F09] 회원 프로필(나이/자산/연봉/가입상품) 기준으로 미리 계산해 둔 맞춤 추천 (순위별 1행)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='deposit_recommendations')
+    product = models.ForeignKey(DepositProducts, on_delete=models.CASCADE, related_name='+')
+    rank = models.IntegerField()
+    # 최종 점수 (유사도 + 금리 + 가입 가능 여부 반영) / 프로필 질문과의 코사인 유사도 / 최고 우대금리
+    score = models.FloatField()
+    similarity = models.FloatField()
+    max_rate = models.FloatField(default=0)
+
+    # 계산 당시의 프로필 해시 + 카탈로그 시그니처 (달라지면 다시 계산)
+    profile_hash = models.CharField(max_length=64)
+    catalog_count = models.IntegerField(default=0)
+    catalog_updated_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'rank'], name='unique_user_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.rank}. {self.product_id}"
+
+
+class CatalogVersion(models.Model):
+    # [F03] 카탈로그 버전 (수집할 때마다 +1) - 목록/상세 응답 캐시와 ETag 의 기준, 1행만 사용
+    version = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def current(cls):
+        # 아직 한 번도 수집하지 않았으면 버전 0 (저장하지 않음)
+        return cls.objects.filter(pk=1).first() or cls(pk=1, version=0, updated_at=None)
+
+    @classmethod
+    def bump(cls):
+        now = timezone.now()
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1, updated_at=now):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1, 'updated_at': now})
+        return cls.current()
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class CatalogChange(models.Model):
+    # [F03] 카탈로그 변경 이력 (수집할 때 추가/변경/삭제된 상품·옵션을 한 행씩 기록, id 순서 = 발생 순서)
+    # 임베딩 / 맞춤 추천 같은 후속 작업은 ConsumerCheckpoint 이후의 변경만 처리한다.
+    ENTITY_PRODUCT = 'product'
+    ENTITY_OPTION = 'option'
+    ENTITY_CHOICES = [
+        (ENTITY_PRODUCT, '상품'),
+        (ENTITY_OPTION, '옵션'),
+    ]
+    ACTION_ADDED = 'added'
+    ACTION_CHANGED = 'changed'
+    ACTION_REMOVED = 'removed'
+    ACTION_CHOICES = [
+        (ACTION_ADDED, '추가'),
+        (ACTION_CHANGED, '변경'),
+        (ACTION_REMOVED, '삭제'),
+    ]
+
+    product = models.ForeignKey(DepositProducts, on_delete=models.CASCADE, related_name='changes')
+    entity = models.CharField(max_length=10, choices=ENTITY_CHOICES)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    # 변경된 컬럼 이름들 / 옵션이면 옵션 키 (save_trm, intr_rate_type_nm, rsrv_type_nm)
+    detail = models.JSONField(default=dict, blank=True)
+    # 이 변경이 반영된 카탈로그 버전
+    version = models.IntegerField()
+    created_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"v{self.version} {self.entity} {self.action} ({self.product_id})"
+
+
+class ConsumerCheckpoint(models.Model):
+    # [F03] 변경 이력 소비자별 체크포인트 (마지막으로 처리한 CatalogChange.id)
+    name = models.CharField(max_length=50, unique=True)
+    last_change_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_change_id}"
+
+
+class JobLock(models.Model):
+    # [F03] 예약 작업 단일 실행 잠금 (DB 행으로 잡는 advisory lock, 잠금 대상(SCHEDULER 'LOCK')당 1행)
+    # 실행 중에는 heartbeat 로 expires_at 을 연장하고, 프로세스가 죽어서 풀지 못한 잠금은
+    # expires_at 이 지나면 다른 인스턴스가 가져갈 수 있다.
+    name = models.CharField(max_length=50, unique=True)
+    owner = models.CharField(max_length=100)
+    acquired_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} ({self.owner})"
+
+
+class JobRun(models.Model):
+    # [F03] 예약 작업 실행 기록 (소요 시간, 처리 건수, 실패 사유)
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, '실행 중'),
+        (STATUS_SUCCEEDED, '성공'),
+        (STATUS_FAILED, '실패'),
+    ]
+    TRIGGER_SCHEDULE = 'schedule'
+    TRIGGER_CHAIN = 'chain'
+    TRIGGER_MANUAL = 'manual'
+    TRIGGER_CHOICES = [
+        (TRIGGER_SCHEDULE, '주기 실행'),
+        (TRIGGER_CHAIN, '선행 작업 후 실행'),
+        (TRIGGER_MANUAL, '수동 실행'),
+    ]
+
+    job = models.CharField(max_length=50)
+    trigger = models.CharField(max_length=10, choices=TRIGGER_CHOICES, default=TRIGGER_SCHEDULE)
+    # 연쇄 실행이면 앞 작업의 실행 기록
+    parent = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='children')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    owner = models.CharField(max_length=100, blank=True, default='')
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True)  # 초
+    # 커맨드가 남긴 처리 건수 (command.stats)
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['job', '-started_at'], name='job_run_job_started'),
+        ]
+
+    def __str__(self):
+        return f"{self.job} {self.status} @ {self.started_at:%Y-%m-%d %H:%M}"
@@ -0,0 +1,64 @@
+# back/products/pagination.py
+
+from django.core import signing
+from django.db.models import F, Q
+
+
+# -----------------------------
+# [F03] 예적금 목록 커서(keyset) 페이지네이션
+# -----------------------------
+# OFFSET 대신 "마지막으로 본 행의 정렬 키보다 뒤" 조건으로 다음 페이지를 읽는다.
+# -> 몇 번째 페이지든 정렬 인덱스에서 limit+1 행만 읽으면 된다.
+#
+# keys: [(컬럼, 내림차순 여부), ...] - 마지막 키는 항상 id 라서 순서가 완전히 고정된다.
+# NULL(옵션이 없는 상품의 금리 등)은 오름/내림차순 모두 맨 뒤.
+
+CURSOR_SALT = 'products.deposit.cursor'
+
+
+class InvalidCursor(Exception):
+    """위조되었거나 다른 정렬에서 만든 커서"""
+
+
+def keyset_order(keys):
+    return [F(field).desc(nulls_last=True) if desc else F(field).asc(nulls_last=True) for field, desc in keys]
+
+
+def _after(field, desc, value):
+    # 정렬 순서상 value 보다 뒤에 오는 행
+    if value is None:
+        return Q(pk__in=[])  # NULL 은 맨 뒤라서 더 뒤에 오는 값이 없음
+    strictly = Q(**{f'{field}__lt' if desc else f'{field}__gt': value})
+    return strictly | Q(**{f'{field}__isnull': True})
+
+
+def _equal(field, value):
+    return Q(**{f'{field}__isnull': True}) if value is None else Q(**{field: value})
+
+
+def keyset_filter(keys, values):
+    """
+    (k1, k2, ..., kn) > (v1, v2, ..., vn) 를 사전식으로 풀어쓴 조건
+    = k1 > v1  or  (k1 = v1 and k2 > v2)  or  ...
+    """
+    condition = Q(pk__in=[])
+    prefix = Q()
+    for (field, desc), value in zip(keys, values):
+        condition |= prefix & _after(field, desc, value)
+        prefix &= _equal(field, value)
+    return condition
+
+
+def encode_cursor(sort, values):
+    # 정렬 키 값을 서명해서 내려줌 (클라이언트는 내용을 몰라도 되고 바꿀 수도 없음)
+    return signing.dumps({'sort': sort, 'values': values}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(cursor, sort, n_keys):
+    try:
+        data = signing.loads(cursor, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor('잘못된 커서입니다.')
+    if data.get('sort') != sort or len(data.get('values', [])) != n_keys:
+        raise InvalidCursor('정렬 조건이 바뀌어 커서를 사용할 수 없습니다.')
+    return data['values']
@@ -0,0 +1,184 @@
+# back/products/personalize.py
+
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .embeddings import embed_queries, get_provider
+from .models import DepositProducts, UserRecommendation
+from .recommender import recommendation_index, chunk_recommendation_index, catalog_signature, top_k_indices
+
+
+# -----------------------------
+# [F09] 회원 맞춤 추천 (미리 계산해서 UserRecommendation 에 저장)
+# -----------------------------
+# 1) 프로필(나이/자산/연봉)로 질문 문장을 만들어 임베딩하고, 가입한 상품 임베딩 평균과 섞는다.
+# 2) 전체 상품과의 유사도 + 최고 우대금리 + 가입 가능 여부(join_deny)로 최종 점수를 매긴다.
+# 3) 상위 SIZE 개를 순위별로 저장 -> "내 추천" 조회는 테이블만 읽는다.
+#
+# join_deny: 1 제한없음 / 2 서민전용 / 3 일부제한
+
+JOIN_DENY_NONE, JOIN_DENY_LOW_INCOME, JOIN_DENY_PARTIAL = 1, 2, 3
+
+
+def _joined_codes(user):
+    return [c.strip() for c in (user.financial_products or '').split(',') if c.strip()]
+
+
+def profile_query_text(user):
+    """프로필 -> 임베딩할 질문 문장 (금액은 원 단위로 저장돼 있다고 보고 만원 단위로 표현)"""
+    parts = []
+    if user.age > 0:
+        parts.append(f"{user.age // 10 * 10}대")
+        if 19 <= user.age <= 34:
+            parts.append("청년")
+        elif user.age >= 60:
+            parts.append("시니어")
+    if user.salary > 0:
+        parts.append(f"연봉 {user.salary // 10000}만원 직장인 급여이체")
+    if user.money > 0:
+        parts.append(f"보유 자산 {user.money // 10000}만원 목돈 예치")
+    else:
+        parts.append("소액으로 시작하는 예금")
+    parts.append("높은 금리 정기예금 추천")
+    return ' '.join(parts)
+
+
+def profile_hash(user):
+    # 추천 결과에 영향을 주는 값 + 임베딩 모델 (모델이 바뀌면 다시 계산)
+    raw = '\n'.join([
+        get_provider().model_name,
+        str(user.age), str(user.money), str(user.salary),
+        ','.join(sorted(_joined_codes(user))),
+    ])
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def is_stale(user, rows):
+    """저장된 추천(rows)이 없거나 프로필이 바뀐 뒤 계산된 것이면 True (카탈로그 변경은 커맨드가 처리)"""
+    return not rows or rows[0].profile_hash != profile_hash(user)
+
+
+def _scoring_index():
+    if settings.RECOMMEND['GRANULARITY'] == 'chunk':
+        return chunk_recommendation_index
+    return recommendation_index
+
+
+def _product_features(product_ids):
+    """index 순서의 (최고 우대금리, join_deny, 상품코드) - 금리는 미리 계산된 요약 컬럼"""
+    features = {
+        pk: (max_rate, join_deny, code)
+        for pk, max_rate, join_deny, code in DepositProducts.objects.values_list(
+            'id', 'max_intr_rate2', 'join_deny', 'fin_prdt_cd'
+        )
+    }
+    rows = [features.get(pk, (None, JOIN_DENY_NONE, None)) for pk in product_ids.tolist()]
+    rates = np.array([max_rate or 0.0 for max_rate, _, _ in rows], dtype=np.float64)
+    deny = np.array([join_deny for _, join_deny, _ in rows], dtype=np.int64)
+    product_codes = [code for _, _, code in rows]
+    return rates, deny, product_codes
+
+
+def _profile_vectors(users, index, snapshot):
+    """회원별 프로필 벡터 (질문 임베딩을 한 번의 API 호출로 만든 뒤 가입상품 평균과 섞음)"""
+    config = settings.RECOMMEND['PERSONAL']
+    query_vectors = embed_queries([profile_query_text(user) for user in users])
+    row_of = {int(pk): i for i, pk in enumerate(snapshot.product_ids.tolist())}
+    id_of_code = dict(DepositProducts.objects.values_list('fin_prdt_cd', 'id'))
+
+    vectors = []
+    for user, query_vector in zip(users, query_vectors):
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+
+        # 조각 단위 인덱스는 행이 상품이 아니므로 가입상품 평균은 상품 단위 인덱스에서만 사용
+        rows = [row_of[id_of_code[c]] for c in _joined_codes(user) if id_of_code.get(c) in row_of]
+        if rows and index is recommendation_index and len(query) == snapshot.matrix.shape[1]:
+            joined = snapshot.matrix[rows].mean(axis=0)
+            query = (1 - config['JOINED_WEIGHT']) * query + config['JOINED_WEIGHT'] * joined
+        vectors.append(query)
+    return vectors
+
+
+def _rank_for_user(user, similarities, rates, deny, product_codes):
+    """(상품 행 번호, 최종 점수) 상위 SIZE 개"""
+    config = settings.RECOMMEND['PERSONAL']
+
+    eligibility = np.ones(len(deny), dtype=np.float32)
+    eligibility[deny == JOIN_DENY_PARTIAL] = config['PARTIAL_ELIGIBILITY']
+    if not (0 < user.salary <= config['LOW_INCOME_SALARY']):
+        eligibility[deny == JOIN_DENY_LOW_INCOME] = 0.0
+    # 이미 가입한 상품은 제외
+    joined = set(_joined_codes(user))
+    if joined:
+        eligibility[[i for i, code in enumerate(product_codes) if code in joined]] = 0.0
+
+    top_rate = rates.max() if len(rates) and rates.max() > 0 else 1.0
+    scores = (config['SIMILARITY_WEIGHT'] * similarities + config['RATE_WEIGHT'] * rates / top_rate) * eligibility
+    scores = np.where(eligibility > 0, scores, -np.inf)
+
+    picked = top_k_indices(scores, config['SIZE'])
+    return [(int(i), float(scores[i])) for i in picked if np.isfinite(scores[i])]
+
+
+def refresh_user_recommendations(users, force=False):
+    """
+    회원들의 맞춤 추천을 다시 계산해서 저장. force 가 아니면 프로필/카탈로그가 바뀐 회원만.
+    반환값: 다시 계산한 회원 수 (임베딩 API 에러는 EmbeddingError 로 그대로 올라감)
+    """
+    index = _scoring_index()
+    snapshot = index.ensure_loaded()
+    product_signature = catalog_signature()
+
+    users = list(users)
+    if not force:
+        current = {
+            row['user_id']: row
+            for row in UserRecommendation.objects
+            .filter(user__in=users, rank=1)
+            .values('user_id', 'profile_hash', 'catalog_count', 'catalog_updated_at')
+        }
+        users = [
+            user for user in users
+            if user.pk not in current
+            or current[user.pk]['profile_hash'] != profile_hash(user)
+            or (current[user.pk]['catalog_count'], current[user.pk]['catalog_updated_at']) != product_signature
+        ]
+    if not users or len(snapshot.product_ids) == 0:
+        return 0
+
+    rates, deny, product_codes = _product_features(snapshot.product_ids)
+    vectors = _profile_vectors(users, index, snapshot)
+
+    # 임베딩 제공자를 바꾸고 상품 임베딩을 다시 만들지 않았으면 차원이 다를 수 있음
+    scored = [(user, vector) for user, vector in zip(users, vectors) if len(vector) == snapshot.matrix.shape[1]]
+    if not scored:
+        return 0
+    users = [user for user, _ in scored]
+    # (회원 수 x 상품 수) 유사도를 행렬 곱 1번으로 계산
+    similarity_matrix = index.score_many(snapshot, np.stack([vector for _, vector in scored]))
+
+    rows = []
+    for user, similarities in zip(users, similarity_matrix):
+        user_hash = profile_hash(user)
+        for rank, (i, score) in enumerate(_rank_for_user(user, similarities, rates, deny, product_codes), start=1):
+            rows.append(UserRecommendation(
+                user=user,
+                product_id=int(snapshot.product_ids[i]),
+                rank=rank,
+                score=score,
+                similarity=float(similarities[i]),
+                max_rate=float(rates[i]),
+                profile_hash=user_hash,
+                catalog_count=product_signature[0],
+                catalog_updated_at=product_signature[1],
+            ))
+
+    with transaction.atomic():
+        UserRecommendation.objects.filter(user__in=users).delete()
+        UserRecommendation.objects.bulk_create(rows, batch_size=500)
+    return len(users)
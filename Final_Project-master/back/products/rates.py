@@ -0,0 +1,58 @@
+# back/products/rates.py
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import DepositProducts, DepositOptions, DepositRateSummary
+
+
+# -----------------------------
+# [F03] 금리 요약 갱신 (옵션 -> 상품별 / 상품+기간별 최고 금리)
+# -----------------------------
+# 목록 정렬, 프로필, 추천이 요청마다 Max(options__...) 를 집계하지 않도록
+# 옵션을 저장한 뒤(get_deposit_products) 한 번만 다시 계산해 둔다.
+
+def refresh_rate_summaries(product_ids=None):
+    """
+    product_ids 가 없으면 전체 상품. 금리가 바뀐 상품은 updated_at 도 갱신해서
+    추천 인덱스 / 금리순 캐시가 변경을 감지하게 한다. 반환값: 최고 금리가 바뀐 상품 수
+    """
+    options = DepositOptions.objects.all()
+    products = DepositProducts.objects.all()
+    if product_ids is not None:
+        options = options.filter(product_id__in=product_ids)
+        products = products.filter(id__in=product_ids)
+
+    per_term = list(
+        options
+        .values('product_id', 'save_trm')
+        .annotate(max_intr_rate=Max('intr_rate'), max_intr_rate2=Max('intr_rate2'))
+        .order_by('product_id', 'save_trm')
+    )
+
+    # 상품별 최고 금리 = 기간별 최고 금리 중 최댓값
+    per_product = {}
+    for row in per_term:
+        best = per_product.setdefault(row['product_id'], [None, None])
+        for i, key in enumerate(('max_intr_rate', 'max_intr_rate2')):
+            if row[key] is not None and (best[i] is None or row[key] > best[i]):
+                best[i] = row[key]
+
+    now = timezone.now()
+    changed = []
+    for product in products.only('id', 'max_intr_rate', 'max_intr_rate2'):
+        max_rate, max_rate2 = per_product.get(product.id, (None, None))
+        if (product.max_intr_rate, product.max_intr_rate2) != (max_rate, max_rate2):
+            product.max_intr_rate, product.max_intr_rate2 = max_rate, max_rate2
+            product.updated_at = now
+            changed.append(product)
+
+    with transaction.atomic():
+        summaries = DepositRateSummary.objects.all()
+        if product_ids is not None:
+            summaries = summaries.filter(product_id__in=product_ids)
+        summaries.delete()
+        DepositRateSummary.objects.bulk_create([DepositRateSummary(**row) for row in per_term], batch_size=500)
+        DepositProducts.objects.bulk_update(changed, ['max_intr_rate', 'max_intr_rate2', 'updated_at'], batch_size=500)
+    return len(changed)
@@ -0,0 +1,426 @@
+# back/products/recommender.py
+
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .ann import IVFIndex
+from .compression import EmbeddingCompressor
+from .models import DepositProducts, DepositProductChunk, CatalogVersion
+from .vectors import decode_vector
+
+
+# -----------------------------
+# 공통 유틸
+# -----------------------------
+def _stack_embeddings(rows):
+    """
+    [(key, blob, dtype, dim), ...] -> (keys, 행 정규화된 float32 행렬)
+    서로 다른 모델로 만든 임베딩이 섞여 있으면 가장 많은 차원만 사용한다.
+    """
+    dims = {dim for _, _, _, dim in rows}
+    if len(dims) > 1:
+        dim = max(dims, key=lambda d: sum(1 for r in rows if r[3] == d))
+        rows = [r for r in rows if r[3] == dim]
+
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32)
+
+    # JSON 파싱 없이 bytes view 를 바로 행렬에 복사
+    matrix = np.empty((len(rows), rows[0][3]), dtype=np.float32)
+    for i, (_, blob, dtype_name, dim) in enumerate(rows):
+        matrix[i] = decode_vector(blob, dtype_name or 'float32', dim)
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+
+    keys = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    return keys, matrix
+
+
+def _normalize_query(query_vector):
+    query = np.asarray(query_vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return None
+    return query / norm
+
+
+def top_k_indices(scores, k):
+    """
+    partition 으로 상위 k개 경계만 구하고 그 후보만 정렬.
+    같은 문구로 만든 임베딩처럼 점수가 같으면 앞쪽(id 가 작은) 행을 우선한다.
+    (계산 경로에 따라 생기는 float 오차로 순위가 바뀌지 않도록 소수 6자리에서 비교)
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    rounded = np.round(scores, 6)
+    threshold = np.partition(rounded, len(rounded) - k)[len(rounded) - k]
+    candidates = np.flatnonzero(rounded >= threshold)
+    order = np.lexsort((candidates, -rounded[candidates]))
+    return candidates[order[:k]]
+
+
+def aggregate_segments(scores, starts, mode='max', top_n=1):
+    """
+    연속된 구간(상품별 조각들)마다 점수를 하나로 합친다. (파이썬 루프 없이 reduceat)
+
+    - scores : 조각 점수 (같은 상품의 조각이 연속으로 붙어 있어야 함)
+    - starts : 각 상품 구간의 시작 인덱스 (오름차순)
+    - mode   : 'max' -> 구간 최댓값 / 'mean' -> 구간 상위 top_n 개 평균
+    """
+    if mode == 'max' or top_n <= 1:
+        return np.maximum.reduceat(scores, starts)
+
+    lengths = np.diff(np.append(starts, len(scores)))
+    segment_ids = np.repeat(np.arange(len(starts)), lengths)
+    # 구간 안에서 점수 내림차순 정렬 (구간 순서는 그대로)
+    order = np.lexsort((-scores, segment_ids))
+    rank = np.arange(len(scores)) - starts[segment_ids]
+    kept = np.where(rank < top_n, scores[order], 0.0)
+    return np.add.reduceat(kept, starts) / np.minimum(lengths, top_n)
+
+
+# -----------------------------
+# [F09] 추천용 임베딩 인덱스 (프로세스 전역)
+# -----------------------------
+def catalog_signature():
+    """(상품 수, 마지막 수정 시각) - 회원 맞춤 추천이 어떤 카탈로그로 계산됐는지 저장할 때 사용"""
+    agg = DepositProducts.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+    return (agg['count'], agg['updated'])
+
+
+@dataclass(frozen=True)
+class IndexSnapshot:
+    """
+    한 번 로드한 인덱스 상태. 다시 로드할 때는 새 스냅숏을 만들어 한 번에 바꿔 끼우므로
+    검색 중인 요청은 끝까지 같은 (product_ids, matrix) 짝을 본다.
+    """
+    version: int
+    product_ids: np.ndarray
+    matrix: np.ndarray
+    segment_starts: np.ndarray = None   # 조각 단위: 상품별 조각 구간의 시작 행
+    compressor: object = None           # 압축: 이 스냅숏으로 학습한 EmbeddingCompressor
+    compressed: object = None           # 압축: CompressedMatrix
+    originals: np.ndarray = None        # 압축: 재채점용 원본 행렬 (메모리 매핑, product_ids 와 같은 순서)
+
+
+class RecommendationIndex:
+    """
+    정규화된 상품 임베딩을 하나의 float32 행렬로 메모리에 들고 있는 인덱스.
+
+    - matrix      : (상품 수, 차원) float32, 각 행은 L2 정규화됨
+    - product_ids : matrix 의 각 행에 대응하는 DepositProducts.id
+
+    카탈로그 버전(CatalogVersion)이 바뀌면 다음 검색 때 다시 로드한다.
+    (get_deposit_products / recommendation 커맨드는 별도 프로세스에서 돌기 때문에
+     시그널 대신 DB 의 버전으로 변경을 감지, 검색마다 읽지 않도록 check_seconds 에 한 번만 확인)
+    """
+    model = DepositProducts
+    # 판매 중지 상품은 인덱스에 넣지 않음
+    active_filter = {'is_active': True}
+
+    def __init__(self, check_seconds=None):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = 0.0
+        if check_seconds is None:
+            check_seconds = settings.RECOMMEND['INDEX_CHECK_SECONDS']
+        self.check_seconds = check_seconds
+
+    def catalog_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.check_seconds:
+            self._version = CatalogVersion.current().version
+            self._checked_at = now
+        return self._version
+
+    def _embedding_rows(self, key_field):
+        return list(
+            self.model.objects
+            .exclude(embedding__isnull=True)
+            .filter(embedding_dim__gt=0, **self.active_filter)
+            .order_by(key_field, 'id')
+            .values_list(key_field, 'embedding', 'embedding_dtype', 'embedding_dim')
+        )
+
+    def _load(self, version):
+        product_ids, matrix = _stack_embeddings(self._embedding_rows('id'))
+        return IndexSnapshot(version, product_ids, matrix)
+
+    def ensure_loaded(self):
+        """현재 스냅숏 (버전이 바뀌었으면 새로 로드해서 교체). 검색 1번에 한 번만 읽어서 끝까지 사용"""
+        version = self.catalog_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._load(version)
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        self._version = None
+        self._snapshot = None
+
+    def score(self, snapshot, query):
+        # 정규화된 질문 벡터 -> product_ids 순서의 점수
+        return snapshot.matrix @ query
+
+    def search(self, query_vector, k=3):
+        """
+        query_vector 와 코사인 유사도가 높은 상품 k개를 [(product_id, score), ...] 로 반환.
+        행렬-벡터 곱 1번 + argpartition 으로 상위 k개만 정렬한다.
+        """
+        snapshot = self.ensure_loaded()
+        if len(snapshot.product_ids) == 0 or k <= 0:
+            return []
+
+        query = _normalize_query(query_vector)
+        # 임베딩 제공자를 바꾸고 상품 임베딩을 다시 만들지 않았으면 차원이 다를 수 있음
+        if query is None or len(query) != snapshot.matrix.shape[1]:
+            return []
+
+        scores = self.score(snapshot, query)
+        return [(int(snapshot.product_ids[i]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def score_many(self, snapshot, queries):
+        # (질문 수, 차원) -> (질문 수, 상품 수) 점수, 행렬-행렬 곱 1번
+        return queries @ snapshot.matrix.T
+
+    def search_many(self, query_vectors, k=3):
+        """
+        여러 질문을 한 번에 검색. 질문마다 search 와 같은 형식의 결과 리스트를 반환한다.
+        (차원이 다르거나 0 벡터인 질문은 빈 리스트)
+        """
+        snapshot = self.ensure_loaded()
+        results = [[] for _ in query_vectors]
+        if len(snapshot.product_ids) == 0 or k <= 0:
+            return results
+
+        positions, queries = [], []
+        for i, query_vector in enumerate(query_vectors):
+            query = _normalize_query(query_vector)
+            if query is not None and len(query) == snapshot.matrix.shape[1]:
+                positions.append(i)
+                queries.append(query)
+        if not queries:
+            return results
+
+        scores = self.score_many(snapshot, np.stack(queries))
+        for i, row in zip(positions, scores):
+            results[i] = [(int(snapshot.product_ids[j]), float(row[j])) for j in top_k_indices(row, k)]
+        return results
+
+
+class ChunkRecommendationIndex(RecommendationIndex):
+    """
+    조건 조각(DepositProductChunk) 단위 인덱스.
+    조각 행렬 전체에 행렬-벡터 곱 1번 -> 상품별 구간으로 max / 상위 n개 평균 집계.
+    """
+    model = DepositProductChunk
+    active_filter = {'product__is_active': True}
+
+    def __init__(self, mode='max', top_n=1, check_seconds=None):
+        super().__init__(check_seconds)
+        self.mode = mode
+        self.top_n = top_n
+
+    def _load(self, version):
+        chunk_product_ids, matrix = _stack_embeddings(self._embedding_rows('product_id'))
+        # product_id 순으로 정렬돼 있으므로 값이 바뀌는 위치가 상품 구간의 시작
+        boundary = np.ones(len(chunk_product_ids), dtype=bool)
+        boundary[1:] = chunk_product_ids[1:] != chunk_product_ids[:-1]
+        segment_starts = np.flatnonzero(boundary)
+        return IndexSnapshot(version, chunk_product_ids[segment_starts], matrix, segment_starts=segment_starts)
+
+    def score(self, snapshot, query):
+        return aggregate_segments(snapshot.matrix @ query, snapshot.segment_starts, self.mode, self.top_n)
+
+    def score_many(self, snapshot, queries):
+        chunk_scores = queries @ snapshot.matrix.T
+        if self.mode == 'max' or self.top_n <= 1:
+            return np.maximum.reduceat(chunk_scores, snapshot.segment_starts, axis=1)
+        return np.stack([
+            aggregate_segments(row, snapshot.segment_starts, self.mode, self.top_n) for row in chunk_scores
+        ])
+
+
+class CompressedRecommendationIndex(RecommendationIndex):
+    """
+    차원 축소(truncate / pca) + int8 양자화한 벡터만 메모리에 두는 인덱스.
+    1차로 압축 벡터 점수 상위 rescore 개를 고른 뒤, 그 후보의 원본 임베딩으로 정확한 코사인 유사도를 다시 매긴다.
+    원본 행렬은 익명 임시 파일에 메모리 매핑해 두므로 프로세스 상주 메모리가 아니라 OS 페이지 캐시에 있고,
+    재채점 때 DB 를 읽지 않는다.
+    """
+
+    def __init__(self, method=None, dim=256, quantize=None, rescore=100, check_seconds=None):
+        super().__init__(check_seconds)
+        # 설정 검사는 생성할 때 한 번 (실제 학습은 로드할 때마다 새 compressor 로)
+        EmbeddingCompressor(method=method, dim=dim, quantize=quantize)
+        self.method = method
+        self.dim = dim
+        self.quantize = quantize
+        self.rescore = rescore
+
+    def _load(self, version):
+        product_ids, matrix = _stack_embeddings(self._embedding_rows('id'))
+        if len(product_ids) == 0:
+            return IndexSnapshot(version, product_ids, matrix)
+        compressor = EmbeddingCompressor(method=self.method, dim=self.dim, quantize=self.quantize).fit(matrix)
+        # 원본 행렬 대신 빈 (0, 차원) 배열만 남겨 차원 검사에 사용
+        return IndexSnapshot(
+            version, product_ids, np.empty((0, matrix.shape[1]), dtype=np.float32),
+            compressor=compressor, compressed=compressor.encode(matrix), originals=_memory_mapped(matrix),
+        )
+
+    def _candidates(self, snapshot, query, k):
+        # 1차: 압축 벡터로 후보 행 추리기 (파일에서 순서대로 읽도록 행 번호 정렬)
+        approx = snapshot.compressed.scores(snapshot.compressor.reduce(query))
+        return np.sort(top_k_indices(approx, max(k, self.rescore)))
+
+    def search(self, query_vector, k=3):
+        snapshot = self.ensure_loaded()
+        if snapshot.compressed is None or k <= 0:
+            return []
+
+        query = _normalize_query(query_vector)
+        if query is None or len(query) != snapshot.matrix.shape[1]:
+            return []
+
+        # 2차: 후보만 원본 벡터로 정확히 재채점
+        rows = self._candidates(snapshot, query, k)
+        scores = snapshot.originals[rows] @ query
+        return [(int(snapshot.product_ids[rows[i]]), float(scores[i])) for i in top_k_indices(scores, k)]
+
+    def search_many(self, query_vectors, k=3):
+        # 질문마다 후보가 달라 재채점은 질문별로 (원본은 메모리 매핑이라 DB 조회 없음)
+        return [self.search(query_vector, k) for query_vector in query_vectors]
+
+
+def _memory_mapped(matrix):
+    """
+    행렬을 이름 없는 임시 파일에 쓰고 읽기 전용 memmap 으로 반환.
+    파일은 만들자마자 지워진 상태라 memmap 이 사라지면(스냅숏 교체) 디스크에서도 사라진다.
+    """
+    with tempfile.TemporaryFile() as f:
+        mapped = np.memmap(f, dtype=np.float32, mode='w+', shape=matrix.shape)
+        mapped[:] = matrix
+    # 파일 객체를 닫아도 매핑은 유지됨. 스냅숏끼리 공유하므로 이후 쓰기는 막아 둠
+    mapped.flags.writeable = False
+    return mapped
+
+
+class AnnRecommendationIndex:
+    """
+    build_ann_index 커맨드가 저장한 IVF 인덱스 파일을 처음 검색할 때 읽어오는 인덱스.
+    파일이 다시 만들어지면(수정 시각 변경) 다음 검색 때 새로 읽는다.
+    파일을 만든 뒤 판매 중지된 상품은 카탈로그 버전이 바뀔 때마다 다시 구한 mask 로 후보에서 뺀다.
+    """
+
+    def __init__(self, path, nprobe):
+        self.path = path
+        self.nprobe = nprobe
+        self._lock = threading.Lock()
+        # (파일 수정 시각, 카탈로그 버전, IVFIndex, 판매 중 행 mask) - 한 번에 교체
+        self._snapshot = None
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def _active_mask(self, index):
+        active_ids = DepositProducts.objects.filter(is_active=True).values_list('id', flat=True)
+        return np.isin(index.product_ids, np.fromiter(active_ids, dtype=np.int64))
+
+    def ensure_loaded(self):
+        mtime = os.stat(self.path).st_mtime
+        version = recommendation_index.catalog_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot[:2] == (mtime, version):
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot[:2] != (mtime, version):
+                index = snapshot[2] if snapshot is not None and snapshot[0] == mtime else IVFIndex.load(self.path)
+                snapshot = (mtime, version, index, self._active_mask(index))
+                self._snapshot = snapshot
+        return snapshot
+
+    def search(self, query_vector, k=3):
+        _, _, index, mask = self.ensure_loaded()
+        query = _normalize_query(query_vector)
+        if query is None or k <= 0 or len(index.product_ids) == 0:
+            return []
+        if len(query) != index.vectors.shape[1]:
+            return []
+        ids, scores = index.search(query, k, self.nprobe, mask=mask)
+        return [(int(pk), float(score)) for pk, score in zip(ids, scores)]
+
+    def search_many(self, query_vectors, k=3):
+        # 질문마다 탐색할 클러스터가 달라 질문별로 검색
+        return [self.search(query_vector, k) for query_vector in query_vectors]
+
+
+recommendation_index = RecommendationIndex()
+chunk_recommendation_index = ChunkRecommendationIndex(
+    mode=settings.RECOMMEND['CHUNK_AGGREGATION'],
+    top_n=settings.RECOMMEND['CHUNK_TOP_N'],
+)
+compressed_recommendation_index = CompressedRecommendationIndex(
+    method=settings.RECOMMEND['COMPRESSION']['METHOD'],
+    dim=settings.RECOMMEND['COMPRESSION']['DIM'],
+    quantize=settings.RECOMMEND['COMPRESSION']['QUANTIZE'],
+    rescore=settings.RECOMMEND['COMPRESSION']['RESCORE'],
+)
+ann_recommendation_index = AnnRecommendationIndex(
+    path=settings.RECOMMEND['ANN']['PATH'],
+    nprobe=settings.RECOMMEND['ANN']['NPROBE'],
+)
+
+
+def get_recommendation_index():
+    # ANN 을 켰고 인덱스 파일이 있으면 ANN, 아니면
+    # settings.RECOMMEND['GRANULARITY'] 에 따라 상품 단위 / 조각 단위 인덱스 선택
+    if settings.RECOMMEND['ANN']['ENABLED'] and ann_recommendation_index.available():
+        return ann_recommendation_index
+    if settings.RECOMMEND['GRANULARITY'] == 'chunk':
+        return chunk_recommendation_index
+    compression = settings.RECOMMEND['COMPRESSION']
+    if compression['METHOD'] or compression['QUANTIZE']:
+        return compressed_recommendation_index
+    return recommendation_index
+
+
+# -----------------------------
+# [F09] 금리순 추천 (임베딩을 못 만들 때 대체용)
+# -----------------------------
+_rate_ranking_lock = threading.Lock()
+_rate_ranking_cache = {'signature': None, 'product_ids': []}
+RATE_RANKING_SIZE = 20
+
+
+def rate_ranking(k=3):
+    """최고 우대금리 내림차순 상품 id k개. 카탈로그 버전이 바뀔 때만 다시 계산한다."""
+    signature = recommendation_index.catalog_version()
+    if _rate_ranking_cache['signature'] != signature:
+        with _rate_ranking_lock:
+            if _rate_ranking_cache['signature'] != signature:
+                _rate_ranking_cache['product_ids'] = list(
+                    DepositProducts.objects
+                    .filter(is_active=True, max_intr_rate2__isnull=False)
+                    .order_by('-max_intr_rate2', '-max_intr_rate', 'id')
+                    .values_list('id', flat=True)[:max(k, RATE_RANKING_SIZE)]
+                )
+                _rate_ranking_cache['signature'] = signature
+    return _rate_ranking_cache['product_ids'][:k]
@@ -0,0 +1,216 @@
+# back/products/scheduler.py
+
+import io
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command, get_commands, load_command_class
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .changes import is_behind
+from .models import JobLock, JobRun
+
+
+# -----------------------------
+# [F03] 카탈로그 갱신 예약 작업 (run_scheduler 커맨드)
+# -----------------------------
+# settings.SCHEDULER['JOBS'] 의 작업을 INTERVAL 초마다 실행한다. 요청 처리(웹 프로세스)와는 완전히 분리.
+#
+# - 단일 실행: 작업이 쓰는 자원(LOCK, 기본은 모든 작업이 같은 'writer')의 JobLock 행을 잡은 인스턴스만 실행
+#   (여러 서버/프로세스에서 돌려도 한 번에 하나만 DB 에 씀, 연쇄 작업은 잡은 잠금을 그대로 이어받음)
+#   실행하는 동안 HEARTBEAT_SECONDS 마다 expires_at 을 연장해서 LOCK_TTL 보다 오래 걸려도 뺏기지 않는다.
+# - 실행 기록: JobRun 에 상태, 소요 시간, 커맨드가 남긴 처리 건수(command.stats), 에러
+# - 연쇄 실행: THEN 에 적힌 작업을 바로 이어서 실행
+#     get_deposit_products (수집, 바뀌면 카탈로그 버전 +1 -> 응답 캐시/ETag 무효화)
+#       -> recommendation (변경 이력 체크포인트 이후 바뀐 상품만 재임베딩 + 회원 맞춤 추천 갱신)
+#   앞 작업이 실패했거나 stats['changed'] 가 False(바뀐 것 없음)면 뒤 작업은 건너뜀
+# - 재시도: CONSUMER 가 있는 작업은 그 변경 이력 체크포인트가 밀려 있을 때만 INTERVAL 마다 실행
+#   (임베딩 API 실패로 체크포인트를 못 옮긴 recommendation 을 다음 수집까지 기다리지 않고 다시 시도)
+# - 다음 실행 시각은 DB 의 마지막 실행 기록 기준이라 스케줄러를 다시 띄워도 주기가 유지된다.
+
+
+def make_owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lock(name, owner, ttl):
+    """잠금을 잡으면 True. 다른 인스턴스가 잡고 있고 아직 만료 전이면 False"""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl)
+    # 만료된 잠금은 조건부 UPDATE 로 가져옴 (동시에 시도해도 한 쪽만 1행 갱신)
+    if JobLock.objects.filter(name=name, expires_at__lte=now).update(
+        owner=owner, acquired_at=now, expires_at=expires_at,
+    ):
+        return True
+    try:
+        with transaction.atomic():
+            JobLock.objects.create(name=name, owner=owner, acquired_at=now, expires_at=expires_at)
+    except IntegrityError:
+        return False
+    return True
+
+
+def renew_lock(name, owner, ttl):
+    """아직 내 잠금이면 만료 시각을 지금 + ttl 로 연장. 이미 뺏겼으면 False"""
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    return bool(JobLock.objects.filter(name=name, owner=owner).update(expires_at=expires_at))
+
+
+def release_lock(name, owner):
+    JobLock.objects.filter(name=name, owner=owner).delete()
+
+
+@contextmanager
+def lock_heartbeat(name, owner, ttl, every):
+    """with 블록이 실행되는 동안 별도 스레드에서 every 초마다 잠금 연장"""
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(every):
+                try:
+                    renew_lock(name, owner, ttl)
+                except DatabaseError:
+                    # SQLite 가 작업의 쓰기 트랜잭션으로 잠겨 있으면 다음 차례에 다시 연장
+                    pass
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'job-lock-heartbeat:{name}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+@contextmanager
+def job_lock(name, owner, ttl, heartbeat, held=()):
+    """
+    잠금을 잡고(잡았으면 True) 실행 중에는 heartbeat 로 연장, 끝나면 해제.
+    held: 이 연쇄 실행에서 이미 잡고 있는 잠금 -> 다시 잡지 않고 그대로 사용
+    """
+    if name in held:
+        yield True
+        return
+    if not acquire_lock(name, owner, ttl):
+        yield False
+        return
+    try:
+        with lock_heartbeat(name, owner, ttl, heartbeat):
+            yield True
+    finally:
+        release_lock(name, owner)
+
+
+def job_settings(name):
+    config = settings.SCHEDULER['JOBS'][name]
+    return {
+        'COMMAND': config.get('COMMAND', name),
+        'ARGS': config.get('ARGS', []),
+        'INTERVAL': config.get('INTERVAL'),
+        'CONSUMER': config.get('CONSUMER'),
+        'THEN': config.get('THEN', []),
+        'LOCK': config.get('LOCK', settings.SCHEDULER['LOCK']),
+        'LOCK_TTL': config.get('LOCK_TTL', settings.SCHEDULER['LOCK_TTL']),
+        'HEARTBEAT': config.get('HEARTBEAT_SECONDS', settings.SCHEDULER['HEARTBEAT_SECONDS']),
+    }
+
+
+def _run_command(config):
+    """커맨드 실행 -> command.stats (커맨드가 남긴 처리 건수, 출력은 버림)"""
+    name = config['COMMAND']
+    command = load_command_class(get_commands()[name], name)
+    output = io.StringIO()
+    call_command(command, *config['ARGS'], stdout=output, stderr=output)
+    return getattr(command, 'stats', {})
+
+
+def run_job(name, trigger=JobRun.TRIGGER_MANUAL, parent=None, owner=None, log=None, held=()):
+    """
+    잠금을 잡고 작업 1개 실행 + 기록, 성공하면 잠금을 쥔 채로 THEN 작업을 이어서 실행.
+    반환값: 이번에 만든 JobRun 리스트 (잠금을 못 잡았으면 빈 리스트)
+    """
+    owner = owner or make_owner()
+    config = job_settings(name)
+    log = log or (lambda message: None)
+
+    with job_lock(config['LOCK'], owner, config['LOCK_TTL'], config['HEARTBEAT'], held) as acquired:
+        if not acquired:
+            log(f"[{name}] 다른 인스턴스가 {config['LOCK']} 잠금으로 실행 중이라 건너뜀")
+            return []
+
+        run = JobRun.objects.create(job=name, trigger=trigger, parent=parent, owner=owner)
+        started = time.perf_counter()
+        try:
+            stats = _run_command(config)
+        except Exception:
+            run.status = JobRun.STATUS_FAILED
+            run.error = traceback.format_exc()
+            stats = {}
+        else:
+            run.status = JobRun.STATUS_SUCCEEDED
+        run.stats = stats
+        run.finished_at = timezone.now()
+        run.duration = time.perf_counter() - started
+        run.save(update_fields=['status', 'stats', 'error', 'finished_at', 'duration'])
+        log(f"[{name}] {run.get_status_display()} ({run.duration:.2f}s) {stats}")
+
+        runs = [run]
+        if run.status != JobRun.STATUS_SUCCEEDED:
+            return runs
+        if stats.get('changed', True) is False:
+            if config['THEN']:
+                log(f"[{name}] 바뀐 것이 없어 {', '.join(config['THEN'])} 생략")
+            return runs
+        held = {*held, config['LOCK']}
+        for next_job in config['THEN']:
+            runs += run_job(next_job, trigger=JobRun.TRIGGER_CHAIN, parent=run, owner=owner, log=log, held=held)
+        return runs
+
+
+def next_run_at(name, now=None):
+    """마지막 주기 실행 + INTERVAL (한 번도 없었으면 지금, 주기가 없으면 None = 연쇄로만 실행)"""
+    interval = job_settings(name)['INTERVAL']
+    if not interval:
+        return None
+    last = (
+        JobRun.objects
+        .filter(job=name, trigger__in=[JobRun.TRIGGER_SCHEDULE, JobRun.TRIGGER_MANUAL])
+        .order_by('-started_at')
+        .values_list('started_at', flat=True)
+        .first()
+    )
+    return (now or timezone.now()) if last is None else last + timedelta(seconds=interval)
+
+
+def due_jobs(names=None, now=None):
+    now = now or timezone.now()
+    names = names or list(settings.SCHEDULER['JOBS'])
+    due = []
+    for name in names:
+        at = next_run_at(name, now)
+        if at is None or at > now:
+            continue
+        consumer = job_settings(name)['CONSUMER']
+        if consumer and not is_behind(consumer):
+            continue
+        due.append(name)
+    return due
+
+
+def run_pending(names=None, owner=None, log=None):
+    """지금 실행할 차례인 작업을 순서대로 실행 (한 프로세스 안에서는 하나씩 -> SQLite 잠금 충돌 없음)"""
+    runs = []
+    for name in due_jobs(names):
+        runs += run_job(name, trigger=JobRun.TRIGGER_SCHEDULE, owner=owner, log=log)
+    return runs
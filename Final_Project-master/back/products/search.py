@@ -0,0 +1,107 @@
+# back/products/search.py
+
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+
+# -----------------------------
+# [F03] 상품 전문 검색 (SQLite FTS5 + trigram 토크나이저)
+# -----------------------------
+# 은행명/상품명뿐 아니라 우대조건(spcl_cnd), 유의사항(etc_note), 가입방법(join_way)까지 검색하고
+# bm25 로 관련도 순위를 매긴다. trigram 은 띄어쓰기 없는 한국어도 부분 일치로 찾을 수 있지만
+# 3글자 미만 검색어는 색인으로 찾을 수 없어서 그런 단어만 icontains 로 처리한다.
+#
+# DepositProducts 를 원본(external content)으로 쓰고 트리거로 동기화한다. (수집 때마다 재색인하지 않음)
+# 테이블/트리거는 마이그레이션(0010)이 만들고, SQLite 가 컬럼 변경 마이그레이션에서 상품 테이블을
+# 다시 만들며 트리거가 사라지는 경우는 migrate 직후(post_migrate) ensure_search_triggers() 가 복구한다.
+
+FTS_TABLE = 'products_depositproducts_fts'
+FTS_COLUMNS = ('kor_co_nm', 'fin_prdt_nm', 'spcl_cnd', 'etc_note', 'join_way')
+# bm25 컬럼 가중치 (상품명 > 은행명 > 우대조건 > 유의사항/가입방법)
+FTS_WEIGHTS = (2.0, 3.0, 1.0, 0.5, 0.5)
+MIN_TERM_LENGTH = 3
+# 관련도 정렬(bm25 순위 -> Case/When)에 쓰는 상위 결과 수. 검색 필터 자체는 서브쿼리라 개수 제한 없음
+MAX_RESULTS = 1000
+
+_columns = ', '.join(FTS_COLUMNS)
+_new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+_old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+
+TRIGGER_SQL = {
+    f'{FTS_TABLE}_ai': f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON products_depositproducts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON products_depositproducts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+    END
+    """,
+    # 임베딩/금리 요약만 바뀌는 UPDATE 에는 반응하지 않도록 검색 대상 컬럼만 지정
+    f'{FTS_TABLE}_au': f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_columns} ON products_depositproducts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_columns}) VALUES ('delete', old.id, {_old_values});
+        INSERT INTO {FTS_TABLE}(rowid, {_columns}) VALUES (new.id, {_new_values});
+    END
+    """,
+}
+# 원본 테이블 기준으로 색인 전체 재구성
+REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+_available = {}
+
+
+def ensure_search_triggers(conn=connection):
+    """빠진 동기화 트리거만 다시 만들고, 그 사이 바뀐 행이 있을 수 있으니 그때만 재색인. 재생성한 트리거 이름 목록"""
+    if conn.vendor != 'sqlite' or FTS_TABLE not in conn.introspection.table_names():
+        return []
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'products_depositproducts'"
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in TRIGGER_SQL if name not in existing]
+        for name in missing:
+            cursor.execute(TRIGGER_SQL[name])
+        if missing:
+            cursor.execute(REBUILD_SQL)
+    return missing
+
+
+def search_index_available():
+    # 검색 테이블이 실제로 만들어져 있는지 (DB 별로 한 번만 확인)
+    alias = connection.alias
+    if alias not in _available:
+        _available[alias] = connection.vendor == 'sqlite' and FTS_TABLE in connection.introspection.table_names()
+    return _available[alias]
+
+
+def split_terms(q):
+    """검색어 -> (색인으로 찾을 3글자 이상 단어, 나머지 짧은 단어)"""
+    terms = [t for t in re.split(r'\s+', q.strip()) if t]
+    return [t for t in terms if len(t) >= MIN_TERM_LENGTH], [t for t in terms if len(t) < MIN_TERM_LENGTH]
+
+
+def _match_expression(terms):
+    # 사용자 입력은 항상 "..." 문구로 감싸서 FTS5 문법(AND/OR/NEAR/*) 으로 해석되지 않게 한다
+    return ' AND '.join('"' + term.replace('"', '""') + '"' for term in terms)
+
+
+def matching_ids(terms):
+    """3글자 이상 단어들을 모두 포함하는 상품 id 서브쿼리 (qs.filter(id__in=...) 용, id 를 파이썬으로 가져오지 않음)"""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [_match_expression(terms)])
+
+
+def search_product_ids(terms, limit=MAX_RESULTS):
+    """3글자 이상 단어들을 모두 포함하는 상품 id 를 bm25 관련도 순으로"""
+    weights = ', '.join(str(w) for w in FTS_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s",
+            [_match_expression(terms), limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
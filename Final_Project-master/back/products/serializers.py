@@ -1,23 +1,53 @@
 from rest_framework import serializers
 from .models import DepositProducts, DepositOptions, SpotPrice
 
+
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    # fields=('id', 'fin_prdt_nm') 처럼 넘기면 그 필드만 남긴다 (?fields= 파라미터용)
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
 # 1. 예적금 상품 Serializer
 class DepositOptionsSerializer(serializers.ModelSerializer):
     class Meta:
         model = DepositOptions
-        fields = '__all__'
+        fields = ('id', 'product', 'fin_prdt_cd', 'intr_rate_type_nm', 'rsrv_type_nm', 'intr_rate', 'intr_rate2', 'save_trm')
         read_only_fields = ('product',) # 읽기 전용 설정
 
-class DepositProductsSerializer(serializers.ModelSerializer):
+
+# [F09] 임베딩 컬럼(embedding 등)은 응답에 절대 포함하지 않음 (상품당 수십 KB)
+PRODUCT_DETAIL_FIELDS = (
+    'id', 'fin_prdt_cd', 'product_type', 'kor_co_nm', 'fin_prdt_nm', 'etc_note',
+    'join_deny', 'join_way', 'spcl_cnd', 'max_intr_rate', 'max_intr_rate2', 'is_active', 'updated_at', 'options',
+)
+# 목록 화면에서 쓰는 필드만 (긴 텍스트인 우대조건/유의사항은 상세에서)
+PRODUCT_LIST_FIELDS = (
+    'id', 'fin_prdt_cd', 'product_type', 'kor_co_nm', 'fin_prdt_nm', 'join_deny', 'join_way',
+    'max_intr_rate', 'max_intr_rate2', 'options',
+)
+
+
+class DepositProductDetailSerializer(DynamicFieldsModelSerializer):
     # 역참조를 통해 옵션 정보도 같이 포함 (related_name='options' 필수)
     options = DepositOptionsSerializer(many=True, read_only=True)
 
     class Meta:
         model = DepositProducts
-        fields = '__all__'
+        fields = PRODUCT_DETAIL_FIELDS
+
+
+class DepositProductListSerializer(DepositProductDetailSerializer):
+    # fields 를 따로 주지 않으면 목록용 필드만
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, fields=fields or PRODUCT_LIST_FIELDS, **kwargs)
+
 
 # 2. 금/은 시세 Serializer
 class SpotPriceSerializer(serializers.ModelSerializer):
     class Meta:
         model = SpotPrice
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
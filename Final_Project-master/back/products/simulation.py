@@ -0,0 +1,184 @@
+# back/products/simulation.py
+
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from django.conf import settings
+
+from .models import DepositProducts, DepositOptions, CatalogVersion
+
+
+# -----------------------------
+# [F03] 만기 수령액 계산 (모든 옵션을 NumPy 배열로 한 번에)
+# -----------------------------
+# - lump    (예금): 원금 P 를 n 개월 예치
+#     단리: P * r * n/12
+#     복리: P * ((1 + r/12)^n - 1)                       (월복리)
+# - monthly (적금): 매월 M 씩 n 번 납입 (적립유형과 상관없이 매월 같은 금액을 낸다고 가정)
+#     단리: M * r/12 * n(n+1)/2
+#     복리: M * ((1 + r/12) * ((1 + r/12)^n - 1) / (r/12) - n)
+# - 세금: 이자에만 부과 (일반 15.4%, 세금우대 9.5%, 비과세 0%)
+
+TAX_RATES = {
+    'general': 0.154,
+    'preferential': 0.095,
+    'exempt': 0.0,
+}
+MODES = ('lump', 'monthly')
+# 예치 방식별 대상 상품 (lump: 정기예금, monthly: 적금)
+MODE_PRODUCT_TYPES = {
+    'lump': DepositProducts.PRODUCT_TYPE_DEPOSIT,
+    'monthly': DepositProducts.PRODUCT_TYPE_SAVING,
+}
+COMPOUND_TYPE_NAME = '복리'
+
+
+def maturity_interest(amount, months, rates, compound, mode='lump'):
+    """
+    amount: 원금(lump) 또는 월 납입액(monthly)
+    months, rates(연 %), compound(bool): 옵션별 배열 -> (총 납입 원금, 세전 이자) 배열
+    """
+    months = np.asarray(months, dtype=np.float64)
+    monthly_rate = np.asarray(rates, dtype=np.float64) / 100 / 12
+    compound = np.asarray(compound, dtype=bool)
+
+    if mode == 'lump':
+        principal = np.full(months.shape, float(amount))
+        simple = amount * monthly_rate * months
+        compounded = amount * np.expm1(months * np.log1p(monthly_rate))
+    else:
+        principal = amount * months
+        simple = amount * monthly_rate * months * (months + 1) / 2
+        growth = np.expm1(months * np.log1p(monthly_rate))
+        # 금리 0 이면 0/0 이 되므로 분모를 1 로 바꾸고 결과는 0 (이자 없음)
+        safe_rate = np.where(monthly_rate > 0, monthly_rate, 1.0)
+        compounded = np.where(monthly_rate > 0, amount * ((1 + monthly_rate) * growth / safe_rate - months), 0.0)
+
+    return principal, np.where(compound, compounded, simple)
+
+
+@dataclass(frozen=True)
+class OptionSnapshot:
+    """
+    한 카탈로그 버전의 전체 옵션 열 배열. 다시 로드할 때는 새 스냅숏을 만들어 한 번에 바꿔 끼우므로
+    계산 중인 요청은 끝까지 같은 버전의 열들만 본다.
+    - intr_rate_type_nm / rsrv_type_nm: 응답에 그대로 내려줄 옵션의 금리유형/적립유형 이름
+    """
+    version: int
+    option_ids: np.ndarray
+    product_ids: np.ndarray
+    product_types: np.ndarray
+    save_trm: np.ndarray
+    intr_rate: np.ndarray
+    intr_rate2: np.ndarray
+    compound: np.ndarray
+    intr_rate_type_nm: np.ndarray
+    rsrv_type_nm: np.ndarray
+
+    @property
+    def size(self):
+        return len(self.option_ids)
+
+
+class OptionTable:
+    """
+    전체 옵션을 열 단위 NumPy 배열(OptionSnapshot)로 들고 있는 표 (카탈로그 버전이 바뀌면 다시 로드)
+    요청마다 DB 를 읽지 않도록 버전은 check_seconds 에 한 번만 확인 (추천 인덱스와 같은 방식)
+    """
+
+    def __init__(self, check_seconds=None):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._checked_at = 0.0
+        if check_seconds is None:
+            check_seconds = settings.RECOMMEND['INDEX_CHECK_SECONDS']
+        self.check_seconds = check_seconds
+
+    def catalog_version(self):
+        now = time.monotonic()
+        if self._version is None or now - self._checked_at >= self.check_seconds:
+            self._version = CatalogVersion.current().version
+            self._checked_at = now
+        return self._version
+
+    def _load(self, version):
+        rows = list(
+            DepositOptions.objects
+            .filter(product__is_active=True)
+            .order_by('id')
+            .values_list(
+                'id', 'product_id', 'save_trm', 'intr_rate', 'intr_rate2', 'intr_rate_type_nm', 'product__product_type',
+                'rsrv_type_nm',
+            )
+        )
+        columns = list(zip(*rows)) if rows else [()] * 8
+        return OptionSnapshot(
+            version=version,
+            option_ids=np.array(columns[0], dtype=np.int64),
+            product_ids=np.array(columns[1], dtype=np.int64),
+            save_trm=np.array(columns[2], dtype=np.int64),
+            # 금리가 없으면 수집 단계에서 -1 로 저장됨 -> NaN 으로 두고 계산에서 제외
+            intr_rate=np.array([r if r is not None and r >= 0 else np.nan for r in columns[3]], dtype=np.float64),
+            intr_rate2=np.array([r if r is not None and r >= 0 else np.nan for r in columns[4]], dtype=np.float64),
+            compound=np.array([name == COMPOUND_TYPE_NAME for name in columns[5]], dtype=bool),
+            product_types=np.array(columns[6], dtype=object),
+            intr_rate_type_nm=np.array(columns[5], dtype=object),
+            rsrv_type_nm=np.array(columns[7], dtype=object),
+        )
+
+    def ensure_loaded(self):
+        """현재 스냅숏 (버전이 바뀌었으면 새로 로드해서 교체)"""
+        version = self.catalog_version()
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._load(version)
+                self._snapshot = snapshot
+        return snapshot
+
+    def invalidate(self):
+        self._version = None
+        self._snapshot = None
+
+    def simulate(self, amount, mode='lump', tax='general', term=None, rate='intr_rate2'):
+        """
+        예치 방식에 맞는 상품(lump: 예금, monthly: 적금) 옵션의 세전/세후 만기 수령액을 계산해서
+        세후 수령액 내림차순으로 정렬.
+        반환값: dict (열 이름 -> 배열), 모두 같은 순서
+        """
+        table = self.ensure_loaded()
+        rates = table.intr_rate2 if rate == 'intr_rate2' else table.intr_rate
+        mask = ~np.isnan(rates) & (table.product_types == MODE_PRODUCT_TYPES[mode])
+        if term is not None:
+            mask &= table.save_trm == term
+
+        idx = np.flatnonzero(mask)
+        principal, interest = maturity_interest(amount, table.save_trm[idx], rates[idx], table.compound[idx], mode)
+        tax_amount = np.floor(interest * TAX_RATES[tax])
+        after_tax = principal + interest - tax_amount
+
+        # 세후 수령액이 같으면 옵션 id 가 작은 순
+        order = np.lexsort((table.option_ids[idx], -after_tax))
+        idx = idx[order]
+        return {
+            'option_ids': table.option_ids[idx],
+            'product_ids': table.product_ids[idx],
+            'save_trm': table.save_trm[idx],
+            'rate': rates[idx],
+            'compound': table.compound[idx],
+            'intr_rate_type_nm': table.intr_rate_type_nm[idx],
+            'rsrv_type_nm': table.rsrv_type_nm[idx],
+            'principal': principal[order],
+            'interest': interest[order],
+            'tax': tax_amount[order],
+            'after_tax': after_tax[order],
+        }
+
+
+option_table = OptionTable()
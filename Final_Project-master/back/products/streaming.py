@@ -0,0 +1,72 @@
+# back/products/streaming.py
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+try:
+    import orjson
+except ImportError:  # requirements.txt 에 있지만 설치 안 된 환경에서는 표준 json 으로 (결과는 같고 속도만 다름)
+    orjson = None
+
+
+# -----------------------------
+# [F03/F04] 스트리밍 JSON 응답
+# -----------------------------
+# 전체 목록을 serializer.data (파이썬 리스트) 로 만든 뒤 한 번에 렌더링하지 않고
+# queryset.iterator(chunk_size) 로 조금씩 읽으면서 JSON 배열을 바로 흘려보낸다.
+# -> 응답 크기와 상관없이 메모리는 청크 하나만큼, 첫 바이트도 첫 청크를 읽자마자 나감.
+# 응답 본문은 Response(serializer.data) 와 같은 JSON 배열이다.
+
+_encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+
+def _orjson_default(value):
+    # orjson 이 직접 처리하지 못하는 타입(Decimal, lazy 문자열 등)은 Django 인코더 규칙으로
+    return _encoder.default(value)
+
+
+def dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, default=_orjson_default)
+    return _encoder.encode(value).encode('utf-8')
+
+
+def iter_json_array(rows, to_representation, buffer_size=None):
+    """
+    rows 를 하나씩 직렬화해서 JSON 배열 조각(bytes)으로 yield
+    buffer_size: 이만큼 모아서 한 번에 내보냄 (행마다 write 하지 않도록)
+    """
+    buffer_size = buffer_size or settings.STREAMING_RESPONSES['BUFFER_ROWS']
+    parts = [b'[']
+    first = True
+    for row in rows:
+        if not first:
+            parts.append(b',')
+        parts.append(dumps(to_representation(row)))
+        first = False
+        if len(parts) >= buffer_size * 2:
+            yield b''.join(parts)
+            parts = []
+    parts.append(b']')
+    yield b''.join(parts)
+
+
+def stream_queryset(queryset, serializer, chunk_size=None):
+    """
+    queryset 을 chunk_size 행씩 읽어서 serializer.to_representation 결과를 JSON 배열로 스트리밍
+    (prefetch_related 가 있으면 청크마다 prefetch 됨)
+    """
+    chunk_size = chunk_size or settings.STREAMING_RESPONSES['CHUNK_SIZE']
+    return StreamingHttpResponse(
+        iter_json_array(queryset.iterator(chunk_size=chunk_size), serializer.to_representation),
+        content_type='application/json',
+    )
+
+
+def wants_stream(request):
+    # ?stream=1 로 요청하면 스트리밍 (기본값은 settings 에서)
+    value = request.GET.get('stream', '').strip().lower()
+    if not value:
+        return settings.STREAMING_RESPONSES['DEFAULT']
+    return value in ('1', 'true', 'yes')
@@ -0,0 +1,269 @@
+# back/products/stub_api.py
+
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+import numpy as np
+import requests
+
+
+# -----------------------------
+# [F03/F09] 금감원 API / 임베딩 API 로컬 대역 서버 (녹화 + 재생)
+# -----------------------------
+# 네트워크 없이 수집(get_deposit_products)과 추천(recommend, recommendation) 처리량을 재현 가능하게 재기 위한 서버.
+#
+# - GET  /finlifeapi/<depositProductsSearch|savingProductsSearch>.json?topFinGrpNo=..&pageNo=..
+# - POST /v1/embeddings  {"model": ..., "input": [...]}
+#
+# mode
+#   replay : 녹화된 응답만 돌려줌 (없으면 금감원은 404, 임베딩은 synthesize 옵션에 따라 가짜 벡터 또는 404)
+#   record : 실제 API(upstream)로 전달하고 응답을 디스크에 저장 (인증키는 저장하지 않음)
+#   auto   : 녹화가 있으면 재생, 없으면 녹화
+#
+# 녹화 파일 (cassette_dir)
+#   finlife/<endpoint>/<topFinGrpNo>_<pageNo>.json   응답 본문 그대로
+#   embeddings/<model>.jsonl                          {"text": ..., "embedding": [...]} 한 줄에 하나
+#   -> 임베딩은 요청 단위가 아니라 문장 단위로 저장해서 배치 크기가 달라도 재생된다.
+#
+# 모든 응답에 latency(+jitter) 초 지연, error_rate 확률로 503 (Retry-After 포함) 을 넣을 수 있다.
+# seed 를 고정하면 같은 순서의 요청에 같은 지연/오류가 나온다.
+
+MODES = ('replay', 'record', 'auto')
+FINLIFE_PREFIX = '/finlifeapi/'
+EMBEDDINGS_PATH = '/v1/embeddings'
+
+
+class CassetteStore:
+    """녹화 파일 읽기/쓰기 (스레드 안전)"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._embeddings = {}  # model -> {text: list}
+
+    # 금감원 API -----------------------------------------------------------
+    def _finlife_path(self, endpoint, group, page):
+        return os.path.join(self.root, 'finlife', endpoint, f'{group}_{page}.json')
+
+    def load_finlife(self, endpoint, group, page):
+        path = self._finlife_path(endpoint, group, page)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def save_finlife(self, endpoint, group, page, body):
+        path = self._finlife_path(endpoint, group, page)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, open(path, 'wb') as f:
+            f.write(body)
+
+    # 임베딩 API -----------------------------------------------------------
+    def _embedding_path(self, model):
+        safe = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in model)
+        return os.path.join(self.root, 'embeddings', f'{safe}.jsonl')
+
+    def embeddings(self, model):
+        with self._lock:
+            if model not in self._embeddings:
+                vectors = {}
+                path = self._embedding_path(model)
+                if os.path.exists(path):
+                    with open(path, encoding='utf-8') as f:
+                        for line in f:
+                            if line.strip():
+                                row = json.loads(line)
+                                vectors[row['text']] = row['embedding']
+                self._embeddings[model] = vectors
+            return self._embeddings[model]
+
+    def save_embeddings(self, model, pairs):
+        vectors = self.embeddings(model)
+        path = self._embedding_path(model)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._lock, open(path, 'a', encoding='utf-8') as f:
+            for text, embedding in pairs:
+                if text not in vectors:
+                    f.write(json.dumps({'text': text, 'embedding': embedding}, ensure_ascii=False) + '\n')
+                    vectors[text] = embedding
+
+
+def synthetic_embedding(text, dim):
+    # 녹화에 없는 문장용 가짜 벡터 (같은 문장이면 항상 같은 값, 단위 벡터)
+    seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:8], 'little')
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+class StubConfig:
+    def __init__(self, cassette_dir, mode='replay', latency=0.0, jitter=0.0, error_rate=0.0, seed=None,
+                 synthesize=False, embedding_dim=3072, finlife_upstream='', embeddings_upstream='', timeout=30):
+        if mode not in MODES:
+            raise ValueError(f'mode 는 {", ".join(MODES)} 중 하나여야 합니다.')
+        self.store = CassetteStore(cassette_dir)
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.synthesize = synthesize
+        self.embedding_dim = embedding_dim
+        self.finlife_upstream = finlife_upstream.rstrip('/')
+        self.embeddings_upstream = embeddings_upstream
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self.stats = {'requests': 0, 'replayed': 0, 'recorded': 0, 'synthesized': 0, 'injected_errors': 0, 'missing': 0}
+
+    def draw(self):
+        """이번 요청의 (지연 초, 오류 주입 여부)"""
+        with self._random_lock:
+            delay = self.latency + (self.random.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+            fail = self.error_rate > 0 and self.random.random() < self.error_rate
+        return max(delay, 0.0), fail
+
+    def count(self, key):
+        with self._random_lock:
+            self.stats[key] += 1
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = 'FinlifeStub/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def config(self):
+        return self.server.config
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, body, content_type='application/json; charset=utf-8', headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, data, headers=None):
+        self._send(status, json.dumps(data, ensure_ascii=False).encode('utf-8'), headers=headers)
+
+    def _inject(self):
+        """지연 + 오류 주입. 오류를 보냈으면 True"""
+        self.config.count('requests')
+        delay, fail = self.config.draw()
+        if delay:
+            time.sleep(delay)
+        if fail:
+            self.config.count('injected_errors')
+            self._send_json(503, {'error': 'injected error'}, headers={'Retry-After': '0'})
+        return fail
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if not url.path.startswith(FINLIFE_PREFIX):
+            return self._send_json(404, {'error': f'unknown path {url.path}'})
+        endpoint = url.path[len(FINLIFE_PREFIX):]
+        params = dict(parse_qsl(url.query))
+        group, page = params.get('topFinGrpNo', ''), params.get('pageNo', '1')
+        # 녹화 파일 경로에 쓰이는 값이라 디렉터리를 벗어나지 못하게 검사
+        if os.path.basename(endpoint) != endpoint or not endpoint.endswith('.json') \
+                or not group.isdigit() or not page.isdigit():
+            return self._send_json(400, {'error': 'invalid endpoint or parameters'})
+
+        if self._inject():
+            return
+
+        config = self.config
+        body = None if config.mode == 'record' else config.store.load_finlife(endpoint, group, page)
+        if body is not None:
+            config.count('replayed')
+            return self._send(200, body)
+        if config.mode == 'replay' or not config.finlife_upstream:
+            config.count('missing')
+            return self._send_json(404, {'result': {'err_cd': '404', 'err_msg': f'녹화 없음: {endpoint} {group} {page}'}})
+
+        try:
+            response = requests.get(f'{config.finlife_upstream}/{endpoint}', params=params, timeout=config.timeout)
+        except requests.RequestException as e:
+            return self._send_json(502, {'error': str(e)})
+        # 오류 응답(err_cd != 000)은 저장하지 않음
+        try:
+            succeeded = response.status_code == 200 and response.json()['result'].get('err_cd') == '000'
+        except (ValueError, KeyError, AttributeError):
+            succeeded = False
+        if succeeded:
+            config.store.save_finlife(endpoint, group, page, response.content)
+            config.count('recorded')
+        self._send(response.status_code, response.content)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length)
+        if url.path != EMBEDDINGS_PATH:
+            return self._send_json(404, {'error': f'unknown path {url.path}'})
+        try:
+            payload = json.loads(raw)
+            model = payload['model']
+            texts = payload['input']
+            texts = [texts] if isinstance(texts, str) else list(texts)
+        except (ValueError, KeyError, TypeError):
+            return self._send_json(400, {'error': 'invalid request body'})
+
+        if self._inject():
+            return
+
+        config = self.config
+        recorded = {} if config.mode == 'record' else config.store.embeddings(model)
+        missing = [text for text in dict.fromkeys(texts) if text not in recorded]
+
+        if missing and config.mode != 'replay' and config.embeddings_upstream:
+            try:
+                response = requests.post(
+                    config.embeddings_upstream,
+                    headers={'Authorization': self.headers.get('Authorization', ''), 'Content-Type': 'application/json'},
+                    json={'model': model, 'input': missing},
+                    timeout=config.timeout,
+                )
+            except requests.RequestException as e:
+                return self._send_json(502, {'error': str(e)})
+            if response.status_code != 200:
+                return self._send(response.status_code, response.content)
+            data = sorted(response.json()['data'], key=lambda item: item.get('index', 0))
+            config.store.save_embeddings(model, [(t, item['embedding']) for t, item in zip(missing, data)])
+            config.count('recorded')
+            recorded = config.store.embeddings(model)
+            missing = []
+
+        if missing and not config.synthesize:
+            config.count('missing')
+            return self._send_json(404, {'error': f'녹화 없음: 문장 {len(missing)}개'})
+
+        # 가짜 벡터 차원은 녹화된 벡터가 있으면 그 차원에 맞춤 (한 응답 안에서 차원이 섞이지 않게)
+        dim = len(next(iter(recorded.values()))) if recorded else config.embedding_dim
+        data = []
+        for i, text in enumerate(texts):
+            if text in recorded:
+                embedding = recorded[text]
+            else:
+                embedding = synthetic_embedding(text, dim)
+            data.append({'object': 'embedding', 'index': i, 'embedding': embedding})
+        config.count('synthesized' if missing else 'replayed')
+        self._send_json(200, {'object': 'list', 'model': model, 'data': data})
+
+
+def make_server(config, host='127.0.0.1', port=8765, verbose=False):
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.config = config
+    server.verbose = verbose
+    return server
@@ -1,3 +1,1385 @@
-from django.test import TestCase
+import io
+import json
+import math
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import requests
+from django.conf import settings
+from django.core.management import CommandError, call_command, load_command_class
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.test import APIClient
+
+from . import embeddings, recommender, scheduler, search, streaming, views
+from .ann import IVFIndex
+from .changes import get_checkpoint, is_behind, pending_changes
+from .embeddings import EmbeddingError
+from .models import (
+    CatalogChange, CatalogVersion, DepositOptions, DepositProductChunk, DepositProducts, JobLock, JobRun,
+    QueryEmbedding, SpotPrice,
+)
+from .search import FTS_TABLE, ensure_search_triggers, search_product_ids
+from .serializers import PRODUCT_DETAIL_FIELDS, PRODUCT_LIST_FIELDS
+from .simulation import TAX_RATES, maturity_interest, option_table
+from .stub_api import CassetteStore, StubConfig, make_server
+from .vectors import decode_vector, encode_vector
+
+
+# -----------------------------
+# 테스트용 금감원 / 임베딩 API (stub_api 녹화 재생 서버)
+# -----------------------------
+# 실제 API 대신 임시 폴더의 녹화 파일을 재생하는 서버를 띄우고 settings 를 그쪽으로 돌린다.
+# 금감원 응답은 publish() 로 녹화 파일을 바꿔서 만들고, 임베딩은 문장 해시로 만든 가짜 벡터.
+
+EMBEDDING_DIM = 64
+GROUP = '020000'
+
+
+def base(code, bank, name, spcl_cnd='', join_deny='1'):
+    return {
+        'fin_prdt_cd': code, 'kor_co_nm': bank, 'fin_prdt_nm': name, 'join_deny': join_deny,
+        'join_way': '인터넷,스마트폰', 'spcl_cnd': spcl_cnd, 'etc_note': '',
+    }
+
+
+def option(code, term, rate, rate2, type_nm='단리', rsrv_type_nm=None):
+    row = {'fin_prdt_cd': code, 'save_trm': str(term), 'intr_rate_type_nm': type_nm, 'intr_rate': rate, 'intr_rate2': rate2}
+    if rsrv_type_nm:
+        row['rsrv_type_nm'] = rsrv_type_nm
+    return row
+
+
+DEPOSITS = [
+    base('D001', '우리은행', 'WON플러스예금', '급여이체 실적이 있으면 우대금리'),
+    base('D002', '국민은행', 'KB스타정기예금', '비대면 채널로 가입하면 우대금리'),
+    base('D003', '신한은행', '쏠편한정기예금', '첫 거래 고객 우대금리'),
+    base('D004', '우리은행', '첫거래우대정기예금', '첫 거래 고객 우대금리'),
+    base('D005', '하나은행', '하나의정기예금', '마케팅 동의 시 우대금리'),
+]
+DEPOSIT_OPTIONS = [
+    option('D001', 6, 2.5, 2.8), option('D001', 12, 3.0, 3.3),
+    option('D002', 6, 2.6, 2.9), option('D002', 12, 3.1, 3.5, '복리'),
+    option('D003', 6, 2.4, 2.4), option('D003', 12, 2.9, 3.5),
+    option('D004', 6, 2.0, 2.2), option('D004', 12, 2.5, 3.0),
+    option('D005', 6, 2.7, 3.0), option('D005', 12, 3.2, 3.4),
+]
+SAVINGS = [base('S001', '국민은행', 'KB내맘대로적금', '자동이체로 납입하면 우대금리')]
+SAVING_OPTIONS = [
+    option('S001', 12, 3.0, 3.5, '단리', '자유적립식'),
+    option('S001', 12, 3.0, 3.6, '복리', '정액적립식'),
+]
+
+
+def reset_process_state():
+    """프로세스에 남는 캐시(임베딩 제공자, 질문 LRU, 응답 캐시, 추천 인덱스 ...) 초기화 - 테스트마다 DB 가 바뀌므로"""
+    embeddings._provider = None
+    embeddings.query_embedding_cache._lru = None
+    with views._response_cache_lock:
+        views._response_cache.clear()
+    for index in (recommender.recommendation_index, recommender.chunk_recommendation_index,
+                  recommender.compressed_recommendation_index):
+        index.invalidate()
+    recommender._rate_ranking_cache['signature'] = None
+    option_table.invalidate()
+    search._available.clear()
+
+
+class StubApiMixin:
+    """
+    TestCase 와 같이 상속해서 사용. 클래스마다 stub 서버 1개, 테스트마다 기본 카탈로그를 녹화해 둔다.
+    - publish(...) : 다음 수집 때 금감원 API 가 돌려줄 상품/옵션 목록
+    - collect(...) : get_deposit_products 실행 (커맨드 객체를 돌려줘서 stats 확인 가능)
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cassette_dir = tempfile.mkdtemp()
+        cls.store = CassetteStore(cls.cassette_dir)
+        cls.stub = make_server(
+            StubConfig(cls.cassette_dir, mode='replay', synthesize=True, embedding_dim=EMBEDDING_DIM), port=0,
+        )
+        threading.Thread(target=cls.stub.serve_forever, daemon=True).start()
+
+        url = f'http://127.0.0.1:{cls.stub.server_address[1]}'
+        remote = settings.EMBEDDING_PROVIDERS['remote']
+        cls.stub_settings = override_settings(
+            FINLIFE={**settings.FINLIFE, 'BASE_URL': f'{url}/finlifeapi', 'GROUPS': [GROUP], 'RETRIES': 0},
+            EMBEDDING_PROVIDER='remote',
+            EMBEDDING_PROVIDERS={
+                **settings.EMBEDDING_PROVIDERS,
+                'remote': {**remote, 'OPTIONS': {**remote['OPTIONS'], 'url': f'{url}/v1/embeddings', 'api_key': 'test'}},
+            },
+        )
+        cls.stub_settings.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.stub_settings.disable()
+        cls.stub.shutdown()
+        cls.stub.server_close()
+        shutil.rmtree(cls.cassette_dir, ignore_errors=True)
+
+    def setUp(self):
+        super().setUp()
+        reset_process_state()
+        self.addCleanup(reset_process_state)
+        self.publish()
+
+    def publish(self, deposits=DEPOSITS, deposit_options=DEPOSIT_OPTIONS, savings=SAVINGS, saving_options=SAVING_OPTIONS):
+        endpoints = settings.FINLIFE['ENDPOINTS']
+        for endpoint, base_list, option_list in (
+            (endpoints['deposit'], deposits, deposit_options),
+            (endpoints['saving'], savings, saving_options),
+        ):
+            body = {'result': {
+                'err_cd': '000', 'err_msg': '정상', 'max_page_no': 1, 'now_page_no': 1,
+                'baseList': base_list, 'optionList': option_list,
+            }}
+            self.store.save_finlife(endpoint, GROUP, 1, json.dumps(body, ensure_ascii=False).encode('utf-8'))
+
+    def run_command(self, name, *args):
+        command = load_command_class('products', name)
+        call_command(command, *args, stdout=io.StringIO(), stderr=io.StringIO())
+        return command
+
+    def collect(self, *args):
+        command = self.run_command('get_deposit_products', *args)
+        recommender.recommendation_index.invalidate()
+        return command
+
+
+# -----------------------------
+# [F03] 수집 (get_deposit_products): 일괄 upsert + 같은 응답이면 아무것도 바꾸지 않음
+# -----------------------------
+class DepositIngestTests(StubApiMixin, TestCase):
+
+    def test_first_collect_creates_catalog(self):
+        stats = self.collect().stats
+
+        self.assertEqual(DepositProducts.objects.count(), 6)
+        self.assertEqual(DepositOptions.objects.count(), 12)
+        self.assertEqual(DepositProducts.objects.get(fin_prdt_cd='S001').product_type, DepositProducts.PRODUCT_TYPE_SAVING)
+        self.assertEqual(stats['created_products'], 6)
+        self.assertEqual(stats['created_options'], 12)
+        self.assertTrue(stats['changed'])
+        self.assertEqual(CatalogVersion.current().version, 1)
+        # 최고 금리 요약도 같은 수집에서 계산
+        self.assertEqual(DepositProducts.objects.get(fin_prdt_cd='D002').max_intr_rate2, 3.5)
+
+    def test_same_response_is_noop(self):
+        self.collect()
+        updated_at = dict(DepositProducts.objects.values_list('fin_prdt_cd', 'updated_at'))
+        change_count = CatalogChange.objects.count()
+
+        stats = self.collect().stats
+
+        self.assertFalse(stats['changed'])
+        self.assertEqual(stats['created_products'] + stats['updated_products'] + stats['updated_options'], 0)
+        self.assertEqual(CatalogVersion.current().version, 1)
+        self.assertEqual(CatalogChange.objects.count(), change_count)
+        self.assertEqual(dict(DepositProducts.objects.values_list('fin_prdt_cd', 'updated_at')), updated_at)
+
+    def test_changed_rate_updates_only_that_option(self):
+        self.collect()
+        options = [option('D001', 12, 3.0, 3.9) if (o['fin_prdt_cd'], o['save_trm']) == ('D001', '12') else o
+                   for o in DEPOSIT_OPTIONS]
+        self.publish(deposit_options=options)
+
+        stats = self.collect().stats
+
+        self.assertEqual((stats['updated_options'], stats['created_options'], stats['updated_products']), (1, 0, 0))
+        self.assertEqual(DepositOptions.objects.count(), 12)
+        self.assertEqual(DepositProducts.objects.get(fin_prdt_cd='D001').max_intr_rate2, 3.9)
+        self.assertEqual(CatalogVersion.current().version, 2)
+
+    def test_duplicate_rows_in_response_are_merged(self):
+        self.publish(deposits=DEPOSITS + [DEPOSITS[0]], deposit_options=DEPOSIT_OPTIONS + [DEPOSIT_OPTIONS[0]])
+        self.collect()
+
+        self.assertEqual(DepositProducts.objects.filter(fin_prdt_cd='D001').count(), 1)
+        self.assertEqual(DepositOptions.objects.count(), 12)
+
+    def test_failed_fetch_leaves_database_untouched(self):
+        self.collect()
+        # 예금 녹화는 그대로, 적금만 404 -> 일부만 받은 상태로 반영하지 않아야 함
+        os.remove(os.path.join(self.cassette_dir, 'finlife', settings.FINLIFE['ENDPOINTS']['saving'], f'{GROUP}_1.json'))
+        with self.assertRaises(CommandError):
+            self.collect()
+
+        self.assertEqual(DepositProducts.objects.filter(is_active=True).count(), 6)
+        self.assertEqual(CatalogVersion.current().version, 1)
+
+
+# -----------------------------
+# [F03] 동시 수집: (상품 종류 x 권역 x 페이지) 전체 + 일부 권역/종류만 받으면 나머지는 판매 중지하지 않음
+# -----------------------------
+class DepositConcurrentFetchTests(StubApiMixin, TestCase):
+    OTHER_GROUP = '030300'
+
+    def setUp(self):
+        super().setUp()
+        groups = override_settings(FINLIFE={**settings.FINLIFE, 'GROUPS': [GROUP, self.OTHER_GROUP]})
+        groups.enable()
+        self.addCleanup(groups.disable)
+
+    def publish_page(self, product_type, group, page, max_page_no, base_list, option_list):
+        body = {'result': {
+            'err_cd': '000', 'err_msg': '정상', 'max_page_no': max_page_no, 'now_page_no': page,
+            'baseList': base_list, 'optionList': option_list,
+        }}
+        endpoint = settings.FINLIFE['ENDPOINTS'][product_type]
+        self.store.save_finlife(endpoint, group, page, json.dumps(body, ensure_ascii=False).encode('utf-8'))
+
+    def publish_catalog(self):
+        # 예금: 1권역 2페이지 + 2권역 1페이지, 적금: 권역마다 1페이지 (2권역은 빈 목록)
+        self.publish_page('deposit', GROUP, 1, 2, DEPOSITS[:3], DEPOSIT_OPTIONS[:6])
+        self.publish_page('deposit', GROUP, 2, 2, DEPOSITS[3:4], DEPOSIT_OPTIONS[6:8])
+        self.publish_page('deposit', self.OTHER_GROUP, 1, 1, DEPOSITS[4:], DEPOSIT_OPTIONS[8:])
+        self.publish_page('saving', GROUP, 1, 1, SAVINGS, SAVING_OPTIONS)
+        self.publish_page('saving', self.OTHER_GROUP, 1, 1, [], [])
+
+    def test_all_pages_of_all_groups_and_types_are_collected(self):
+        self.publish_catalog()
+
+        stats = self.collect('--workers', '3').stats
+
+        self.assertEqual((stats['pages'], stats['products'], stats['options']), (5, 6, 12))
+        self.assertEqual(stats['created_products'], 6)
+        self.assertEqual(
+            dict(DepositProducts.objects.filter(fin_prdt_cd__in=['D004', 'D005', 'S001']).values_list('fin_prdt_cd', 'product_type')),
+            {'D004': DepositProducts.PRODUCT_TYPE_DEPOSIT, 'D005': DepositProducts.PRODUCT_TYPE_DEPOSIT,
+             'S001': DepositProducts.PRODUCT_TYPE_SAVING},
+        )
+        self.assertEqual(DepositOptions.objects.filter(fin_prdt_cd='S001').count(), 2)
+
+    def test_failed_later_page_leaves_database_untouched(self):
+        self.publish_catalog()
+        self.collect()
+        os.remove(os.path.join(self.cassette_dir, 'finlife', settings.FINLIFE['ENDPOINTS']['deposit'], f'{GROUP}_2.json'))
+
+        with self.assertRaises(CommandError):
+            self.collect()
+
+        self.assertEqual(DepositProducts.objects.filter(is_active=True).count(), 6)
+        self.assertEqual(CatalogVersion.current().version, 1)
+
+    def test_partial_group_collect_keeps_other_products(self):
+        self.publish_catalog()
+        self.collect()
+
+        stats = self.collect('--groups', self.OTHER_GROUP).stats
+
+        self.assertEqual((stats['pages'], stats['products'], stats['removed_products']), (2, 1, 0))
+        self.assertEqual(DepositProducts.objects.filter(is_active=True).count(), 6)
+
+    def test_partial_type_collect_removes_only_that_type(self):
+        self.publish_catalog()
+        self.collect()
+        self.publish_page('saving', GROUP, 1, 1, [], [])
+
+        stats = self.collect('--types', 'saving').stats
+
+        self.assertEqual((stats['pages'], stats['removed_products']), (2, 1))
+        self.assertFalse(DepositProducts.objects.get(fin_prdt_cd='S001').is_active)
+        self.assertEqual(DepositProducts.objects.filter(is_active=True, product_type=DepositProducts.PRODUCT_TYPE_DEPOSIT).count(), 5)
+
+
+# -----------------------------
+# [F03] 변경 이력 (CatalogChange) + 판매 중지(소프트 삭제) + 소비자 체크포인트
+# -----------------------------
+class CatalogChangeTests(StubApiMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def changes(self, code):
+        return list(
+            CatalogChange.objects.filter(product__fin_prdt_cd=code, entity=CatalogChange.ENTITY_PRODUCT)
+            .order_by('id').values_list('action', flat=True)
+        )
+
+    def test_every_change_is_logged_with_version(self):
+        self.collect()
+        self.assertEqual(CatalogChange.objects.filter(action=CatalogChange.ACTION_ADDED).count(), 6 + 12)
+        self.assertEqual(set(CatalogChange.objects.values_list('version', flat=True)), {1})
+
+        deposits = [base('D002', '국민은행', 'KB스타정기예금', '비대면 가입 우대금리 0.3%p') if b['fin_prdt_cd'] == 'D002' else b
+                    for b in DEPOSITS]
+        self.publish(deposits=deposits)
+        self.collect()
+
+        change = CatalogChange.objects.get(version=2)
+        self.assertEqual((change.product.fin_prdt_cd, change.action), ('D002', CatalogChange.ACTION_CHANGED))
+        self.assertEqual(change.detail, {'fields': ['spcl_cnd']})
+
+    def test_missing_product_is_soft_deleted_and_restored(self):
+        self.collect()
+        self.publish(deposits=[b for b in DEPOSITS if b['fin_prdt_cd'] != 'D003'])
+        self.assertEqual(self.collect().stats['removed_products'], 1)
+
+        product = DepositProducts.objects.get(fin_prdt_cd='D003')
+        self.assertFalse(product.is_active)
+        self.assertIsNotNone(product.deleted_at)
+        self.assertEqual(product.options.count(), 2)  # 가입 내역이 있을 수 있어 행은 그대로
+        self.assertEqual(self.changes('D003'), [CatalogChange.ACTION_ADDED, CatalogChange.ACTION_REMOVED])
+        # 목록에서는 빠지고 상세는 그대로 조회
+        codes = [row['fin_prdt_cd'] for row in self.client.get('/api/v1/products/deposit/').json()]
+        self.assertNotIn('D003', codes)
+        self.assertEqual(self.client.get('/api/v1/products/deposit/D003/').status_code, 200)
+
+        # 다시 나타나면 판매 재개 + 추가로 기록
+        self.publish()
+        self.collect()
+        product.refresh_from_db()
+        self.assertTrue(product.is_active)
+        self.assertIsNone(product.deleted_at)
+        self.assertEqual(self.changes('D003')[-1], CatalogChange.ACTION_ADDED)
+
+    def test_partial_group_collect_does_not_remove_products(self):
+        self.collect()
+        self.publish(deposits=[b for b in DEPOSITS if b['fin_prdt_cd'] != 'D003'])
+        self.collect('--groups', GROUP)
+        self.assertTrue(DepositProducts.objects.get(fin_prdt_cd='D003').is_active)
+
+    def test_recommendation_consumes_changes_after_checkpoint(self):
+        self.collect()
+        self.assertIsNone(get_checkpoint('recommendation'))
+        self.assertTrue(is_behind('recommendation'))
+
+        stats = self.run_command('recommendation').stats
+        self.assertEqual((stats['candidates'], stats['embedded']), (6, 6))
+        _, upto = pending_changes('recommendation')
+        self.assertEqual(get_checkpoint('recommendation'), upto)
+        self.assertFalse(is_behind('recommendation'))
+
+        # 우대조건이 바뀐 상품 1개만 다시 임베딩
+        deposits = [base('D004', '우리은행', '첫거래우대정기예금', '첫 거래 + 급여이체 우대금리') if b['fin_prdt_cd'] == 'D004' else b
+                    for b in DEPOSITS]
+        self.publish(deposits=deposits)
+        self.collect()
+        self.assertTrue(is_behind('recommendation'))
+        stats = self.run_command('recommendation').stats
+        self.assertEqual((stats['candidates'], stats['embedded']), (1, 1))
+        self.assertFalse(is_behind('recommendation'))
+
+    def test_failed_embedding_keeps_checkpoint(self):
+        self.collect()
+        with mock.patch('products.embeddings.request_embeddings', side_effect=EmbeddingError('503')):
+            stats = self.run_command('recommendation').stats
+
+        self.assertEqual((stats['embedded'], stats['failed']), (0, 6))
+        self.assertIsNone(get_checkpoint('recommendation'))
+        self.assertTrue(is_behind('recommendation'))
+
+    def test_nested_refresh_writes_to_command_output(self):
+        self.collect()
+        stdout = io.StringIO()
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as process_stdout:
+            call_command('recommendation', stdout=stdout, stderr=io.StringIO())
+        self.assertIn('맞춤 추천을 갱신했습니다', stdout.getvalue())
+        self.assertEqual(process_stdout.getvalue(), '')
+
+
+# -----------------------------
+# [F09] 상품 임베딩 (recommendation): 배치 + 동시 요청 + 바뀐 상품만
+# -----------------------------
+class RecommendationEmbeddingTests(StubApiMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.collect()
+        self.real_request = embeddings.request_embeddings
+
+    def test_batches_are_matched_back_to_their_products(self):
+        with mock.patch('products.embeddings.request_embeddings', wraps=self.real_request) as request:
+            stats = self.run_command('recommendation', '--batch-size', '2', '--workers', '3').stats
+
+        self.assertEqual((stats['embedded'], stats['failed']), (6, 0))
+        self.assertEqual(sorted(len(call.args[0]) for call in request.call_args_list), [2, 2, 2])
+        # 배치가 끝나는 순서와 상관없이 각 상품에는 자기 우대조건의 임베딩
+        for product in DepositProducts.objects.all():
+            expected = self.real_request([product.spcl_cnd])[0]
+            np.testing.assert_allclose(product.embedding_vector, expected, rtol=1e-6)
+
+    def test_failed_batch_is_retried_alone(self):
+        def flaky(texts):
+            if DEPOSITS[0]['spcl_cnd'] in texts:
+                raise EmbeddingError('503')
+            return self.real_request(texts)
+
+        with mock.patch('products.embeddings.request_embeddings', side_effect=flaky):
+            stats = self.run_command('recommendation', '--batch-size', '2').stats
+        self.assertEqual((stats['embedded'], stats['failed']), (4, 2))
+        self.assertTrue(is_behind('recommendation'))
+
+        # 체크포인트가 그대로라 같은 변경을 다시 보지만, 이미 저장된 상품은 내용 해시가 같아 건너뜀
+        with mock.patch('products.embeddings.request_embeddings', wraps=self.real_request) as request:
+            stats = self.run_command('recommendation', '--batch-size', '2').stats
+        self.assertEqual((stats['candidates'], stats['embedded']), (6, 2))
+        self.assertEqual(request.call_count, 1)
+        self.assertFalse(is_behind('recommendation'))
+
+    def test_full_rechecks_hashes_and_force_reembeds(self):
+        self.run_command('recommendation')
+        with mock.patch('products.embeddings.request_embeddings', wraps=self.real_request) as request:
+            full = self.run_command('recommendation', '--full').stats
+            self.assertEqual(request.call_count, 0)
+            force = self.run_command('recommendation', '--force').stats
+        self.assertEqual((full['candidates'], full['embedded']), (6, 0))
+        self.assertEqual((force['candidates'], force['embedded']), (6, 6))
+
+
+class CatalogApiTestCase(StubApiMixin, TestCase):
+    """기본 카탈로그를 수집해 둔 상태에서 API 를 호출하는 테스트"""
+
+    def setUp(self):
+        super().setUp()
+        self.collect()
+        self.client = APIClient()
+
+    def codes(self, rows):
+        return [row['fin_prdt_cd'] for row in rows]
+
+
+# -----------------------------
+# [F03] 예적금 목록 커서(keyset) 페이지네이션
+# -----------------------------
+class DepositCursorTests(CatalogApiTestCase):
+    url = '/api/v1/products/deposit/'
+
+    def pages(self, **params):
+        codes, cursor = [], None
+        while True:
+            query = {**params, 'limit': 2, **({'cursor': cursor} if cursor else {})}
+            data = self.client.get(self.url, query).json()
+            self.assertLessEqual(len(data['results']), 2)
+            codes += self.codes(data['results'])
+            cursor = data['next_cursor']
+            if cursor is None:
+                return codes
+
+    def test_pages_follow_full_list_order(self):
+        for params in ({}, {'sort': 'intr_rate2_desc'}, {'sort': 'name_asc'}, {'sort': 'intr_rate_desc', 'term': 6}):
+            with self.subTest(**params):
+                expected = self.codes(self.client.get(self.url, params).json())
+                self.assertEqual(self.pages(**params), expected)
+
+    def test_ties_are_broken_without_duplicates(self):
+        # D002 / D003 의 최고 우대금리(3.5)가 같음 -> 기본 금리, 은행명 ... id 순으로 이어짐
+        codes = self.pages(sort='intr_rate2_desc', type='deposit')
+        self.assertEqual(codes, ['D002', 'D003', 'D005', 'D001', 'D004'])
+
+    def test_rejects_tampered_or_foreign_cursor(self):
+        cursor = self.client.get(self.url, {'sort': 'name_asc', 'limit': 2}).json()['next_cursor']
+        self.assertEqual(self.client.get(self.url, {'sort': 'name_asc', 'cursor': cursor[:-2] + 'xx'}).status_code, 400)
+        # 다른 정렬에서 만든 커서
+        self.assertEqual(self.client.get(self.url, {'sort': 'bank_asc', 'cursor': cursor}).status_code, 400)
+
+
+
+# -----------------------------
+# [F03] 필터 사이드바 패싯
+# -----------------------------
+class DepositFacetTests(CatalogApiTestCase):
+    url = '/api/v1/products/deposit/facets/'
+
+    def facets(self, **params):
+        data = self.client.get(self.url, params).json()
+        return data['total'], {name: [(row['value'], row['count']) for row in data[name]]
+                               for name in ('banks', 'terms', 'rate_types')}
+
+    def test_counts_per_facet(self):
+        total, facets = self.facets(type='deposit')
+        self.assertEqual(total, 5)
+        self.assertEqual(facets['banks'], [('우리은행', 2), ('국민은행', 1), ('신한은행', 1), ('하나은행', 1)])
+        self.assertEqual(facets['terms'], [(6, 5), (12, 5)])
+        self.assertEqual(facets['rate_types'], [('단리', 5), ('복리', 1)])
+
+    def test_each_facet_ignores_its_own_filter(self):
+        total, facets = self.facets(type='deposit', bank='우리', term=12)
+        self.assertEqual(total, 2)
+        # 은행 패싯은 bank 조건을 빼고, 기간 패싯은 term 조건을 빼고 계산
+        self.assertEqual(len(facets['banks']), 4)
+        self.assertEqual(facets['terms'], [(6, 2), (12, 2)])
+        self.assertEqual(facets['rate_types'], [('단리', 2)])
+
+    def test_removed_products_are_not_counted(self):
+        self.publish(deposits=[b for b in DEPOSITS if b['fin_prdt_cd'] != 'D004'])
+        self.collect()
+        total, facets = self.facets(type='deposit')
+        self.assertEqual(total, 4)
+        self.assertEqual(facets['banks'], [('국민은행', 1), ('신한은행', 1), ('우리은행', 1), ('하나은행', 1)])
+
+
+# -----------------------------
+# [F03] 카탈로그 버전 응답 캐시 + ETag / 304
+# -----------------------------
+class DepositConditionalGetTests(CatalogApiTestCase):
+    url = '/api/v1/products/deposit/'
+
+    def test_same_version_returns_304(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # 조건이 다르면 ETag 도 다름
+        self.assertNotEqual(self.client.get(self.url, {'type': 'saving'})['ETag'], etag)
+
+    def test_catalog_change_invalidates_etag_and_cache(self):
+        etag = self.client.get(self.url)['ETag']
+        self.publish(deposits=[b for b in DEPOSITS if b['fin_prdt_cd'] != 'D005'])
+        self.collect()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotIn('D005', self.codes(response.json()))
+
+    def test_cached_response_skips_query(self):
+        first = self.client.get(self.url, {'sort': 'intr_rate2_desc'}).json()
+        # 카탈로그 버전 조회 1번만
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url, {'sort': 'intr_rate2_desc'}).json()
+        self.assertEqual(first, second)
+
+    def test_stream_variant_has_its_own_etag(self):
+        plain = self.client.get(self.url)
+        streamed = self.client.get(self.url, {'stream': '1'})
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(json.loads(b''.join(streamed.streaming_content)), plain.json())
+        self.assertNotEqual(streamed['ETag'], plain['ETag'])
+        self.assertEqual(self.client.get(self.url, {'stream': 'true'})['ETag'], streamed['ETag'])
+        # 스트리밍 ETag 로 일반 요청을 하면 304 가 아니라 200
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=streamed['ETag']).status_code, 200)
+
+    def test_detail_etag(self):
+        url = f'{self.url}D001/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get(f'{self.url}D002/')['ETag'], etag)
+
+
+# -----------------------------
+# [F09] 목록/상세 응답 필드 (?fields=, 임베딩 컬럼은 읽지도 내보내지도 않음)
+# -----------------------------
+class DepositFieldsTests(CatalogApiTestCase):
+    url = '/api/v1/products/deposit/'
+
+    def setUp(self):
+        super().setUp()
+        self.run_command('recommendation')
+
+    def test_default_list_and_detail_fields(self):
+        row = self.client.get(self.url).json()[0]
+        self.assertEqual(set(row), set(PRODUCT_LIST_FIELDS))
+        detail = self.client.get(f'{self.url}D001/').json()
+        self.assertEqual(set(detail), set(PRODUCT_DETAIL_FIELDS))
+
+    def test_requested_fields_skip_embedding_and_options_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            rows = self.client.get(self.url, {'fields': 'fin_prdt_cd,fin_prdt_nm,embedding,unknown'}).json()
+
+        # 모르는 필드 / 임베딩은 무시
+        self.assertEqual([set(row) for row in rows], [{'fin_prdt_cd', 'fin_prdt_nm'}] * 6)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('"embedding"', sql)
+        self.assertNotIn('products_depositoptions', sql)
+
+    def test_detail_fields(self):
+        detail = self.client.get(f'{self.url}D002/', {'fields': 'fin_prdt_cd,options'}).json()
+        self.assertEqual(set(detail), {'fin_prdt_cd', 'options'})
+        self.assertEqual(len(detail['options']), 2)
+
+
+# -----------------------------
+# [F03/F04] 스트리밍 JSON 응답 (?stream=1 이면 청크 단위로 읽으면서 같은 배열을 흘려보냄)
+# -----------------------------
+class StreamingResponseTests(CatalogApiTestCase):
+
+    def body(self, response):
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_stream_matches_regular_list(self):
+        for params in ({}, {'sort': 'intr_rate2_desc', 'term': '12'}, {'fields': 'fin_prdt_cd,options'}):
+            with self.subTest(**params):
+                regular = self.client.get('/api/v1/products/deposit/', params).json()
+                streamed = self.body(self.client.get('/api/v1/products/deposit/', {**params, 'stream': '1'}))
+                self.assertEqual(streamed, regular)
+
+    def test_spot_prices_stream(self):
+        day = timezone.now().date()
+        SpotPrice.objects.bulk_create([
+            SpotPrice(item_name='Gold', base_date=day - timedelta(days=i), price=100.5 + i) for i in range(3)
+        ])
+        regular = self.client.get('/api/v1/products/spot/').json()
+        self.assertEqual(self.body(self.client.get('/api/v1/products/spot/', {'stream': '1'})), regular)
+        self.assertEqual([row['price'] for row in regular], [102.5, 101.5, 100.5])
+
+    def test_rows_are_buffered_into_chunks(self):
+        chunks = list(streaming.iter_json_array(range(5), lambda n: {'n': n}, buffer_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(json.loads(b''.join(chunks)), [{'n': n} for n in range(5)])
+        self.assertEqual(list(streaming.iter_json_array([], dict, buffer_size=2)), [b'[]'])
+
+    def test_standard_json_fallback_gives_same_document(self):
+        # serializer 결과에 남는 타입 (날짜는 serializer 가 이미 문자열로 바꿈)
+        value = {'rate': Decimal('3.50'), 'label': gettext_lazy('우대금리'), 'name': '우대금리', 'n': [1, 2.5, None]}
+        with mock.patch.object(streaming, 'orjson', None):
+            fallback = streaming.dumps(value)
+        self.assertEqual(json.loads(fallback), json.loads(streaming.dumps(value)))
+        self.assertIn('우대금리'.encode('utf-8'), fallback)
+
+
+# -----------------------------
+# [F03] 상품 전문 검색 (FTS5 trigram) + 동기화 트리거
+# -----------------------------
+class DepositSearchTests(CatalogApiTestCase):
+    url = '/api/v1/products/deposit/'
+
+    def search(self, q):
+        return self.codes(self.client.get(self.url, {'q': q}).json())
+
+    def test_searches_conditions_and_names(self):
+        self.assertEqual(self.search('급여이체'), ['D001'])
+        self.assertEqual(set(self.search('첫 거래 고객')), {'D003', 'D004'})
+        # 3글자 미만 단어는 icontains
+        self.assertEqual(self.search('하나'), ['D005'])
+        # FTS5 문법으로 해석되지 않음
+        self.assertEqual(self.client.get(self.url, {'q': '우대" OR "금리'}).status_code, 200)
+
+    def test_filter_is_not_capped_by_relevance_limit(self):
+        # 관련도 순위는 상위 1개만 매겨도 검색 결과는 전부 (나머지는 id 순으로 뒤에)
+        ranked = search_product_ids(['우대금리'])
+        with mock.patch.object(views, 'search_product_ids', lambda terms: search_product_ids(terms, limit=1)):
+            codes = self.search('우대금리')
+        self.assertEqual(len(codes), len(ranked))
+        by_id = dict(DepositProducts.objects.values_list('id', 'fin_prdt_cd'))
+        self.assertEqual(codes, [by_id[ranked[0]]] + [by_id[pk] for pk in sorted(ranked[1:])])
+
+    def test_triggers_follow_orm_writes(self):
+        product = DepositProducts.objects.get(fin_prdt_cd='D002')
+        product.spcl_cnd = '연금이체 고객 우대금리'
+        product.save(update_fields=['spcl_cnd'])
+        ids = search_product_ids(['연금이체'])
+        self.assertEqual(ids, [product.id])
+        self.assertEqual(search_product_ids(['비대면']), [])
+
+        product.delete()
+        self.assertEqual(search_product_ids(['연금이체']), [])
+
+    def test_ingest_updates_index_through_triggers(self):
+        deposits = [base('D005', '하나은행', '하나의정기예금', '연금이체 고객 우대금리') if b['fin_prdt_cd'] == 'D005' else b
+                    for b in DEPOSITS]
+        self.publish(deposits=deposits)
+        self.collect()
+        self.assertEqual(self.search('연금이체'), ['D005'])
+        self.assertEqual(self.search('마케팅'), [])
+
+    def test_missing_trigger_is_restored(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TRIGGER {FTS_TABLE}_au')
+        self.assertEqual(ensure_search_triggers(), [f'{FTS_TABLE}_au'])
+        self.assertEqual(ensure_search_triggers(), [])
+
+        product = DepositProducts.objects.get(fin_prdt_cd='D001')
+        product.fin_prdt_nm = '월급통장연계예금'
+        product.save(update_fields=['fin_prdt_nm'])
+        self.assertEqual(search_product_ids(['월급통장']), [product.id])
+
+
+# -----------------------------
+# [F03] 만기 수령액 시뮬레이션
+# -----------------------------
+class MaturityInterestTests(TestCase):
+
+    def test_lump_sum(self):
+        principal, interest = maturity_interest(10_000_000, [12, 12], [3.0, 3.0], [False, True], 'lump')
+        self.assertEqual(principal.tolist(), [10_000_000, 10_000_000])
+        self.assertAlmostEqual(interest[0], 300_000)
+        self.assertAlmostEqual(interest[1], 10_000_000 * ((1 + 0.03 / 12) ** 12 - 1))
+
+    def test_monthly_installments(self):
+        principal, interest = maturity_interest(100_000, [12, 12, 24], [3.5, 3.5, 0.0], [False, True, True], 'monthly')
+        r = 0.035 / 12
+        self.assertEqual(principal.tolist(), [1_200_000, 1_200_000, 2_400_000])
+        self.assertAlmostEqual(interest[0], 100_000 * r * 12 * 13 / 2)
+        self.assertAlmostEqual(interest[1], 100_000 * ((1 + r) * ((1 + r) ** 12 - 1) / r - 12))
+        # 금리 0 복리는 0/0 이 아니라 이자 0
+        self.assertEqual(interest[2], 0)
+
+
+class DepositSimulateTests(CatalogApiTestCase):
+    url = '/api/v1/products/deposit/simulate/'
+
+    def simulate(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_lump_ranks_deposit_options_after_tax(self):
+        data = self.simulate(amount=10_000_000, term=12)
+        results = data['results']
+
+        self.assertEqual(data['total'], 5)
+        # 같은 3.5% 면 복리(D002)가 단리(D003)보다 앞
+        self.assertEqual(self.codes(results)[:2], ['D002', 'D003'])
+        self.assertEqual([r['intr_rate_type_nm'] for r in results[:2]], ['복리', '단리'])
+        self.assertEqual({r['rsrv_type_nm'] for r in results}, {''})
+        for row in results:
+            self.assertEqual(row['after_tax_amount'], row['maturity_amount'] - row['tax'])
+        simple = results[1]
+        self.assertEqual(simple['interest'], 350_000)
+        self.assertEqual(simple['tax'], math.floor(350_000 * TAX_RATES['general']))
+        self.assertEqual(sorted((r['after_tax_amount'] for r in results), reverse=True),
+                         [r['after_tax_amount'] for r in results])
+
+    def test_monthly_uses_saving_options(self):
+        results = self.simulate(amount=100_000, mode='monthly', tax='exempt')['results']
+
+        self.assertEqual(self.codes(results), ['S001', 'S001'])
+        self.assertEqual([(r['intr_rate_type_nm'], r['rsrv_type_nm']) for r in results],
+                         [('복리', '정액적립식'), ('단리', '자유적립식')])
+        self.assertEqual(results[1]['interest'], 22_750)
+        self.assertEqual({r['tax'] for r in results}, {0})
+
+    def test_base_rate_option(self):
+        results = self.simulate(amount=10_000_000, term=6, rate='intr_rate')['results']
+        self.assertEqual(results[0]['fin_prdt_cd'], 'D005')
+        self.assertEqual(results[0]['rate'], 2.7)
+
+    def test_invalid_parameters(self):
+        for params in ({'amount': 0}, {'amount': 'abc'}, {'amount': 1000, 'mode': 'weekly'},
+                       {'amount': 1000, 'tax': 'none'}, {'amount': 1000, 'term': 'x'}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    def test_option_table_checks_version_once_per_interval(self):
+        snapshot = option_table.ensure_loaded()
+        self.publish(deposit_options=[o for o in DEPOSIT_OPTIONS if o['fin_prdt_cd'] != 'D005'])
+        self.run_command('get_deposit_products')
+
+        # 확인 주기 안에서는 DB 를 다시 보지 않고 같은 스냅숏
+        with self.assertNumQueries(0):
+            self.assertIs(option_table.ensure_loaded(), snapshot)
+        with mock.patch.object(option_table, 'check_seconds', 0):
+            fresh = option_table.ensure_loaded()
+        self.assertEqual(fresh.version, snapshot.version + 1)
+        self.assertEqual(fresh.size, snapshot.size - 2)
+        self.assertEqual(self.simulate(amount=10_000_000, term=12)['total'], 4)
+
+
+# -----------------------------
+# [F03] 예약 작업: 쓰기 잠금 + 연쇄 실행 + 재시도
+# -----------------------------
+class SchedulerTests(StubApiMixin, TestCase):
+
+    def jobs(self, runs):
+        return [(run.job, run.trigger, run.status) for run in runs]
+
+    def test_collect_chains_recommendation_under_one_lock(self):
+        runs = scheduler.run_job('get_deposit_products', owner='worker-1')
+
+        self.assertEqual(self.jobs(runs), [
+            ('get_deposit_products', JobRun.TRIGGER_MANUAL, JobRun.STATUS_SUCCEEDED),
+            ('recommendation', JobRun.TRIGGER_CHAIN, JobRun.STATUS_SUCCEEDED),
+            ('build_ann_index', JobRun.TRIGGER_CHAIN, JobRun.STATUS_SUCCEEDED),
+            ('recommendation_chunks', JobRun.TRIGGER_CHAIN, JobRun.STATUS_SUCCEEDED),
+        ])
+        self.assertEqual(runs[1].parent, runs[0])
+        self.assertEqual(runs[0].stats['created_products'], 6)
+        self.assertEqual(runs[1].stats['embedded'], 6)
+        # 상품 단위 추천이면 조각 임베딩은 건너뜀
+        self.assertFalse(runs[3].stats['changed'])
+        self.assertFalse(DepositProductChunk.objects.exists())
+        self.assertFalse(JobLock.objects.exists())
+
+    def test_chunk_granularity_chains_chunk_embeddings_for_active_products(self):
+        with self.settings(RECOMMEND={**settings.RECOMMEND, 'GRANULARITY': 'chunk'}):
+            runs = scheduler.run_job('get_deposit_products')
+            self.assertTrue(runs[-1].stats['changed'])
+            self.assertEqual(
+                set(DepositProductChunk.objects.values_list('product__fin_prdt_cd', flat=True)),
+                {b['fin_prdt_cd'] for b in DEPOSITS + SAVINGS},
+            )
+
+            # 판매 중지된 상품은 다시 임베딩하지 않고 남아 있던 조각은 삭제
+            self.publish(deposits=DEPOSITS[1:])
+            self.collect()
+            stats = self.run_command('recommendation_chunks', '--if-enabled').stats
+        self.assertEqual((stats['created'], stats['updated']), (0, 0))
+        self.assertGreater(stats['deleted'], 0)
+        self.assertFalse(DepositProductChunk.objects.filter(product__fin_prdt_cd='D001').exists())
+
+    def test_unchanged_collect_skips_chain(self):
+        scheduler.run_job('get_deposit_products')
+        runs = scheduler.run_job('get_deposit_products')
+        self.assertEqual(self.jobs(runs), [('get_deposit_products', JobRun.TRIGGER_MANUAL, JobRun.STATUS_SUCCEEDED)])
+        self.assertFalse(runs[0].stats['changed'])
+
+    def test_busy_writer_lock_skips_every_job(self):
+        self.assertTrue(scheduler.acquire_lock('writer', 'worker-2', 60))
+        for name in ('get_deposit_products', 'load_spot_prices', 'refresh_user_recommendations'):
+            self.assertEqual(scheduler.run_job(name, owner='worker-1'), [])
+        self.assertFalse(JobRun.objects.exists())
+        self.assertEqual(JobLock.objects.get().owner, 'worker-2')
+
+    def test_expired_lock_is_taken_over(self):
+        JobLock.objects.create(name='writer', owner='dead', expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(scheduler.acquire_lock('writer', 'worker-1', 60))
+        self.assertFalse(scheduler.acquire_lock('writer', 'worker-2', 60))
+        self.assertFalse(scheduler.renew_lock('writer', 'worker-2', 60))
+        self.assertTrue(scheduler.renew_lock('writer', 'worker-1', 60))
+
+    def test_failed_job_is_recorded_and_stops_chain(self):
+        os.remove(os.path.join(self.cassette_dir, 'finlife', settings.FINLIFE['ENDPOINTS']['deposit'], f'{GROUP}_1.json'))
+        runs = scheduler.run_job('get_deposit_products')
+
+        self.assertEqual(self.jobs(runs), [('get_deposit_products', JobRun.TRIGGER_MANUAL, JobRun.STATUS_FAILED)])
+        self.assertIn('CommandError', runs[0].error)
+        self.assertFalse(JobLock.objects.exists())
+
+    def test_recommendation_is_due_only_while_behind(self):
+        later = timezone.now() + timedelta(days=1)
+        self.collect()
+        self.assertIn('recommendation', scheduler.due_jobs(now=later))
+
+        # 임베딩 실패 -> 체크포인트가 그대로라 다음 주기에 다시 실행
+        with mock.patch('products.embeddings.request_embeddings', side_effect=EmbeddingError('503')):
+            scheduler.run_job('recommendation', trigger=JobRun.TRIGGER_SCHEDULE)
+        self.assertNotIn('recommendation', scheduler.due_jobs(now=timezone.now()))
+        self.assertIn('recommendation', scheduler.due_jobs(now=later))
+
+        scheduler.run_job('recommendation', trigger=JobRun.TRIGGER_SCHEDULE)
+        self.assertNotIn('recommendation', scheduler.due_jobs(now=later))
+
+
+class SchedulerHeartbeatTests(TransactionTestCase):
+    # heartbeat 스레드가 따로 DB 에 쓰므로 테스트 트랜잭션으로 감싸지 않음
+
+    def test_heartbeat_extends_lock_while_running(self):
+        self.assertTrue(scheduler.acquire_lock('writer', 'worker-1', 1))
+        first = JobLock.objects.get().expires_at
+
+        with scheduler.lock_heartbeat('writer', 'worker-1', 1, every=0.05):
+            time.sleep(0.3)
+        self.assertGreater(JobLock.objects.get().expires_at, first)
+
+    def test_heartbeat_does_not_steal_lock(self):
+        self.assertTrue(scheduler.acquire_lock('writer', 'worker-2', 60))
+        expires_at = JobLock.objects.get().expires_at
+
+        with scheduler.lock_heartbeat('writer', 'worker-1', 600, every=0.05):
+            time.sleep(0.2)
+        lock = JobLock.objects.get()
+        self.assertEqual((lock.owner, lock.expires_at), ('worker-2', expires_at))
+
+
+# -----------------------------
+# [F09] 임베딩 제공자 선택 (원격 API / 네트워크 없는 로컬)
+# -----------------------------
+class EmbeddingProviderTests(StubApiMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.collect()
+        idf_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, idf_dir, ignore_errors=True)
+        self.idf_path = os.path.join(idf_dir, 'idf.npy')
+        local = settings.EMBEDDING_PROVIDERS['local']
+        self.local_settings = {
+            'EMBEDDING_PROVIDER': 'local',
+            'EMBEDDING_PROVIDERS': {
+                **settings.EMBEDDING_PROVIDERS,
+                'local': {**local, 'OPTIONS': {**local['OPTIONS'], 'n_features': 512, 'idf_path': self.idf_path}},
+            },
+        }
+
+    def test_provider_follows_settings(self):
+        self.assertIsInstance(embeddings.get_provider(), embeddings.RemoteEmbeddingProvider)
+        embeddings._provider = None
+        with self.settings(**self.local_settings):
+            provider = embeddings.get_provider()
+        self.assertIsInstance(provider, embeddings.LocalEmbeddingProvider)
+        self.assertEqual(provider.model_name, 'local-char23-512')
+
+    def test_local_provider_works_offline_and_reembeds_on_switch(self):
+        self.run_command('recommendation')
+        embeddings._provider = None
+        with self.settings(**self.local_settings), \
+                mock.patch('products.embeddings.requests.post', side_effect=AssertionError('network')):
+            # IDF 는 처음 쓸 때 상품 텍스트로 학습 (테스트 트랜잭션 밖 워커 스레드에서 DB 를 읽지 않도록 미리)
+            embeddings.get_provider().idf
+            # 모델이 바뀌면 내용 해시도 바뀌어 전체를 다시 임베딩
+            stats = self.run_command('recommendation', '--full').stats
+            self.assertEqual(stats['embedded'], 6)
+            self.assertTrue(os.path.exists(self.idf_path))
+
+            vectors = embeddings.request_embeddings(['첫 거래 고객 우대', '첫 거래 고객 우대금리', '마케팅 동의'])
+        self.assertEqual(vectors.shape, (3, 512))
+        self.assertTrue(np.allclose(np.linalg.norm(vectors, axis=1), 1.0))
+        self.assertGreater(vectors[0] @ vectors[1], vectors[0] @ vectors[2])
+        self.assertEqual(DepositProducts.objects.first().embedding_dim, 512)
+
+    def test_remote_provider_retries_then_fails(self):
+        provider = embeddings.RemoteEmbeddingProvider('http://embeddings', 'key', 'model', max_retries=2)
+        busy = mock.Mock(status_code=503, headers={'Retry-After': '0'}, text='busy')
+        ok = mock.Mock(status_code=200)
+        ok.json.return_value = {'data': [{'index': 1, 'embedding': [0.0, 1.0]}, {'index': 0, 'embedding': [1.0, 0.0]}]}
+        with mock.patch('products.embeddings.requests.post', side_effect=[busy, ok]) as post, \
+                mock.patch('products.embeddings.time.sleep'):
+            vectors = provider.embed(['a', 'b'])
+        self.assertEqual(post.call_count, 2)
+        # index 순서로 정렬
+        np.testing.assert_array_equal(vectors, [[1.0, 0.0], [0.0, 1.0]])
+
+        bad = mock.Mock(status_code=400, headers={}, text='bad input')
+        with mock.patch('products.embeddings.requests.post', return_value=bad) as post:
+            with self.assertRaises(EmbeddingError):
+                provider.embed(['a'])
+        self.assertEqual(post.call_count, 1)
+
+
+# -----------------------------
+# [F09] 임베딩 바이너리 저장 (dtype 이름 + 차원을 같이 기록)
+# -----------------------------
+class EmbeddingVectorTests(TestCase):
+
+    def test_round_trip_keeps_dtype_and_dim(self):
+        vector = np.linspace(-1, 1, 7, dtype=np.float64)
+        for dtype_name, itemsize, places in (('float32', 4, 6), ('float16', 2, 3)):
+            with self.subTest(dtype=dtype_name):
+                blob, dim = encode_vector(vector, dtype_name)
+                self.assertEqual((dim, len(blob)), (7, 7 * itemsize))
+                decoded = decode_vector(blob, dtype_name, dim)
+                self.assertEqual(decoded.dtype, np.dtype(dtype_name))
+                self.assertFalse(decoded.flags.writeable)
+                np.testing.assert_array_almost_equal(decoded, vector, decimal=places)
+
+    def test_rejects_wrong_dim_and_unknown_dtype(self):
+        blob, _ = encode_vector([1.0, 2.0, 3.0])
+        with self.assertRaises(ValueError):
+            decode_vector(blob, 'float32', 4)
+        with self.assertRaises(ValueError):
+            encode_vector([1.0], 'float64')
+        self.assertIsNone(decode_vector(None))
+
+    def test_model_stores_configured_dtype(self):
+        product = DepositProducts.objects.create(**{**base('V001', '은행', '상품'), 'join_deny': 1})
+        with self.settings(PRODUCT_EMBEDDING_DTYPE='float16'):
+            product.embedding_vector = [0.5, -0.25, 1.0]
+        product.save()
+
+        product.refresh_from_db()
+        self.assertEqual((product.embedding_dtype, product.embedding_dim, len(product.embedding)), ('float16', 3, 6))
+        np.testing.assert_array_equal(product.embedding_vector, np.array([0.5, -0.25, 1.0], dtype=np.float16))
+
+        product.embedding_vector = None
+        self.assertEqual((product.embedding, product.embedding_dtype, product.embedding_dim), (None, '', 0))
+
+
+# -----------------------------
+# [F09] 추천 인덱스: 메모리 float32 행렬 + 상위 k (카탈로그 버전이 바뀌면 스냅숏 교체)
+# -----------------------------
+class RecommendationIndexTests(CatalogApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.run_command('recommendation')
+        self.query = embeddings.request_embedding(DEPOSITS[2]['spcl_cnd'])
+
+    def brute_force(self, k):
+        # 상품마다 코사인 유사도를 따로 계산한 정답
+        query = np.asarray(self.query, dtype=np.float32)
+        scores = []
+        for product in DepositProducts.objects.filter(is_active=True):
+            vector = product.embedding_vector.astype(np.float32)
+            scores.append((float(vector @ query / np.linalg.norm(vector) / np.linalg.norm(query)), product.id))
+        return sorted(scores, reverse=True)[:k]
+
+    def test_search_matches_per_product_cosine(self):
+        results = recommender.RecommendationIndex().search(self.query, k=4)
+        expected = self.brute_force(4)
+        self.assertEqual({pk for pk, _ in results}, {pk for _, pk in expected})
+        self.assertTrue(np.allclose([s for _, s in results], [s for s, _ in expected], atol=1e-5))
+        self.assertEqual([s for _, s in results], sorted((s for _, s in results), reverse=True))
+
+    def test_snapshot_is_reused_until_catalog_version_changes(self):
+        index = recommender.RecommendationIndex(check_seconds=60)
+        snapshot = index.ensure_loaded()
+        # 확인 주기 안에서는 버전도 읽지 않음
+        with self.assertNumQueries(0):
+            self.assertIs(index.ensure_loaded(), snapshot)
+
+        self.publish(deposits=DEPOSITS[1:])
+        self.collect()
+        d001 = DepositProducts.objects.get(fin_prdt_cd='D001').id
+        self.assertIs(index.ensure_loaded(), snapshot)
+        with mock.patch.object(index, 'check_seconds', 0):
+            fresh = index.ensure_loaded()
+
+        # 새 스냅숏으로 통째로 교체되고, 이전 스냅숏을 쓰던 검색은 그대로 이전 상태를 봄
+        self.assertGreater(fresh.version, snapshot.version)
+        self.assertNotIn(d001, fresh.product_ids)
+        self.assertIn(d001, snapshot.product_ids)
+        self.assertEqual(fresh.matrix.shape, (5, EMBEDDING_DIM))
+        self.assertEqual(fresh.matrix.dtype, np.float32)
+        self.assertTrue(np.allclose(np.linalg.norm(fresh.matrix, axis=1), 1.0))
+
+
+# -----------------------------
+# [F09] 추천 API (질문 검증 + 판매 중 상품만)
+# -----------------------------
+# stub 의 가짜 임베딩은 문장마다 고정이라 상품 우대조건과 같은 질문이면 그 상품이 1위
+class RecommendApiTests(CatalogApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.run_command('recommendation')
+
+    def recommend(self, message):
+        return self.client.post('/api/v1/products/recommend/', {'message': message}, format='json')
+
+    def test_recommends_closest_products(self):
+        results = self.recommend(DEPOSITS[0]['spcl_cnd']).json()['recommendations']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['name'], DEPOSITS[0]['fin_prdt_nm'])
+        self.assertAlmostEqual(results[0]['similarity'], 1.0, places=4)
+
+    def test_skips_products_removed_from_catalog(self):
+        self.publish(deposits=DEPOSITS[1:])
+        self.collect()
+        names = [row['name'] for row in self.recommend(DEPOSITS[0]['spcl_cnd']).json()['recommendations']]
+        self.assertEqual(len(names), 3)
+        self.assertNotIn(DEPOSITS[0]['fin_prdt_nm'], names)
+
+    def test_rejects_missing_or_non_string_message(self):
+        for message in ('', '   ', 123, ['우대금리'], {'q': '우대금리'}, None):
+            with self.subTest(message=message):
+                self.assertEqual(self.recommend(message).status_code, 400)
+
+    async def test_async_rejects_non_string_message(self):
+        for body in ({'message': 123}, {'message': ['우대금리']}, ['우대금리'], {}):
+            response = await self.async_client.post(
+                '/api/v1/products/recommend/async/', json.dumps(body), content_type='application/json',
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_async_worker_closes_db_connection(self):
+        # async 추천이 공용 스레드 풀에서 DB 를 읽은 뒤 연결을 남기지 않음 (실패해도)
+        with mock.patch.object(views, 'close_old_connections') as close_old_connections:
+            self.assertEqual(len(views._query_in_worker(views._rate_fallback_results, 2)), 2)
+            with self.assertRaises(ZeroDivisionError):
+                views._query_in_worker(lambda: 1 / 0)
+        self.assertEqual(close_old_connections.call_count, 2)
+
+    def test_batch_keeps_request_order(self):
+        messages = [DEPOSITS[2]['spcl_cnd'], SAVINGS[0]['spcl_cnd']]
+        response = self.client.post('/api/v1/products/recommend/batch/', {'messages': messages, 'k': 1}, format='json')
+        results = response.json()['results']
+        self.assertEqual([r['message'] for r in results], messages)
+        self.assertEqual([r['recommendations'][0]['name'] for r in results],
+                         [DEPOSITS[2]['fin_prdt_nm'], SAVINGS[0]['fin_prdt_nm']])
+        self.assertEqual(
+            self.client.post('/api/v1/products/recommend/batch/', {'messages': ['ok', 1]}, format='json').status_code,
+            400,
+        )
+
+
+# -----------------------------
+# [F09] 배치 추천: 캐시에 없는 질문만 API 1번 + 행렬 곱 1번
+# -----------------------------
+class RecommendBatchTests(CatalogApiTestCase):
+    url = '/api/v1/products/recommend/batch/'
+
+    def setUp(self):
+        super().setUp()
+        self.run_command('recommendation')
+
+    def batch(self, messages, **body):
+        return self.client.post(self.url, {'messages': messages, **body}, format='json')
+
+    def test_only_uncached_questions_are_embedded_once(self):
+        cached, fresh = DEPOSITS[1]['spcl_cnd'], DEPOSITS[4]['spcl_cnd']
+        self.client.post('/api/v1/products/recommend/', {'message': cached}, format='json')
+
+        with mock.patch('products.embeddings.request_embeddings', wraps=embeddings.request_embeddings) as request:
+            results = self.batch([fresh, cached, fresh], k=2).json()['results']
+        request.assert_called_once_with([fresh])
+
+        single = self.client.post('/api/v1/products/recommend/', {'message': fresh}, format='json').json()
+        # 단건 추천과 같은 점수 (D003/D004 는 우대조건이 같아 순서만 바뀔 수 있음)
+        self.assertEqual([r['similarity'] for r in results[0]['recommendations']],
+                         [r['similarity'] for r in single['recommendations'][:2]])
+        self.assertEqual(results[0]['recommendations'][0], single['recommendations'][0])
+        self.assertEqual(results[0], results[2])
+        self.assertEqual(results[1]['recommendations'][0]['name'], DEPOSITS[1]['fin_prdt_nm'])
+
+    def test_limits_and_errors(self):
+        batch_settings = settings.RECOMMEND['BATCH']
+        too_many = ['우대금리'] * (batch_settings['MAX_MESSAGES'] + 1)
+        for body in ({'messages': []}, {'messages': '우대금리'}, {'messages': too_many},
+                     {'messages': ['우대금리'], 'k': 'x'}):
+            with self.subTest(body=str(body)[:40]):
+                self.assertEqual(self.client.post(self.url, body, format='json').status_code, 400)
+
+        # k 는 MAX_K 로 잘림 (상품이 6개라 6개)
+        response = self.batch(['우대금리'], k=batch_settings['MAX_K'] + 100)
+        self.assertEqual(len(response.json()['results'][0]['recommendations']), 6)
+
+        with mock.patch('products.embeddings.request_embeddings', side_effect=EmbeddingError('503')):
+            self.assertEqual(self.batch(['처음 보는 질문']).status_code, 502)
+
+
+# -----------------------------
+# [F09] 질문 임베딩 캐시 (LRU + DB): LRU 에서 찾아도 DB 사용 시각을 갱신
+# -----------------------------
+class QueryEmbeddingCacheTests(TestCase):
+
+    def setUp(self):
+        reset_process_state()
+        self.addCleanup(reset_process_state)
+        self.cache = embeddings.query_embedding_cache
+        self.cache.set('model', 'hot', np.ones(4, dtype=np.float32))
+        self.old = timezone.now() - timedelta(days=1)
+        QueryEmbedding.objects.update(last_used_at=self.old)
+
+    def last_used_at(self):
+        return QueryEmbedding.objects.get(text_hash='hot').last_used_at
+
+    def test_lru_hit_touches_db_row_after_interval(self):
+        # 방금 저장한 질문은 갱신 간격 안이라 UPDATE 없음
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(self.cache.get('model', 'hot'))
+        self.assertEqual(self.last_used_at(), self.old)
+
+        with mock.patch.object(embeddings.time, 'time', return_value=time.time() + 301):
+            with self.assertNumQueries(1):
+                self.cache.get('model', 'hot')
+            with self.assertNumQueries(0):
+                self.cache.get('model', 'hot')
+        self.assertGreater(self.last_used_at(), self.old)
+
+    def test_hot_lru_query_survives_eviction(self):
+        self.cache.set('model', 'cold', np.ones(4, dtype=np.float32))
+        QueryEmbedding.objects.filter(text_hash='cold').update(last_used_at=self.old + timedelta(hours=1))
+        with mock.patch.object(embeddings.time, 'time', return_value=time.time() + 301):
+            self.cache.get('model', 'hot')
+        with self.settings(QUERY_EMBEDDING_CACHE={**settings.QUERY_EMBEDDING_CACHE, 'MAX_ROWS': 1}):
+            self.cache.evict()
+        self.assertEqual(list(QueryEmbedding.objects.values_list('text_hash', flat=True)), ['hot'])
+
+
+# -----------------------------
+# [F09] 압축(차원 축소 + int8) 인덱스: 원본 재채점은 메모리 매핑에서
+# -----------------------------
+class CompressedIndexTests(CatalogApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.run_command('recommendation')
+        self.exact = recommender.RecommendationIndex()
+        self.queries = [embeddings.request_embedding(b['spcl_cnd']) for b in DEPOSITS + SAVINGS]
+
+    def index(self, rescore):
+        return recommender.CompressedRecommendationIndex(method='truncate', dim=16, quantize='int8', rescore=rescore)
+
+    def test_rescored_results_match_exact_index(self):
+        index = self.index(rescore=6)
+        index.ensure_loaded()
+        # 후보가 전체 상품이면 재채점 결과는 정확 검색과 같고, 재채점은 DB 를 읽지 않음
+        with self.assertNumQueries(0):
+            results = index.search_many(self.queries, k=3)
+        for got, expected in zip(results, self.exact.search_many(self.queries, k=3)):
+            # 점수가 같은 상품끼리는 순서가 바뀔 수 있어 집합 + 점수로 비교
+            self.assertEqual({pk for pk, _ in got}, {pk for pk, _ in expected})
+            self.assertTrue(np.allclose([s for _, s in got], [s for _, s in expected], atol=1e-5))
+
+    def test_recall_against_exact_index(self):
+        hits = total = 0
+        for query in self.queries:
+            expected = {pk for pk, _ in self.exact.search(query, k=3)}
+            hits += len(expected & {pk for pk, _ in self.index(rescore=3).search(query, k=3)})
+            total += len(expected)
+        self.assertGreaterEqual(hits / total, 0.5)
+
+
+# -----------------------------
+# [F09] ANN(IVF) 인덱스 파일 + 판매 중지 상품 제외
+# -----------------------------
+class AnnIndexTests(CatalogApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.run_command('recommendation')
+        self.path = os.path.join(tempfile.mkdtemp(), 'ann_index.npz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(self.path), ignore_errors=True)
+        ann = {**settings.RECOMMEND['ANN'], 'ENABLED': True, 'PATH': self.path}
+        self.ann_settings = self.settings(RECOMMEND={**settings.RECOMMEND, 'ANN': ann})
+        self.ann_settings.enable()
+        self.addCleanup(self.ann_settings.disable)
+        self.index = recommender.AnnRecommendationIndex(path=self.path, nprobe=1)
+
+    def build(self):
+        return self.run_command('build_ann_index', '--clusters', '3', '--if-enabled', '--skip-report').stats
+
+    def query(self, text):
+        return embeddings.request_embedding(text)
+
+    def test_build_writes_index_atomically(self):
+        self.assertEqual(self.build()['count'], 6)
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['ann_index.npz'])
+        self.assertEqual(len(IVFIndex.load(self.path).product_ids), 6)
+
+    def test_search_skips_inactive_products_and_keeps_k(self):
+        self.build()
+        d001 = DepositProducts.objects.get(fin_prdt_cd='D001').id
+        self.assertEqual(self.index.search(self.query(DEPOSITS[0]['spcl_cnd']), k=3)[0][0], d001)
+
+        # 인덱스 파일은 그대로 두고 판매 중지만 반영
+        self.publish(deposits=DEPOSITS[1:])
+        self.collect()
+        ids = [pk for pk, _ in self.index.search(self.query(DEPOSITS[0]['spcl_cnd']), k=3)]
+        self.assertEqual(len(ids), 3)
+        self.assertNotIn(d001, ids)
+
+    def test_disabled_build_is_noop(self):
+        with self.settings(RECOMMEND={**settings.RECOMMEND, 'ANN': {**settings.RECOMMEND['ANN'], 'ENABLED': False}}):
+            self.assertFalse(self.build()['changed'])
+        self.assertFalse(os.path.exists(self.path))
+
+
+# -----------------------------
+# [F09] 추천 벤치마크 (합성 카탈로그는 측정 후 남지 않음)
+# -----------------------------
+class BenchmarkRecommendTests(CatalogApiTestCase):
+
+    def test_in_place_run_rolls_back_synthetic_catalog(self):
+        self.run_command('recommendation')
+        output = os.path.join(tempfile.mkdtemp(), 'benchmark.json')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output), ignore_errors=True)
+
+        self.run_command('benchmark_recommend', '--database', 'default', '--sizes', '30', '--queries', '3',
+                         '--configs', 'vectorized', '--output', output)
+
+        with open(output, encoding='utf-8') as f:
+            report = json.load(f)
+        self.assertFalse(report['meta']['database']['throwaway'])
+        self.assertEqual([(r['size'], r['config'], r['recall']) for r in report['results']], [(30, 'vectorized', 1.0)])
+        self.assertEqual(DepositProducts.objects.filter(is_active=True).count(), 6)
+        self.assertFalse(DepositProducts.objects.filter(fin_prdt_cd__startswith='benchmark-').exists())
+
+    def test_only_default_alias_can_be_measured_in_place(self):
+        with self.assertRaises(CommandError):
+            self.run_command('benchmark_recommend', '--database', 'other', '--sizes', '10')
+
+
+# -----------------------------
+# [F03/F09] 금감원 / 임베딩 API 대역 서버: upstream 응답 녹화 -> 네트워크 없이 같은 바이트 재생
+# -----------------------------
+class StubApiTests(SimpleTestCase):
+    endpoint = 'depositProductsSearch.json'
+
+    def setUp(self):
+        # upstream 역할: 녹화 재생 + 가짜 임베딩
+        self.upstream_dir = self.make_dir()
+        self.upstream = StubConfig(self.upstream_dir, synthesize=True, embedding_dim=8)
+        self.upstream_url = self.serve(self.upstream)
+        body = {'result': {'err_cd': '000', 'err_msg': '정상', 'max_page_no': 1, 'now_page_no': 1,
+                           'baseList': DEPOSITS[:1], 'optionList': DEPOSIT_OPTIONS[:2]}}
+        self.body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        CassetteStore(self.upstream_dir).save_finlife(self.endpoint, GROUP, 1, self.body)
+
+    def make_dir(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        return path
+
+    def serve(self, config):
+        server = make_server(config, port=0)
+        threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f'http://127.0.0.1:{server.server_address[1]}'
+
+    def recorder(self, mode='record'):
+        cassette_dir = self.make_dir()
+        config = StubConfig(cassette_dir, mode=mode, finlife_upstream=f'{self.upstream_url}/finlifeapi',
+                            embeddings_upstream=f'{self.upstream_url}/v1/embeddings')
+        return cassette_dir, config, self.serve(config)
+
+    def get_page(self, url, group=GROUP, page=1):
+        return requests.get(f'{url}/finlifeapi/{self.endpoint}',
+                            params={'auth': 'secret-key', 'topFinGrpNo': group, 'pageNo': page}, timeout=5)
+
+    def embed(self, url, texts):
+        return requests.post(f'{url}/v1/embeddings', json={'model': 'test-model', 'input': texts}, timeout=5)
+
+    def test_recorded_finlife_page_is_replayed_byte_for_byte(self):
+        cassette_dir, config, url = self.recorder()
+        self.assertEqual(self.get_page(url).content, self.body)
+        self.assertEqual(config.stats['recorded'], 1)
+
+        replay_url = self.serve(StubConfig(cassette_dir))
+        response = self.get_page(replay_url)
+        self.assertEqual((response.status_code, response.content), (200, self.body))
+        # 인증키는 녹화 파일에 남지 않음
+        with open(os.path.join(cassette_dir, 'finlife', self.endpoint, f'{GROUP}_1.json'), 'rb') as f:
+            self.assertNotIn(b'secret-key', f.read())
+
+    def test_failed_upstream_response_is_not_recorded(self):
+        cassette_dir, config, url = self.recorder()
+
+        self.assertEqual(self.get_page(url, page=2).status_code, 404)
+        self.assertEqual(config.stats['recorded'], 0)
+        self.assertIsNone(CassetteStore(cassette_dir).load_finlife(self.endpoint, GROUP, 2))
+
+    def test_auto_mode_replays_without_calling_upstream(self):
+        _, config, url = self.recorder(mode='auto')
+        self.get_page(url)
+        upstream_requests = self.upstream.stats['requests']
+
+        self.assertEqual(self.get_page(url).content, self.body)
+        self.assertEqual(self.upstream.stats['requests'], upstream_requests)
+        self.assertEqual((config.stats['recorded'], config.stats['replayed']), (1, 1))
+
+    def test_recorded_embeddings_are_replayed_per_sentence(self):
+        cassette_dir, _, url = self.recorder()
+        recorded = [item['embedding'] for item in self.embed(url, ['가', '나']).json()['data']]
+
+        # 배치 구성이 달라도 문장 단위로 재생, 녹화 없는 문장은 (synthesize 가 꺼져 있으면) 404
+        replay_url = self.serve(StubConfig(cassette_dir))
+        replayed = [item['embedding'] for item in self.embed(replay_url, ['나', '가']).json()['data']]
+        self.assertEqual(replayed, recorded[::-1])
+        self.assertEqual(self.embed(replay_url, ['가', '다']).status_code, 404)
+
+    def test_synthetic_embeddings_are_deterministic_unit_vectors(self):
+        first = self.embed(self.upstream_url, ['같은 문장']).json()['data'][0]['embedding']
+        second = self.embed(self.upstream_url, ['다른 문장', '같은 문장']).json()['data'][1]['embedding']
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 8)
+        self.assertAlmostEqual(float(np.linalg.norm(first)), 1.0, places=5)
+
+    def test_invalid_parameters_and_injected_errors(self):
+        self.assertEqual(self.get_page(self.upstream_url, group='../x').status_code, 400)
+
+        failing_url = self.serve(StubConfig(self.upstream_dir, error_rate=1.0, seed=0))
+        response = self.get_page(failing_url)
+        self.assertEqual((response.status_code, response.headers['Retry-After']), (503, '0'))
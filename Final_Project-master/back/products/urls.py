@@ -3,8 +3,13 @@ from . import views
 
 urlpatterns = [
     path('deposit/', views.deposit_products), # 예적금 조회
+    path('deposit/facets/', views.deposit_facets), # 필터용 은행/기간/금리유형별 개수
+    path('deposit/simulate/', views.deposit_simulate), # 만기 수령액 시뮬레이션 (세후 수령액 순)
     path("deposit/<str:fin_prdt_cd>/join/", views.deposit_join), # 필터링,정렬되게끔 추가
     path("deposit/<str:fin_prdt_cd>/", views.deposit_detail), # 목록 상세조회
     path('spot/', views.spot_price),          # 현물(금/은) 조회
     path('recommend/', views.recommend),      # AI 추천 
+    path('recommend/batch/', views.recommend_batch),  # AI 추천 (여러 질문 한 번에)
+    path('recommend/me/', views.recommend_me),        # 회원 맞춤 추천 (미리 계산된 결과)
+    path('recommend/async/', views.recommend_async),  # AI 추천 (비동기, 타임아웃 시 금리순)
 ]
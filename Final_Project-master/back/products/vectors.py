@@ -0,0 +1,40 @@
+# back/products/vectors.py
+
+import numpy as np
+
+
+# -----------------------------
+# [F09] 임베딩 바이너리 인코딩/디코딩
+# -----------------------------
+# DB 에는 little-endian raw bytes 로 저장하고, dtype 이름과 차원을 같이 기록한다.
+# (JSON 숫자 텍스트 대비 float32 는 약 1/3, float16 은 약 1/6 크기)
+EMBEDDING_DTYPES = {
+    'float32': np.dtype('<f4'),
+    'float16': np.dtype('<f2'),
+}
+
+
+def get_dtype(name):
+    try:
+        return EMBEDDING_DTYPES[name]
+    except KeyError:
+        raise ValueError(f"지원하지 않는 임베딩 dtype 입니다: {name!r} (가능: {', '.join(EMBEDDING_DTYPES)})")
+
+
+def encode_vector(vector, dtype_name='float32'):
+    """리스트/배열 -> (bytes, 차원)"""
+    array = np.asarray(vector, dtype=get_dtype(dtype_name)).ravel()
+    return array.tobytes(), int(array.shape[0])
+
+
+def decode_vector(blob, dtype_name='float32', dim=None):
+    """
+    bytes/memoryview -> 1차원 numpy 배열 (복사 없는 읽기 전용 view)
+    float16 으로 저장돼 있어도 view 를 그대로 돌려주므로, 계산 시 필요하면 호출부에서 astype 한다.
+    """
+    if blob is None:
+        return None
+    array = np.frombuffer(blob, dtype=get_dtype(dtype_name))
+    if dim is not None and array.shape[0] != dim:
+        raise ValueError(f"임베딩 차원이 맞지 않습니다: 기록={dim}, 실제={array.shape[0]}")
+    return array
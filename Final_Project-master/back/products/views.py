@@ -6,17 +6,34 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.authentication import TokenAuthentication
 from rest_framework import status
 
-from django.db.models import Q, Max
-
-from .models import DepositProducts, SpotPrice
-from .serializers import DepositProductsSerializer, SpotPriceSerializer
-
-import requests
-import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+from django.db.models import Q, F, Case, When, Value, IntegerField, Count
+
+from .models import DepositProducts, DepositOptions, DepositRateSummary, SpotPrice, UserRecommendation, CatalogVersion
+from .serializers import (
+    DepositProductListSerializer, DepositProductDetailSerializer, SpotPriceSerializer,
+    PRODUCT_LIST_FIELDS, PRODUCT_DETAIL_FIELDS,
+)
+from .recommender import get_recommendation_index, rate_ranking
+from .embeddings import embed_query, embed_queries, EmbeddingError
+from .personalize import is_stale
+from .search import FTS_COLUMNS, matching_ids, search_index_available, search_product_ids, split_terms
+from .pagination import InvalidCursor, keyset_order, keyset_filter, encode_cursor, decode_cursor
+from .simulation import MODES, TAX_RATES, option_table
+from .streaming import stream_queryset, wants_stream
+
+import asyncio
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from cachetools import LRUCache
 from django.conf import settings
+from django.db import close_old_connections
 from django.http import JsonResponse
-from django.db.models import Max
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, condition
 
 
 # -----------------------------
@@ -26,70 +43,408 @@ def _parse_codes(raw: str):
     return [c.strip() for c in (raw or "").split(",") if c.strip()]
 
 
+def _requested_fields(request, default):
+    # ?fields=fin_prdt_cd,fin_prdt_nm -> 화면에서 쓰는 필드만 (모르는 필드는 무시)
+    requested = [f for f in _parse_codes(request.GET.get("fields")) if f in PRODUCT_DETAIL_FIELDS]
+    return tuple(requested) or default
+
+
+# -----------------------------
+# [F03] 카탈로그 버전 기반 응답 캐시 + ETag / Last-Modified
+# -----------------------------
+# 카탈로그는 get_deposit_products 가 돌 때만 바뀐다 (CatalogVersion +1).
+# (정규화한 요청 파라미터, 버전) -> 직렬화가 끝난 응답 데이터를 프로세스 LRU 에 보관하고,
+# 같은 버전을 이미 가진 클라이언트(If-None-Match / If-Modified-Since)에는 304 만 보낸다.
+_response_cache_lock = threading.Lock()
+_response_cache = LRUCache(maxsize=settings.CATALOG_RESPONSE_CACHE['MAX_ENTRIES'])
+
+
+def _catalog_version(request):
+    # 한 요청 안에서는 한 번만 조회 (ETag 계산 + 캐시 키에 같이 사용)
+    if not hasattr(request, '_catalog_version'):
+        request._catalog_version = CatalogVersion.current()
+    return request._catalog_version
+
+
+def _normalized_params(request, names):
+    params = []
+    for name in names:
+        value = request.GET.get(name, '').strip()
+        if name == 'fields':
+            value = ','.join(_requested_fields(request, ()))
+        elif name == 'stream':
+            # 스트리밍 응답은 모양이 달라서 캐시/ETag 를 따로 (값이 없으면 settings 기본값 기준)
+            value = '1' if wants_stream(request) else ''
+        params.append((name, value))
+    return tuple(params)
+
+
+def _cache_key(request, view_name, names, *extra):
+    return (view_name, *extra, _normalized_params(request, names), _catalog_version(request).version)
+
+
+def _etag(cache_key):
+    return hashlib.sha256(repr(cache_key).encode('utf-8')).hexdigest()[:32]
+
+
+def _cached_response(cache_key, build):
+    """캐시에 있으면 그대로, 없으면 build() 로 만든 200 응답 데이터를 저장"""
+    with _response_cache_lock:
+        data = _response_cache.get(cache_key)
+    if data is not None:
+        return Response(data)
+    response = build()
+    # 스트리밍 응답은 본문을 메모리에 들고 있지 않으므로 캐시하지 않음
+    if isinstance(response, Response) and response.status_code == status.HTTP_200_OK:
+        with _response_cache_lock:
+            _response_cache[cache_key] = response.data
+    return response
+
+
+DEPOSIT_LIST_PARAMS = ('type', 'bank', 'term', 'q', 'sort', 'fields', 'limit', 'cursor', 'stream')
+DEPOSIT_DETAIL_PARAMS = ('fields',)
+
+
+def _deposit_list_key(request):
+    return _cache_key(request, 'deposit_products', DEPOSIT_LIST_PARAMS)
+
+
+def _deposit_detail_key(request, fin_prdt_cd):
+    return _cache_key(request, 'deposit_detail', DEPOSIT_DETAIL_PARAMS, fin_prdt_cd)
+
+
+def _catalog_last_modified(request, *args, **kwargs):
+    return _catalog_version(request).updated_at
+
+
+def _search(q):
+    """
+    검색어 -> (FTS5 색인으로 찾을 3글자 이상 단어들, icontains 로 찾을 짧은 단어들)
+    FTS 를 못 쓰는 DB 는 모든 단어를 icontains
+    """
+    if not q:
+        return [], []
+    long_terms, short_terms = split_terms(q)
+    if not search_index_available():
+        return [], long_terms + short_terms
+    return long_terms, short_terms
+
+
+def _apply_search(qs, fts_terms, short_terms):
+    if fts_terms:
+        qs = qs.filter(id__in=matching_ids(fts_terms))
+    for word in short_terms:
+        text_match = Q()
+        for column in FTS_COLUMNS:
+            text_match |= Q(**{f'{column}__icontains': word})
+        qs = qs.filter(text_match)
+    return qs
+
+
+def _product_queryset(fields, extra=()):
+    # 응답에 필요한 컬럼만 SELECT (embedding 은 읽지 않음), options 를 안 쓰면 prefetch 도 생략
+    # extra: 응답에는 없어도 읽어야 하는 컬럼 (페이지네이션 정렬 키 등)
+    qs = DepositProducts.objects.only(*[f for f in fields if f != "options"], *extra)
+    if "options" in fields:
+        qs = qs.prefetch_related("options")
+    return qs
+
+
 # -----------------------------
 # [F03] 예적금 상품 목록 조회 (필터/정렬/검색 지원)
 # -----------------------------
 @api_view(['GET'])
+@condition(etag_func=lambda request: _etag(_deposit_list_key(request)), last_modified_func=_catalog_last_modified)
 def deposit_products(request):
+    # 같은 조건 + 같은 카탈로그 버전이면 직렬화 없이 캐시된 응답
+    return _cached_response(_deposit_list_key(request), lambda: _deposit_products(request))
+
+
+def _deposit_products(request):
     """
-    GET /api/v1/products/deposit/?bank=우리&term=12&sort=intr_rate2_desc&q=WON
+    GET /api/v1/products/deposit/?type=saving&bank=우리&term=12&sort=intr_rate2_desc&q=WON
 
+    - type: 상품 종류 (deposit: 정기예금, saving: 적금, 없으면 전체)
     - bank: 은행명 부분일치 (kor_co_nm)
-    - term: 기간(개월) (options__save_trm)
-    - q   : 검색어(은행명/상품명)
+    - term: 기간(개월) (해당 기간 옵션이 있는 상품, 금리 정렬도 그 기간 기준)
+    - q   : 검색어 (은행명/상품명/우대조건/유의사항/가입방법, 여러 단어는 모두 포함)
+            sort 를 주지 않으면 관련도순
     - sort:
         - intr_rate2_desc : 최고우대금리(옵션들 중 max intr_rate2) 내림차순
         - intr_rate_desc  : 기본금리(옵션들 중 max intr_rate) 내림차순
         - name_asc        : 상품명 오름차순
         - bank_asc        : 은행명 오름차순
+    - fields: 응답에 포함할 필드 (예: fields=fin_prdt_cd,fin_prdt_nm,kor_co_nm)
+    - limit / cursor: 커서 페이지네이션 (둘 중 하나라도 주면 사용)
+        -> {"results": [...], "next_cursor": "..." 또는 null}
+        다음 페이지는 같은 조건에 cursor=next_cursor 를 붙여서 요청
+        (둘 다 없으면 예전처럼 전체 목록 배열)
+    - stream=1: 전체 목록 배열을 청크 단위로 읽으면서 스트리밍 (페이지네이션과는 같이 쓰지 않음)
     """
-    qs = DepositProducts.objects.all().prefetch_related('options')
+    fields = _requested_fields(request, PRODUCT_LIST_FIELDS)
 
+    product_type = request.GET.get('type', '').strip()
     bank = request.GET.get('bank', '').strip()
     term = request.GET.get('term', '').strip()
     q = request.GET.get('q', '').strip()
     sort = request.GET.get('sort', '').strip()
 
-    # 은행 필터
+    # 정렬 기준 금리: 미리 계산해 둔 요약 컬럼 (옵션 집계/조인 없음)
+    # - 기간 필터가 있으면 그 기간의 최고 금리 (상품+기간당 1행이라 중복 없음)
+    # - 없으면 상품 전체 옵션 중 최고 금리
+    rate_column, rate2_column = 'max_intr_rate', 'max_intr_rate2'
+    try:
+        term_int = int(term) if term else None
+    except ValueError:
+        term_int = None
+    if term_int is not None:
+        rate_column, rate2_column = 'term_max_intr_rate', 'term_max_intr_rate2'
+
+    fts_terms, short_terms = _search(q)
+
+    # 정렬 키 (마지막은 항상 id: 같은 값끼리도 순서 고정 -> 커서가 정확히 이어짐)
+    # 검색어가 있고 sort 를 따로 주지 않으면 관련도(bm25) 순
+    if not sort and fts_terms:
+        sort = 'relevance'
+        sort_keys = [('search_rank', False)]
+    elif sort == 'intr_rate2_desc':
+        sort_keys = [(rate2_column, True), (rate_column, True), ('kor_co_nm', False), ('fin_prdt_nm', False)]
+    elif sort == 'intr_rate_desc':
+        sort_keys = [(rate_column, True), (rate2_column, True), ('kor_co_nm', False), ('fin_prdt_nm', False)]
+    elif sort == 'name_asc':
+        sort_keys = [('fin_prdt_nm', False)]
+    else:  # bank_asc, 기본
+        sort_keys = [('kor_co_nm', False), ('fin_prdt_nm', False)]
+    sort_keys.append(('id', False))
+
+    annotated = ('term_max_intr_rate', 'term_max_intr_rate2', 'search_rank')
+    # 판매 중지(API 에서 사라진) 상품은 목록에서 제외 (상세 페이지는 가입 내역 때문에 그대로 조회 가능)
+    qs = _product_queryset(fields, extra=[f for f, _ in sort_keys if f not in annotated]).filter(is_active=True)
+
+    # 상품 종류 / 은행 필터
+    if product_type:
+        qs = qs.filter(product_type=product_type)
     if bank:
         qs = qs.filter(kor_co_nm__icontains=bank)
 
-    # 검색(은행명/상품명)
-    if q:
-        qs = qs.filter(Q(kor_co_nm__icontains=q) | Q(fin_prdt_nm__icontains=q))
-
-    # 기간 필터 (options.save_trm)
-    if term:
-        try:
-            term_int = int(term)
-            qs = qs.filter(options__save_trm=term_int)
-        except ValueError:
-            pass
-
-    # 정렬용 annotate
-    if sort in ('intr_rate2_desc', 'intr_rate_desc'):
-        qs = qs.annotate(
-            max_intr_rate=Max('options__intr_rate'),
-            max_intr_rate2=Max('options__intr_rate2'),
+    # 검색(은행명/상품명/우대조건/유의사항/가입방법)
+    qs = _apply_search(qs, fts_terms, short_terms)
+    if sort == 'relevance':
+        # bm25 상위 MAX_RESULTS 개만 순위를 매기고 나머지는 그 뒤에 id 순
+        ranked_ids = search_product_ids(fts_terms)
+        qs = qs.annotate(search_rank=Case(
+            *[When(id=pk, then=Value(rank)) for rank, pk in enumerate(ranked_ids)],
+            default=Value(len(ranked_ids)),
+            output_field=IntegerField(),
+        ))
+
+    # 기간 필터
+    if term_int is not None:
+        qs = qs.filter(rate_summaries__save_trm=term_int).annotate(
+            term_max_intr_rate=F('rate_summaries__max_intr_rate'),
+            term_max_intr_rate2=F('rate_summaries__max_intr_rate2'),
         )
 
     # 정렬
-    if sort == 'intr_rate2_desc':
-        qs = qs.order_by('-max_intr_rate2', '-max_intr_rate', 'kor_co_nm', 'fin_prdt_nm')
-    elif sort == 'intr_rate_desc':
-        qs = qs.order_by('-max_intr_rate', '-max_intr_rate2', 'kor_co_nm', 'fin_prdt_nm')
-    elif sort == 'name_asc':
-        qs = qs.order_by('fin_prdt_nm')
-    elif sort == 'bank_asc':
-        qs = qs.order_by('kor_co_nm', 'fin_prdt_nm')
-    else:
-        qs = qs.order_by('kor_co_nm', 'fin_prdt_nm')
+    qs = qs.order_by(*keyset_order(sort_keys))
+
+    limit = request.GET.get('limit', '').strip()
+    cursor = request.GET.get('cursor', '').strip()
+    if not limit and not cursor:
+        if wants_stream(request):
+            return stream_queryset(qs, DepositProductListSerializer(fields=fields))
+        serializer = DepositProductListSerializer(qs, many=True, fields=fields)
+        return Response(serializer.data)
+
+    # 커서 페이지네이션: 마지막으로 본 행의 정렬 키보다 뒤에 있는 행부터 limit+1 개
+    pagination = settings.DEPOSIT_PAGINATION
+    try:
+        limit = max(1, min(int(limit or pagination['DEFAULT_LIMIT']), pagination['MAX_LIMIT']))
+    except ValueError:
+        return Response({'detail': 'limit 은 정수여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 관련도순 순위는 검색어마다 다르므로 커서도 검색어에 묶음
+    cursor_sort = f"{sort or 'bank_asc'}|{term_int}" + (f"|{q}" if sort == 'relevance' else '')
+    if cursor:
+        try:
+            values = decode_cursor(cursor, cursor_sort, len(sort_keys))
+        except InvalidCursor as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        qs = qs.filter(keyset_filter(sort_keys, values))
 
-    # options 조인으로 중복될 수 있어서 distinct
-    qs = qs.distinct()
+    page = list(qs[:limit + 1])
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(cursor_sort, [getattr(page[-1], f) for f, _ in sort_keys])
 
-    serializer = DepositProductsSerializer(qs, many=True)
-    return Response(serializer.data)
+    serializer = DepositProductListSerializer(page, many=True, fields=fields)
+    return Response({'results': serializer.data, 'next_cursor': next_cursor})
+
+
+# -----------------------------
+# [F03] 필터 사이드바용 패싯 (은행 / 기간 / 금리유형별 상품 수)
+# -----------------------------
+DEPOSIT_FACET_PARAMS = ('type', 'bank', 'term', 'q')
+
+
+def _deposit_facets_key(request):
+    return _cache_key(request, 'deposit_facets', DEPOSIT_FACET_PARAMS)
+
+
+@api_view(['GET'])
+@condition(etag_func=lambda request: _etag(_deposit_facets_key(request)), last_modified_func=_catalog_last_modified)
+def deposit_facets(request):
+    """
+    GET /api/v1/products/deposit/facets/?type=saving&bank=우리&term=12&q=급여이체
+
+    - 목록(deposit/)과 같은 type / bank / term / q 조건에서의 상품 수를 GROUP BY 로 집계
+      (type 은 모든 패싯에 공통으로 적용)
+    - 각 패싯은 자기 자신의 조건은 빼고 계산 (다른 은행/기간으로 바꿨을 때의 개수를 보여주기 위함)
+        - banks      : kor_co_nm 별 상품 수 (term, q 적용)
+        - terms      : save_trm 별 상품 수 (bank, q 적용)
+        - rate_types : intr_rate_type_nm 별 상품 수 (bank, term, q 적용)
+    - total: 세 조건을 모두 적용한 상품 수
+    """
+    return _cached_response(_deposit_facets_key(request), lambda: _deposit_facets(request))
+
+
+def _deposit_facets(request):
+    product_type = request.GET.get('type', '').strip()
+    bank = request.GET.get('bank', '').strip()
+    term = request.GET.get('term', '').strip()
+    q = request.GET.get('q', '').strip()
+    try:
+        term_int = int(term) if term else None
+    except ValueError:
+        term_int = None
+
+    fts_terms, short_terms = _search(q)
+
+    def products(use_bank=True, use_term=True):
+        qs = _apply_search(DepositProducts.objects.filter(is_active=True), fts_terms, short_terms)
+        if product_type:
+            qs = qs.filter(product_type=product_type)
+        if use_bank and bank:
+            qs = qs.filter(kor_co_nm__icontains=bank)
+        if use_term and term_int is not None:
+            qs = qs.filter(rate_summaries__save_trm=term_int)
+        return qs
+
+    # 모두 DB 에서 GROUP BY (상품 id 는 서브쿼리로만 사용)
+    banks = (
+        products(use_bank=False)
+        .values('kor_co_nm')
+        .annotate(count=Count('id'))
+        .order_by('-count', 'kor_co_nm')
+    )
+    terms = (
+        DepositRateSummary.objects
+        .filter(product_id__in=products(use_term=False).values('id'))
+        .values('save_trm')
+        .annotate(count=Count('product_id'))
+        .order_by('save_trm')
+    )
+    options = DepositOptions.objects.filter(product_id__in=products().values('id'))
+    if term_int is not None:
+        options = options.filter(save_trm=term_int)
+    rate_types = (
+        options
+        .values('intr_rate_type_nm')
+        .annotate(count=Count('product_id', distinct=True))
+        .order_by('-count', 'intr_rate_type_nm')
+    )
+
+    return Response({
+        'total': products().count(),
+        'banks': [{'value': row['kor_co_nm'], 'count': row['count']} for row in banks],
+        'terms': [{'value': row['save_trm'], 'count': row['count']} for row in terms],
+        'rate_types': [{'value': row['intr_rate_type_nm'], 'count': row['count']} for row in rate_types],
+    })
+
+
+# -----------------------------
+# [F03] 만기 수령액 시뮬레이션 (전체 옵션을 세후 수령액 순으로)
+# -----------------------------
+@api_view(['GET'])
+def deposit_simulate(request):
+    """
+    GET /api/v1/products/deposit/simulate/?amount=10000000&term=12&mode=lump&tax=general&k=10
+
+    - amount: 원금(mode=lump, 정기예금 상품) 또는 월 납입액(mode=monthly, 적금 상품), 원 단위
+    - term  : 가입 기간(개월). 없으면 옵션마다 자기 기간으로 계산
+    - tax   : general(15.4%) / preferential(9.5%) / exempt(0%)
+    - rate  : intr_rate2(최고 우대금리, 기본) / intr_rate(기본 금리)
+    - 옵션의 단리/복리(intr_rate_type_nm)에 맞춰 NumPy 로 한 번에 계산 후 세후 수령액 순 TOP k
+    """
+    sim_settings = settings.DEPOSIT_SIMULATION
+    params = request.GET
+
+    try:
+        amount = int(params.get('amount', ''))
+    except ValueError:
+        return Response({'detail': 'amount 는 정수(원)여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not 0 < amount <= sim_settings['MAX_AMOUNT']:
+        return Response(
+            {'detail': f"amount 는 1 이상 {sim_settings['MAX_AMOUNT']} 이하여야 합니다."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    mode = params.get('mode', 'lump')
+    tax = params.get('tax', 'general')
+    rate = params.get('rate', 'intr_rate2')
+    if mode not in MODES:
+        return Response({'detail': f"mode 는 {', '.join(MODES)} 중 하나여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+    if tax not in TAX_RATES:
+        return Response({'detail': f"tax 는 {', '.join(TAX_RATES)} 중 하나여야 합니다."}, status=status.HTTP_400_BAD_REQUEST)
+    if rate not in ('intr_rate', 'intr_rate2'):
+        return Response({'detail': 'rate 는 intr_rate, intr_rate2 중 하나여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        term = int(params['term']) if params.get('term') else None
+        k = int(params.get('k', sim_settings['DEFAULT_K']))
+    except ValueError:
+        return Response({'detail': 'term, k 는 정수여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+    k = max(1, min(k, sim_settings['MAX_K']))
+
+    ranked = option_table.simulate(amount, mode=mode, tax=tax, term=term, rate=rate)
+    top = {name: column[:k] for name, column in ranked.items()}
+
+    products = DepositProducts.objects.only('id', 'fin_prdt_cd', 'fin_prdt_nm', 'kor_co_nm').in_bulk(
+        top['product_ids'].tolist()
+    )
+    results = []
+    for i, product_id in enumerate(top['product_ids'].tolist()):
+        product = products.get(product_id)
+        if product is None:  # 시뮬레이션 표를 읽은 뒤 삭제된 상품
+            continue
+        interest = round(float(top['interest'][i]))
+        tax_amount = int(top['tax'][i])
+        principal = int(top['principal'][i])
+        results.append({
+            'fin_prdt_cd': product.fin_prdt_cd,
+            'fin_prdt_nm': product.fin_prdt_nm,
+            'kor_co_nm': product.kor_co_nm,
+            'save_trm': int(top['save_trm'][i]),
+            'intr_rate_type_nm': top['intr_rate_type_nm'][i] or ('복리' if top['compound'][i] else '단리'),
+            'rsrv_type_nm': top['rsrv_type_nm'][i],  # 적금: 정액적립식/자유적립식, 예금은 빈 문자열
+            'rate': float(top['rate'][i]),
+            'principal': principal,
+            'interest': interest,
+            'tax': tax_amount,
+            'maturity_amount': principal + interest,
+            'after_tax_amount': principal + interest - tax_amount,
+        })
+
+    return Response({
+        'amount': amount,
+        'mode': mode,
+        'tax': tax,
+        'rate': rate,
+        'term': term,
+        'total': int(len(ranked['option_ids'])),
+        'results': results,
+    })
 
 
 # -----------------------------
@@ -128,16 +483,28 @@ def deposit_join(request, fin_prdt_cd):
 from django.shortcuts import get_object_or_404
 
 @api_view(["GET"])
+@condition(
+    etag_func=lambda request, fin_prdt_cd: _etag(_deposit_detail_key(request, fin_prdt_cd)),
+    last_modified_func=_catalog_last_modified,
+)
 def deposit_detail(request, fin_prdt_cd):
     """
-    GET /api/v1/products/deposit/<fin_prdt_cd>/
-    - 상품 1개 + options(기간별 금리) 반환
+    GET /api/v1/products/deposit/<fin_prdt_cd>/?fields=...
+    - 상품 1개 + options(기간별 금리) 반환 (카탈로그 버전이 같으면 캐시된 응답)
     """
+    return _cached_response(
+        _deposit_detail_key(request, fin_prdt_cd),
+        lambda: _deposit_detail(request, fin_prdt_cd),
+    )
+
+
+def _deposit_detail(request, fin_prdt_cd):
+    fields = _requested_fields(request, PRODUCT_DETAIL_FIELDS)
     product = get_object_or_404(
-        DepositProducts.objects.prefetch_related("options"),
+        _product_queryset(fields),
         fin_prdt_cd=fin_prdt_cd
     )
-    serializer = DepositProductsSerializer(product)
+    serializer = DepositProductDetailSerializer(product, fields=fields)
     return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -155,6 +522,10 @@ def spot_price(request):
     else:
         prices = SpotPrice.objects.all().order_by('base_date')
 
+    # item 없이 요청하면 전체 기간 시세라서 ?stream=1 이면 청크 단위로 스트리밍
+    if wants_stream(request):
+        return stream_queryset(prices, SpotPriceSerializer())
+
     serializer = SpotPriceSerializer(prices, many=True)
     return Response(serializer.data)
 
@@ -162,45 +533,235 @@ def spot_price(request):
 
 # [F09] 추천 기능 
 
-def cosine_similarity(v1, v2):
-    v1, v2 = np.array(v1), np.array(v2)
-    return np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+def _recommendation_results_many(tops):
+    # 질문별 [(product_id, score), ...] 리스트 -> 질문별 응답용 dict 리스트
+    # (모든 질문의 상품 정보 + 최고 우대금리 요약 컬럼을 쿼리 1번으로 한꺼번에 조회)
+    product_ids = {pk for top in tops for pk, _ in top}
+    # 판매 중지 상품은 추천하지 않음 (파일로 저장된 ANN 인덱스에는 남아 있을 수 있음)
+    products = (
+        DepositProducts.objects
+        .filter(is_active=True)
+        .only('fin_prdt_nm', 'kor_co_nm', 'max_intr_rate2')
+        .in_bulk(product_ids)
+    )
+
+    all_results = []
+    for top in tops:
+        results = []
+        for pk, score in top:
+            p = products.get(pk)
+            if p is None:
+                continue
+            max_rate = p.max_intr_rate2
+            results.append({
+                'name': p.fin_prdt_nm,
+                'bank': p.kor_co_nm,
+                'similarity': round(score, 4),
+                'max_rate': max_rate if max_rate else 0
+            })
+        all_results.append(results)
+    return all_results
+
+
+def _recommendation_results(top):
+    # [(product_id, score), ...] -> 응답용 dict 리스트
+    return _recommendation_results_many([top])[0]
+
+
+def _recommend_from_vector(user_vector, k=3):
+    # 메모리 인덱스에서 유사도 TOP k (행렬-벡터 곱 1번)
+    return _recommendation_results(get_recommendation_index().search(user_vector, k=k))
+
+
+def _rate_fallback_results(k=3):
+    # 임베딩을 못 만들 때: 미리 계산해 둔 최고 우대금리 순위 (similarity 는 0)
+    return _recommendation_results([(pk, 0.0) for pk in rate_ranking(k)])
 
 
 @api_view(['POST'])
 def recommend(request):
-    # 1. 프론트엔드에서 보낸 사용자 입력 받기
+    # 1. 프론트엔드에서 보낸 사용자 입력 받기 (문자열이 아니면 임베딩 전에 거절)
     user_input = request.data.get('message')
-    
-    # 2. 사용자 입력 임베딩 (GMS API)
-    GMS_API_KEY=""
-    
-    url = "https://gms.ssafy.io/gmsapi/api.openai.com/v1/embeddings"
-    headers = {"Authorization": f"Bearer {GMS_API_KEY}", "Content-Type": "application/json"}
-    payload = {"model": "text-embedding-3-large", "input": user_input}
-    response = requests.post(url, headers=headers, json=payload)
-    user_vector = response.json()['data'][0]['embedding']
-
-    # 3. DB 상품들과 유사도 비교
-    products = DepositProducts.objects.all().prefetch_related('options') 
-    results = []
-    
-    for p in products:
-        score = cosine_similarity(user_vector, p.embedding_vector)
-        
-        try:
-            max_rate = p.options.aggregate(Max('intr_rate2'))['intr_rate2__max']
-        except AttributeError:
-            max_rate = 0
+    user_input = user_input.strip() if isinstance(user_input, str) else None
 
-        results.append({
-            'name': p.fin_prdt_nm,
-            'bank': p.kor_co_nm,
-            'similarity': round(float(score), 4),
-            'max_rate': max_rate if max_rate else 0
-        })
+    if not user_input:
+        return JsonResponse({'detail': 'message 를 입력해주세요.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # 2. 사용자 입력 임베딩 (캐시에 있으면 GMS API 호출 생략)
+    try:
+        user_vector = embed_query(user_input)
+    except EmbeddingError as e:
+        return JsonResponse({'detail': f'임베딩 API 에러: {e}'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    # 3. 유사도 TOP 3 + 상품 정보
+    return JsonResponse({'recommendations': _recommend_from_vector(user_vector, k=3)})
+
+
+# -----------------------------
+# [F09] 여러 질문 한 번에 추천 (온보딩 / 분석용)
+# -----------------------------
+@api_view(['POST'])
+def recommend_batch(request):
+    """
+    POST /api/v1/products/recommend/batch/  {"messages": ["...", "..."], "k": 3}
+
+    - 캐시에 없는 질문만 모아 임베딩 API 를 1번 호출
+    - (질문 수 x 상품 수) 행렬 곱 1번으로 점수 계산 후 질문별 TOP k
+    - 응답: {"results": [{"message": ..., "recommendations": [...]}, ...]} (요청 순서 그대로)
+    """
+    batch_settings = settings.RECOMMEND['BATCH']
+    messages = request.data.get('messages')
+
+    if not isinstance(messages, list) or not messages:
+        return JsonResponse({'detail': 'messages 에 질문 리스트를 입력해주세요.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(messages) > batch_settings['MAX_MESSAGES']:
+        return JsonResponse(
+            {'detail': f"한 번에 최대 {batch_settings['MAX_MESSAGES']}개까지 요청할 수 있습니다."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if not all(isinstance(m, str) and m.strip() for m in messages):
+        return JsonResponse({'detail': '비어 있는 질문이 있습니다.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        k = int(request.data.get('k', 3))
+    except (TypeError, ValueError):
+        return JsonResponse({'detail': 'k 는 정수여야 합니다.'}, status=status.HTTP_400_BAD_REQUEST)
+    k = max(1, min(k, batch_settings['MAX_K']))
+
+    try:
+        user_vectors = embed_queries(messages)
+    except EmbeddingError as e:
+        return JsonResponse({'detail': f'임베딩 API 에러: {e}'}, status=status.HTTP_502_BAD_GATEWAY)
+
+    tops = get_recommendation_index().search_many(user_vectors, k=k)
+    results = [
+        {'message': message, 'recommendations': recommendations}
+        for message, recommendations in zip(messages, _recommendation_results_many(tops))
+    ]
+    return JsonResponse({'results': results})
 
-    # 4. 정렬 후 TOP 3 반환
-    results.sort(key=lambda x: x['similarity'], reverse=True)
-    return JsonResponse({'recommendations': results[:3]})
 
+# -----------------------------
+# [F09] 회원 맞춤 추천 (미리 계산된 UserRecommendation 조회)
+# -----------------------------
+@api_view(['GET'])
+@authentication_classes([TokenAuthentication])
+@permission_classes([IsAuthenticated])
+def recommend_me(request):
+    """
+    GET /api/v1/products/recommend/me/?k=5
+
+    - 나이/자산/연봉/가입상품 기준으로 미리 계산해 둔 추천을 순위대로 반환 (테이블 조회만)
+    - 프로필이 바뀐 뒤라 다시 계산해야 하면 지금 있는 추천 + "stale": true
+      (계산은 run_scheduler 의 refresh_user_recommendations 가 요청 밖에서 처리)
+    - 아직 계산된 적이 없으면 금리순 추천 + "fallback": true
+    """
+    try:
+        k = int(request.GET.get('k', settings.RECOMMEND['PERSONAL']['SIZE']))
+    except ValueError:
+        k = settings.RECOMMEND['PERSONAL']['SIZE']
+    k = max(1, min(k, settings.RECOMMEND['PERSONAL']['SIZE']))
+
+    rows = list(
+        UserRecommendation.objects
+        .filter(user=request.user)
+        .select_related('product')
+        .only('rank', 'score', 'similarity', 'max_rate', 'profile_hash',
+              'product__fin_prdt_cd', 'product__fin_prdt_nm', 'product__kor_co_nm')
+        .order_by('rank')
+    )
+    if not rows:
+        return JsonResponse({'recommendations': _rate_fallback_results(k), 'fallback': True})
+
+    results = [
+        {
+            'rank': row.rank,
+            'fin_prdt_cd': row.product.fin_prdt_cd,
+            'name': row.product.fin_prdt_nm,
+            'bank': row.product.kor_co_nm,
+            'score': round(row.score, 4),
+            'similarity': round(row.similarity, 4),
+            'max_rate': row.max_rate,
+        }
+        for row in rows[:k]
+    ]
+    if is_stale(request.user, rows):
+        return JsonResponse({'recommendations': results, 'stale': True})
+    return JsonResponse({'recommendations': results})
+
+
+# -----------------------------
+# [F09] 비동기 추천 (ASGI)
+# -----------------------------
+# 임베딩 API 를 기다리는 동안 워커를 붙잡지 않도록 async 뷰로 처리하고,
+# 느리거나 죽은 경우 TIMEOUT 초 안에 금리순 추천으로 대신 응답한다.
+# 블로킹 임베딩 호출은 CONCURRENCY 개 스레드 전용 풀에서만 돌고, 자리(slot)도 CONCURRENCY 개뿐이다.
+# 타임아웃으로 응답한 뒤에도 스레드에서 마저 도는 호출은 끝날 때까지 자리를 차지하므로
+# 임베딩 API 가 느려지면 대기열이 쌓이는 대신 새 요청은 바로 금리순 추천으로 대신 응답한다.
+# (sync_to_async 는 취소돼도 함수가 끝날 때까지 기다리므로 타임아웃에 쓰지 않음)
+_embedding_executor = ThreadPoolExecutor(
+    max_workers=settings.RECOMMEND['ASYNC']['CONCURRENCY'],
+    thread_name_prefix='recommend-embedding',
+)
+_embedding_slots = threading.BoundedSemaphore(settings.RECOMMEND['ASYNC']['CONCURRENCY'])
+
+
+def _embed_query_in_worker(user_input):
+    try:
+        return embed_query(user_input)
+    finally:
+        # 풀 스레드는 Django 가 요청 끝에 정리해 주지 않으므로 캐시 조회/저장에 쓴 DB 연결을 직접 닫음
+        close_old_connections()
+        _embedding_slots.release()
+
+
+def _query_in_worker(func, *args):
+    # sync_to_async(thread_sensitive=False) 도 공용 스레드 풀이라 요청이 끝나도 DB 연결이 남으므로 직접 닫음
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+async def _embed_query_with_timeout(user_input):
+    if not _embedding_slots.acquire(blocking=False):
+        raise EmbeddingError('임베딩 요청이 밀려 있어 대체 추천으로 응답합니다.')
+    try:
+        future = _embedding_executor.submit(_embed_query_in_worker, user_input)
+    except BaseException:
+        _embedding_slots.release()
+        raise
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=settings.RECOMMEND['ASYNC']['TIMEOUT'])
+    finally:
+        # 아직 대기열에 있으면 취소하고 자리 반납 (이미 실행 중이면 스레드에서 마저 끝난 뒤 반납)
+        if future.cancel():
+            _embedding_slots.release()
+
+
+@csrf_exempt
+@require_POST
+async def recommend_async(request):
+    """
+    POST /api/v1/products/recommend/async/  {"message": "..."}
+    - 응답 형식은 recommend 와 같고, 금리순 대체 응답이면 "fallback": true
+    """
+    try:
+        body = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'detail': 'JSON 형식이 올바르지 않습니다.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    user_input = body.get('message') if isinstance(body, dict) else None
+    user_input = user_input.strip() if isinstance(user_input, str) else None
+    if not user_input:
+        return JsonResponse({'detail': 'message 를 입력해주세요.'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        user_vector = await _embed_query_with_timeout(user_input)
+    except (asyncio.TimeoutError, EmbeddingError):
+        results = await sync_to_async(_query_in_worker, thread_sensitive=False)(_rate_fallback_results, 3)
+        return JsonResponse({'recommendations': results, 'fallback': True})
+
+    # 유사도 계산(numpy)과 DB 조회도 이벤트 루프 밖에서
+    results = await sync_to_async(_query_in_worker, thread_sensitive=False)(_recommend_from_vector, user_vector, 3)
+    return JsonResponse({'recommendations': results})
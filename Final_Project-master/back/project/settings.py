@@ -28,6 +28,10 @@ environ.Env.read_env(os.path.join(BASE_DIR, '.env')) # 👈 추가
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# 실행 중 만들어지는 파일(ANN 인덱스, 로컬 임베딩 IDF, API 녹화, 벤치마크 결과) 위치 - git 에는 올리지 않음
+# 소스 트리 밖에 두려면 DATA_DIR 환경변수로 지정
+DATA_DIR = Path(env('DATA_DIR', default=str(BASE_DIR / 'data')))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -154,6 +158,143 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # .env에서 가져온 키를 Django 설정 변수에 담기
 FINLIFE_API_KEY = env('FINLIFE_API_KEY', default='')  # 👈 이 줄이 없어서 에러가 난 겁니다!
 
+# [F03] 금감원 금융상품 API 수집 (get_deposit_products)
+FINLIFE = {
+    'BASE_URL': env('FINLIFE_BASE_URL', default='http://finlife.fss.or.kr/finlifeapi'),
+    'ENDPOINTS': {
+        'deposit': 'depositProductsSearch.json',   # 정기예금
+        'saving': 'savingProductsSearch.json',     # 적금
+    },
+    # 권역: 은행, 여신전문, 저축은행, 보험, 금융투자
+    'GROUPS': ['020000', '030200', '030300', '050000', '060000'],
+    'MAX_WORKERS': 8,          # 동시 요청 수 (= 커넥션 풀 크기)
+    'TIMEOUT': (3.05, 10),     # (연결, 읽기) 초
+    'RETRIES': 3,              # 5xx / 429 / 연결 오류 재시도 횟수
+    'BACKOFF': 0.5,            # 재시도 간격 0.5s, 1s, 2s ...
+}
+
+# [F09] 상품 임베딩 저장 dtype ('float32' 또는 'float16')
+PRODUCT_EMBEDDING_DTYPE = env('PRODUCT_EMBEDDING_DTYPE', default='float32')
+
+# [F09] 임베딩 제공자
+# - remote: GMS 를 통한 OpenAI 호환 API (text-embedding-3-large)
+# - local : 네트워크 없이 문자 n-gram 해싱 TF-IDF (개발/부하 테스트용)
+# 제공자를 바꾸면 recommendation / recommendation_chunks 커맨드로 상품 임베딩을 다시 만들어야 함
+EMBEDDING_PROVIDER = env('EMBEDDING_PROVIDER', default='remote')
+EMBEDDING_PROVIDERS = {
+    'remote': {
+        'BACKEND': 'products.embeddings.RemoteEmbeddingProvider',
+        'OPTIONS': {
+            'url': env('EMBEDDING_API_URL', default='https://gms.ssafy.io/gmsapi/api.openai.com/v1/embeddings'),
+            'api_key': env('GMS_API_KEY', default=''),
+            'model': env('EMBEDDING_MODEL', default='text-embedding-3-large'),
+            'timeout': 30,
+        },
+    },
+    'local': {
+        'BACKEND': 'products.embeddings.LocalEmbeddingProvider',
+        'OPTIONS': {
+            'n_features': 4096,
+            'ngram_range': (2, 3),
+            'idf_path': DATA_DIR / 'local_embedding_idf.npy',
+        },
+    },
+}
+
+# [F03] 카탈로그 갱신 예약 작업 (python manage.py run_scheduler)
+# INTERVAL: 주기(초, None 이면 THEN 으로만 실행) / THEN: 성공 + 변경이 있으면 이어서 실행할 작업
+# CONSUMER: 이 변경 이력 체크포인트가 밀려 있을 때만 주기 실행 (처리하지 못한 변경 재시도)
+SCHEDULER = {
+    'POLL_SECONDS': 30,        # 실행할 작업이 있는지 확인하는 간격
+    # 잠금 대상 (작업별 'LOCK' 으로 바꿀 수 있음). SQLite 는 쓰기가 한 번에 하나라 기본은 모든 작업이 같은 잠금
+    'LOCK': 'writer',
+    'LOCK_TTL': 10 * 60,       # 잠금 유효 시간 (프로세스가 죽어도 이 시간이 지나면 다른 인스턴스가 실행)
+    'HEARTBEAT_SECONDS': 60,   # 실행 중에는 이 간격마다 잠금 만료 시각을 LOCK_TTL 만큼 연장
+    'JOBS': {
+        'get_deposit_products': {'INTERVAL': 6 * 60 * 60, 'THEN': ['recommendation']},
+        # 수집 직후 연쇄 실행 + 임베딩이 실패해서 체크포인트가 밀려 있으면 10분마다 다시 시도
+        'recommendation': {
+            'INTERVAL': 10 * 60, 'CONSUMER': 'recommendation', 'THEN': ['build_ann_index', 'recommendation_chunks'],
+        },
+        # 임베딩이 바뀌면 ANN 인덱스 파일도 다시 생성 (RECOMMEND['ANN']['ENABLED'] 일 때만)
+        'build_ann_index': {'INTERVAL': None, 'ARGS': ['--if-enabled', '--skip-report']},
+        # 조각 단위 추천(RECOMMEND['GRANULARITY'] == 'chunk')이면 바뀐 조각도 다시 임베딩
+        'recommendation_chunks': {'INTERVAL': None, 'ARGS': ['--if-enabled']},
+        'load_spot_prices': {'INTERVAL': 24 * 60 * 60},
+        # 프로필을 수정한 회원의 맞춤 추천 (PATCH / recommend/me/ 요청에서는 계산하지 않음)
+        'refresh_user_recommendations': {'INTERVAL': 2 * 60},
+    },
+}
+
+# [F03/F09] 금감원 / 임베딩 API 로컬 대역 서버 (python manage.py api_stub)
+# 수집/추천을 이 서버로 돌리려면 FINLIFE_BASE_URL=http://127.0.0.1:8765/finlifeapi
+#                                 EMBEDDING_API_URL=http://127.0.0.1:8765/v1/embeddings
+API_STUB = {
+    'HOST': '127.0.0.1',
+    'PORT': 8765,
+    'CASSETTE_DIR': DATA_DIR / 'api_cassettes',   # 녹화 파일 위치
+    # record / auto 모드에서 실제로 요청을 보낼 곳
+    'UPSTREAM': {
+        'FINLIFE': env('FINLIFE_UPSTREAM_URL', default='http://finlife.fss.or.kr/finlifeapi'),
+        'EMBEDDINGS': env('EMBEDDING_UPSTREAM_URL', default='https://gms.ssafy.io/gmsapi/api.openai.com/v1/embeddings'),
+    },
+    'EMBEDDING_DIM': 3072,     # 녹화에 없는 문장을 가짜 벡터로 만들 때 차원 (text-embedding-3-large)
+}
+
+# [F09] 추천 인덱스
+RECOMMEND = {
+    'GRANULARITY': env('RECOMMEND_GRANULARITY', default='product'),  # 'product' 또는 'chunk' (조건 조각 단위)
+    'CHUNK_AGGREGATION': 'max',     # 조각 점수 -> 상품 점수: 'max' 또는 'mean'(상위 CHUNK_TOP_N 개 평균)
+    'CHUNK_TOP_N': 2,
+    # 추천 인덱스가 카탈로그 버전(CatalogVersion)을 다시 확인하는 간격(초) - 검색마다 DB 를 읽지 않도록
+    'INDEX_CHECK_SECONDS': 5,
+    # 메모리 절약용 압축 (1차 순위는 압축 벡터, 상위 RESCORE 개는 원본으로 재채점)
+    # 원본은 메모리 매핑 임시 파일에서 읽으므로 재채점에 DB 조회가 없음. 비용은 질문당 RESCORE x 차원 x 4바이트
+    # (100 x 1536 = 0.6MB) 읽기: 페이지 캐시에 있으면 1ms 안팎(10k 상품 p50 1.1ms, 예전 DB 재조회 2.3ms),
+    # 메모리가 부족해 페이지가 내려가 있으면 디스크 읽기만큼 늘어남
+    'COMPRESSION': {
+        'METHOD': env('RECOMMEND_COMPRESSION', default=None),   # None / 'truncate' / 'pca'
+        'DIM': 256,                 # 축소할 차원 (256 또는 512 권장)
+        'QUANTIZE': env('RECOMMEND_QUANTIZE', default=None),    # None / 'int8'
+        'RESCORE': 100,
+    },
+    # 비동기 추천(recommend/async/): 임베딩 대기 시간 제한(초) / 동시에 기다릴 수 있는 임베딩 요청 수
+    'ASYNC': {
+        'TIMEOUT': 3.0,
+        'CONCURRENCY': 16,
+    },
+    # 배치 추천(recommend/batch/): 요청당 최대 질문 수 / 질문당 최대 추천 수
+    'BATCH': {
+        'MAX_MESSAGES': 100,
+        'MAX_K': 20,
+    },
+    # 회원 맞춤 추천(recommend/me/): 최종 점수 = (유사도 x SIMILARITY_WEIGHT + 금리/최고금리 x RATE_WEIGHT) x 가입 가능 가중치
+    'PERSONAL': {
+        'SIZE': 10,                     # 회원당 저장할 추천 수
+        'SIMILARITY_WEIGHT': 0.7,
+        'RATE_WEIGHT': 0.3,
+        'JOINED_WEIGHT': 0.3,           # 프로필 벡터에 섞을 가입상품 임베딩 평균 비율
+        'PARTIAL_ELIGIBILITY': 0.8,     # join_deny=3 (일부제한) 상품 가중치
+        'LOW_INCOME_SALARY': 36000000,  # join_deny=2 (서민전용) 상품을 추천할 연봉 상한 (원)
+        'REFRESH_BATCH_SIZE': 200,      # refresh_user_recommendations 커맨드가 한 번에 계산할 회원 수
+    },
+    # 상품이 수만 개일 때용 근사 검색 (build_ann_index 커맨드로 파일 생성)
+    'ANN': {
+        'ENABLED': env.bool('RECOMMEND_ANN', default=False),
+        'PATH': DATA_DIR / 'ann_index.npz',
+        'NPROBE': 8,                # 검색할 클러스터 수 (클수록 정확, 느림)
+    },
+}
+
+# [F09] 질문 임베딩 캐시
+QUERY_EMBEDDING_CACHE = {
+    'LRU_SIZE': 1024,               # 프로세스 메모리 LRU 개수
+    'TTL': 60 * 60 * 24 * 30,       # DB 캐시 유효기간(초)
+    'MAX_ROWS': 50000,              # DB 캐시 최대 행 수 (넘으면 오래 안 쓴 것부터 삭제)
+    'EVICT_EVERY': 100,             # 만료/초과 행 정리를 몇 번 저장할 때마다 할지
+    'TOUCH_SECONDS': 300,           # LRU 에서 찾은 질문의 DB last_used_at 갱신 간격(초)
+}
+
 # CORS 설정
 CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
@@ -174,6 +315,31 @@ REST_AUTH_SERIALIZERS = {
 }
 
 
+# [F03] 예적금 목록/상세 응답 캐시 (카탈로그 버전별, 프로세스 메모리 LRU)
+CATALOG_RESPONSE_CACHE = {
+    'MAX_ENTRIES': 256,
+}
+
+# [F03] 예적금 목록 커서 페이지네이션 (limit / cursor 를 줄 때만 사용)
+DEPOSIT_PAGINATION = {
+    'DEFAULT_LIMIT': 20,
+    'MAX_LIMIT': 100,
+}
+
+# [F03] 만기 수령액 시뮬레이션 (amount 상한: 1조 원)
+DEPOSIT_SIMULATION = {
+    'DEFAULT_K': 10,
+    'MAX_K': 100,
+    'MAX_AMOUNT': 10 ** 12,
+}
+
+# [F03/F04] 스트리밍 JSON 응답 (?stream=1, orjson 이 설치되어 있으면 사용)
+STREAMING_RESPONSES = {
+    'DEFAULT': False,      # stream 파라미터가 없을 때 스트리밍할지
+    'CHUNK_SIZE': 500,     # queryset.iterator(chunk_size=...) 한 번에 읽을 행 수
+    'BUFFER_ROWS': 100,    # 이만큼 직렬화한 뒤 한 조각으로 내보냄
+}
+
 # 커뮤니티/제품/기타 API 전부가 토큰 인증을 “기본으로” 인식
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [